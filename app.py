@@ -1,13 +1,20 @@
 from flask import Flask
 from config import Config
-from extensions import db
+from extensions import db, media_store, response_cache
 import models as models
 from flask_migrate import Migrate
 from flask_cors import CORS
+import compresion
+from lectura import modelo_lectura
+from teselas import almacen_teselas
+from limites import limites_distritales
+from contrasenas import pool_contrasenas
+from carga_padron import padron_cli
 
 # Importar Blueprints
 from main.routes import main
 from mapa.routes import mapa
+from media.routes import media
 
 def create_app():
     app = Flask(__name__)
@@ -20,6 +27,28 @@ def create_app():
     # Inicializar base de datos
     db.init_app(app)
 
+    # Almacén de imágenes en disco (MEDIA_ROOT)
+    media_store.init_app(app)
+
+    # Compresión según Accept-Encoding. Debe registrarse antes que la caché:
+    # su after_request corre el último, después del de ETag.
+    compresion.init_app(app)
+
+    # Caché de respuestas por versión de datos
+    response_cache.init_app(app)
+
+    # Instantánea en memoria de partidos, candidatos y centros (solo lectura)
+    modelo_lectura.init_app(app)
+
+    # Teselas de centros en disco (TESELAS_ROOT)
+    almacen_teselas.init_app(app)
+
+    # Límites distritales para ubicar coordenadas (DISTRITOS_GEOJSON)
+    limites_distritales.init_app(app)
+
+    # Hash de contraseñas en un pool de procesos acotado
+    pool_contrasenas.init_app(app)
+
     migrate = Migrate(app, db)
     # Ejecutar esto: pip install Flask-Migrate
     # Habilitar el venv38 y luego:
@@ -30,14 +59,28 @@ def create_app():
     # Registrar Blueprints
     app.register_blueprint(main)
     app.register_blueprint(mapa, url_prefix="/mapa")
+    app.register_blueprint(media)
+
+    # flask padron cargar ARCHIVO
+    app.cli.add_command(padron_cli)
+
+    # Páginas estáticas renderizadas y comprimidas una sola vez
+    compresion.paginas_estaticas.precomprimir(app, ['parte1.html', 'parte3.html', 'parte4.html'])
 
-    # Crear tablas si no existen
-    with app.app_context():db.create_all()
+    # Crear tablas (e índices nuevos) si no existen
+    with app.app_context():
+        db.create_all()
+        models.crear_indices_faltantes()
+        models.ConteosDistrito.recontar_si_vacia()
 
     return app
 
 
-app = create_app()
+# Los procesos del pool de contraseñas (contrasenas.py) arrancan con spawn,
+# que vuelve a importar el script principal como __mp_main__ (python app.py):
+# ahí no se crea otra app
+if __name__ != '__mp_main__':
+    app = create_app()
 
 #acepta conección de cualquier parte
 if __name__ == "__main__":app.run(host='0.0.0.0', port=5000, debug=True)
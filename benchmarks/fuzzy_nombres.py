@@ -0,0 +1,82 @@
+"""
+Benchmark de la búsqueda difusa (trigramas) sobre decenas de miles de nombres.
+
+Compara el índice de trigramas de busqueda.py contra recorrer todos los
+nombres con difflib (lo que haría una distancia de edición fila por fila).
+No necesita base de datos:
+
+    python benchmarks/fuzzy_nombres.py [--nombres 50000] [--consultas 200]
+"""
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from busqueda import UMBRAL_SIMILITUD, _Fuente, normalizar  # noqa: E402
+
+NOMBRES = ['José', 'María', 'Luis', 'Carmen', 'Juan', 'Rosa', 'Carlos', 'Ana', 'Jorge', 'Lucía',
+           'Miguel', 'Elena', 'Víctor', 'Patricia', 'César', 'Julia', 'Raúl', 'Gladys', 'Wilber', 'Yeni']
+APELLIDOS = ['Quispe', 'Mamani', 'Huamán', 'Flores', 'Rodríguez', 'Sánchez', 'García', 'Chávez',
+             'Ramos', 'Condori', 'Vásquez', 'Mendoza', 'Torres', 'Rojas', 'Ccahuana', 'Huanca',
+             'Gutiérrez', 'Díaz', 'Castillo', 'Apaza', 'Ticona', 'Paucar', 'Yupanqui', 'Cusi',
+             'Villanueva', 'Espinoza', 'Salazar', 'Aguilar', 'Ayala', 'Cárdenas']
+
+
+def nombres_sinteticos(n, rnd):
+    for i in range(n):
+        yield f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)} {i}"
+
+
+def con_erratas(nombre, rnd):
+    """Quita, duplica o cambia una letra de cada palabra (sin el número final)."""
+    palabras = []
+    for palabra in nombre.split()[:-1]:
+        i = rnd.randrange(len(palabra))
+        cambio = rnd.choice(('quitar', 'duplicar', 'cambiar'))
+        if cambio == 'quitar':
+            palabra = palabra[:i] + palabra[i + 1:]
+        elif cambio == 'duplicar':
+            palabra = palabra[:i] + palabra[i] + palabra[i:]
+        else:
+            palabra = palabra[:i] + rnd.choice('aeioucsz') + palabra[i + 1:]
+        palabras.append(palabra)
+    return ' '.join(palabras)
+
+
+def medir(fn, consultas):
+    inicio = time.perf_counter()
+    for q in consultas:
+        fn(q)
+    return (time.perf_counter() - inicio) / len(consultas) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nombres', type=int, default=50000)
+    parser.add_argument('--consultas', type=int, default=200)
+    parser.add_argument('--semilla', type=int, default=7)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.semilla)
+    nombres = list(nombres_sinteticos(args.nombres, rnd))
+    consultas = [con_erratas(rnd.choice(nombres), rnd) for _ in range(args.consultas)]
+
+    inicio = time.perf_counter()
+    fuente = _Fuente(0, [({'id': i}, nombre, (), ()) for i, nombre in enumerate(nombres)])
+    print(f"{len(nombres)} nombres, índice construido en {time.perf_counter() - inicio:.2f} s")
+
+    ms = medir(lambda q: fuente.similares(q, 20, UMBRAL_SIMILITUD), consultas)
+    print(f"trigramas: {ms:.2f} ms por consulta")
+
+    normalizados = [normalizar(n) for n in nombres]
+    muestra = consultas[:max(1, args.consultas // 20)]
+    ms_lineal = medir(lambda q: difflib.get_close_matches(normalizar(q), normalizados, 20, 0.6), muestra)
+    print(f"difflib (recorrido completo): {ms_lineal:.2f} ms por consulta")
+
+
+if __name__ == '__main__':
+    main()
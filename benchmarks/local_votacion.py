@@ -0,0 +1,163 @@
+"""
+Benchmark de "¿dónde voto?" (/api/local-votacion/<dni>).
+
+Sin --url mide la búsqueda en memoria del padrón con millones de DNIs
+sintéticos: Asignaciones.mesa_de (el bisect) y padron.mesa_de, lo que
+llama la ruta, dentro de un contexto de app sobre SQLite en memoria (sin
+MySQL); también cuenta las consultas a Usuarios, que deben ser cero. Con --url hace una prueba de carga HTTP contra
+un servidor en marcha, con varios hilos y conexiones persistentes:
+
+    python benchmarks/local_votacion.py [--electores 5000000]
+    python benchmarks/local_votacion.py --url http://localhost:5000 \\
+        --dnis dnis.txt [--hilos 32] [--segundos 10]
+
+`dnis.txt` tiene un DNI por línea (p. ej. la primera columna del archivo
+cargado con `flask padron cargar`); sin --dnis se piden DNIs al azar.
+"""
+import argparse
+import http.client
+import os
+import random
+import sys
+import threading
+import time
+from array import array
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def en_memoria(electores, consultas, rnd):
+    from padron import Asignaciones
+
+    inicio = time.perf_counter()
+    dnis = array('I', sorted(rnd.sample(range(10000000, 99999999), electores)))
+    mesas = array('I', (i // 300 + 1 for i in range(electores)))
+    asignaciones = Asignaciones((0,), dnis, mesas)
+    print(f"{electores} electores en {time.perf_counter() - inicio:.1f} s, "
+          f"{(dnis.itemsize + mesas.itemsize) * electores / 2 ** 20:.0f} MB")
+
+    # Mitad presentes, mitad ausentes (casi todos los DNIs al azar no están)
+    muestra = [rnd.choice(dnis) for _ in range(consultas // 2)]
+    muestra += [rnd.randrange(10000000, 99999999) for _ in range(consultas // 2)]
+    _medir('Asignaciones.mesa_de', asignaciones.mesa_de, muestra)
+
+    app, padron, consultas_usuarios = _app_con_padron(asignaciones)
+    with app.app_context():
+        _medir('padron.mesa_de', padron.mesa_de, muestra)
+    print(f"consultas a Usuarios durante padron.mesa_de: {len(consultas_usuarios)}")
+
+
+def _medir(nombre, funcion, muestra):
+    inicio = time.perf_counter()
+    for dni in muestra:
+        funcion(dni)
+    segundos = time.perf_counter() - inicio
+    print(f"{nombre}: {len(muestra) / segundos:,.0f} búsquedas/s "
+          f"({segundos / len(muestra) * 1e6:.2f} us cada una)")
+
+
+def _app_con_padron(asignaciones):
+    """
+    App mínima sobre SQLite en memoria con `asignaciones` ya publicadas en
+    padron.padron, como tras la carga en segundo plano. Devuelve (app,
+    padron, lista de las consultas a Usuarios que se ejecuten).
+    """
+    from flask import Flask
+    from sqlalchemy import event
+
+    from config import Config
+    from extensions import db, response_cache
+    from padron import TABLAS, padron
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    response_cache.init_app(app)
+    consultas_usuarios = []
+
+    def registrar(conexion, cursor, sql, *args):
+        if 'Usuarios' in sql:
+            consultas_usuarios.append(sql)
+
+    with app.app_context():
+        db.create_all()
+        asignaciones.version = response_cache.versiones(TABLAS)
+        event.listen(db.engine, 'before_cursor_execute', registrar)
+    padron._asignaciones = asignaciones
+    return app, padron, consultas_usuarios
+
+
+def _percentil(valores, p):
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def carga_http(url, dnis, hilos, segundos):
+    partes = urlsplit(url)
+    conexion_cls = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+    fin = time.monotonic() + segundos
+    latencias, estados = [], {}
+    lock = threading.Lock()
+
+    def trabajador(semilla):
+        rnd = random.Random(semilla)
+        conexion = conexion_cls(partes.netloc, timeout=10)
+        propias, propios = [], {}
+        while time.monotonic() < fin:
+            dni = rnd.choice(dnis) if dnis else f"{rnd.randrange(100000000):08d}"
+            inicio = time.perf_counter()
+            try:
+                conexion.request('GET', f"{partes.path.rstrip('/')}/api/local-votacion/{dni}")
+                respuesta = conexion.getresponse()
+                respuesta.read()
+                estado = respuesta.status
+            except (OSError, http.client.HTTPException):
+                conexion.close()
+                conexion = conexion_cls(partes.netloc, timeout=10)
+                estado = 'error'
+            propias.append(time.perf_counter() - inicio)
+            propios[estado] = propios.get(estado, 0) + 1
+        with lock:
+            latencias.extend(propias)
+            for estado, n in propios.items():
+                estados[estado] = estados.get(estado, 0) + n
+
+    trabajadores = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+
+    latencias.sort()
+    print(f"{len(latencias)} peticiones en {segundos} s con {hilos} hilos: "
+          f"{len(latencias) / segundos:,.0f} peticiones/s")
+    print(f"latencia p50 {_percentil(latencias, 0.5) * 1000:.2f} ms, "
+          f"p95 {_percentil(latencias, 0.95) * 1000:.2f} ms, "
+          f"p99 {_percentil(latencias, 0.99) * 1000:.2f} ms")
+    print(f"estados: {estados}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--electores', type=int, default=5000000)
+    parser.add_argument('--consultas', type=int, default=1000000)
+    parser.add_argument('--url')
+    parser.add_argument('--dnis', help='archivo con un DNI por línea (modo --url)')
+    parser.add_argument('--hilos', type=int, default=32)
+    parser.add_argument('--segundos', type=int, default=10)
+    parser.add_argument('--semilla', type=int, default=7)
+    args = parser.parse_args()
+
+    if args.url:
+        dnis = []
+        if args.dnis:
+            with open(args.dnis, encoding='utf-8') as f:
+                dnis = [linea.strip() for linea in f if linea.strip()]
+        carga_http(args.url, dnis, args.hilos, args.segundos)
+    else:
+        en_memoria(args.electores, args.consultas, random.Random(args.semilla))
+
+
+if __name__ == '__main__':
+    main()
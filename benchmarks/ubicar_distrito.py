@@ -0,0 +1,114 @@
+"""
+Benchmark de /mapa/api/distritos/ubicar: microsegundos por punto de
+IndiceDistritos.distrito_en (árbol STR + franjas) frente a probar los
+polígonos uno por uno.
+
+Sin --geojson usa una cuadrícula sintética con tantos distritos como el
+Perú (1874) y límites de cientos de vértices, como los del INEI; con
+--geojson mide sobre el archivo real (ver DISTRITOS_GEOJSON en config.py),
+con puntos al azar dentro de su extensión. No necesita base de datos:
+
+    python benchmarks/ubicar_distrito.py [--distritos 1874] [--vertices 400]
+    python benchmarks/ubicar_distrito.py --geojson datos/distritos.geojson --campo NOMBDIST
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geo import IndiceDistritos  # noqa: E402
+
+
+def cuadricula(distritos, vertices):
+    """
+    FeatureCollection de celdas sobre la extensión del Perú. Cada lado de
+    la celda se parte en vertices / 4 tramos con un desvío que comparten las
+    dos celdas vecinas, así que los límites encajan como los reales.
+    """
+    columnas = math.ceil(math.sqrt(distritos))
+    filas = math.ceil(distritos / columnas)
+    oeste, sur, ancho, alto = -81.3, -18.4, 12.6 / columnas, 18.4 / filas
+    tramos = max(1, vertices // 4)
+    desvio = 0.2 * min(ancho, alto) / tramos
+
+    def borde(x1, y1, x2, y2, semilla):
+        # Mismo desvío para el mismo lado, se recorra en el sentido que se recorra
+        azar = random.Random(semilla)
+        puntos = [(x1 + (x2 - x1) * i / tramos, y1 + (y2 - y1) * i / tramos) for i in range(tramos)]
+        return [puntos[0]] + [(x + azar.uniform(-desvio, desvio), y + azar.uniform(-desvio, desvio))
+                              for x, y in puntos[1:]]
+
+    def lado(i1, j1, i2, j2):
+        x1, y1, x2, y2 = oeste + i1 * ancho, sur + j1 * alto, oeste + i2 * ancho, sur + j2 * alto
+        if (i1, j1) <= (i2, j2):
+            return borde(x1, y1, x2, y2, f'{i1},{j1},{i2},{j2}')
+        inverso = borde(x2, y2, x1, y1, f'{i2},{j2},{i1},{j1}')
+        return [(x1, y1)] + inverso[:0:-1]
+
+    features = []
+    for n in range(distritos):
+        i, j = n % columnas, n // columnas
+        anillo = (lado(i, j, i + 1, j) + lado(i + 1, j, i + 1, j + 1)
+                  + lado(i + 1, j + 1, i, j + 1) + lado(i, j + 1, i, j))
+        anillo.append(anillo[0])
+        features.append({
+            'type': 'Feature',
+            'properties': {'distrito': f'D{n}'},
+            'geometry': {'type': 'Polygon', 'coordinates': [[list(p) for p in anillo]]},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def uno_por_uno(indice, lat, lng):
+    for poligono in indice.poligonos:
+        caja = poligono.caja
+        if caja[0] <= lng <= caja[2] and caja[1] <= lat <= caja[3] and poligono.contiene(lng, lat):
+            return poligono.nombre
+    return None
+
+
+def medir(fn, puntos):
+    inicio = time.perf_counter()
+    for lat, lng in puntos:
+        fn(lat, lng)
+    return (time.perf_counter() - inicio) / len(puntos) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--distritos', type=int, default=1874)
+    parser.add_argument('--vertices', type=int, default=400)
+    parser.add_argument('--puntos', type=int, default=20000)
+    parser.add_argument('--geojson', help='Límites reales en lugar de la cuadrícula sintética')
+    parser.add_argument('--campo', default='distrito', help='Propiedad con el nombre del distrito')
+    parser.add_argument('--semilla', type=int, default=7)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.semilla)
+    if args.geojson:
+        with open(args.geojson, encoding='utf-8') as f:
+            datos = json.load(f)
+    else:
+        datos = cuadricula(args.distritos, args.vertices)
+
+    inicio = time.perf_counter()
+    indice = IndiceDistritos.desde_geojson(datos, args.campo)
+    print(f"{len(indice.poligonos)} distritos, índice construido en {time.perf_counter() - inicio:.2f} s")
+
+    oeste, sur, este, norte = IndiceDistritos._caja([p.caja for p in indice.poligonos])
+    puntos = [(rnd.uniform(sur, norte), rnd.uniform(oeste, este)) for _ in range(args.puntos)]
+    dentro = sum(indice.distrito_en(lat, lng) is not None for lat, lng in puntos)
+    print(f"{len(puntos)} puntos, {dentro} dentro de algún distrito")
+
+    print(f"distrito_en (árbol STR): {medir(indice.distrito_en, puntos):.1f} us por punto")
+    muestra = puntos[:max(1, len(puntos) // 10)]
+    print(f"polígono por polígono: {medir(lambda lat, lng: uno_por_uno(indice, lat, lng), muestra):.1f} us por punto")
+
+
+if __name__ == '__main__':
+    main()
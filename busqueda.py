@@ -0,0 +1,394 @@
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+
+from lectura import modelo_lectura
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+# Un prefijo muy corto ("a") puede abarcar miles de términos: se usan los
+# primeros y la respuesta lo indica con truncado
+MAX_EXPANSION_PREFIJO = 200
+MAX_PREFIJOS_CACHEADOS = 5000
+# Autocompletado: sugerencias por defecto y máximo
+LIMITE_SUGERENCIAS = 8
+MAX_SUGERENCIAS = 20
+# Modo difuso: fracción mínima de los trigramas de la búsqueda que deben
+# aparecer en el título (como word_similarity de pg_trgm)
+UMBRAL_SIMILITUD = 0.5
+
+
+@lru_cache(maxsize=65536)
+def normalizar(texto):
+    """
+    'Pérez-Ñañez' -> 'perez nanez': minúsculas, sin tildes ni signos.
+    Memoizada: los nombres de referencia se normalizan una vez por proceso.
+    """
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(' ', sin_tildes).strip()
+
+
+# normalizar_lote: lo que no es ASCII ni una tilde suelta tras NFKD ('°',
+# 'ß'...) pasa a espacio; de los bytes ASCII solo se conservan letras y dígitos
+_NO_ASCII_NI_TILDE = re.compile('[^\x00-\x7f\u0300-\u036f]+')
+_A_ESPACIO = bytes(c if c in b'abcdefghijklmnopqrstuvwxyz0123456789\n' else 0x20 for c in range(256))
+
+
+def normalizar_lote(textos):
+    """
+    normalizar() de muchos textos a la vez (mismo resultado): se unen en un
+    solo bloque y cada paso (minúsculas, NFKD, quitar tildes y signos) corre
+    una sola vez en C sobre el bloque entero, no una vez por texto.
+    """
+    bloque = '\n'.join((t or '').replace('\n', ' ') for t in textos)
+    bloque = _NO_ASCII_NI_TILDE.sub(' ', unicodedata.normalize('NFKD', bloque.lower()))
+    ascii_ = bloque.encode('ascii', 'ignore').translate(_A_ESPACIO).decode('ascii')
+    return [' '.join(linea.split()) for linea in ascii_.split('\n')]
+
+
+def tokenizar(texto):
+    return normalizar(texto).split()
+
+
+def trigramas(texto):
+    """Trigramas de cada palabra con relleno, al estilo de pg_trgm ('  pe', ' pe', 'per'...)."""
+    grams = set()
+    for palabra in tokenizar(texto):
+        relleno = f"  {palabra} "
+        grams.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return grams
+
+
+class _IndiceTrigramas:
+    """
+    Trigrama -> ids de documento, sobre los títulos de una fuente.
+    La similitud es la fracción de trigramas de la búsqueda presentes en el
+    título (un apellido con erratas se parece al nombre completo), y a
+    igualdad gana el título más corto (Jaccard). Con un umbral t, un
+    documento debe compartir al menos m = ceil(t * |q|) trigramas: los
+    candidatos salen solo de los |q| - m + 1 trigramas menos frecuentes y
+    el resto se verifica con pertenencia en conjuntos, sin calcular
+    distancias contra cada nombre.
+    """
+    __slots__ = ('postings', 'tamanos')
+
+    def __init__(self, titulos):
+        postings = {}
+        self.tamanos = []
+        for doc_id, titulo in enumerate(titulos):
+            grams = trigramas(titulo)
+            self.tamanos.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(doc_id)
+        self.postings = {g: frozenset(ids) for g, ids in postings.items()}
+
+    def similares(self, q, limite, umbral):
+        """
+        (total, [(similitud, doc_id)]): cuántos documentos superan el umbral
+        y los `limite` mejores, de mayor a menor similitud.
+        """
+        grams = sorted(trigramas(q), key=lambda g: len(self.postings.get(g, ())))
+        if not grams:
+            return 0, []
+        minimo = max(1, math.ceil(umbral * len(grams)))
+        raros, comunes = grams[:len(grams) - minimo + 1], grams[len(grams) - minimo + 1:]
+
+        compartidos = {}
+        for gram in raros:
+            for doc_id in self.postings.get(gram, ()):
+                compartidos[doc_id] = compartidos.get(doc_id, 0) + 1
+        for gram in comunes:
+            ids = self.postings.get(gram)
+            if ids:
+                for doc_id in compartidos:
+                    if doc_id in ids:
+                        compartidos[doc_id] += 1
+
+        resultados = []
+        for doc_id, n in compartidos.items():
+            if n >= minimo:
+                jaccard = n / (len(grams) + self.tamanos[doc_id] - n)
+                resultados.append((n / len(grams), jaccard, doc_id))
+        mejores = heapq.nlargest(limite, resultados, key=lambda r: (r[0], r[1], -r[2]))
+        return len(resultados), [(similitud, doc_id) for similitud, _, doc_id in mejores]
+
+
+class _Sugerencias:
+    """
+    Autocompletado por prefijo con arreglos ordenados y bisect. Cada título
+    normalizado se guarda una vez por palabra, desde esa palabra hasta el
+    final ("jose quispe mamani", "quispe mamani", "mamani"), así que "quis"
+    y "jose quis" encuentran el mismo nombre. Las claves que empiezan en la
+    primera palabra (y los alias, como las siglas de un partido) van en un
+    arreglo aparte para sugerirlas primero.
+    """
+    __slots__ = ('inicio', 'ids_inicio', 'palabra', 'ids_palabra')
+
+    def __init__(self, titulos, alias):
+        inicio, palabra = [], []
+        for doc_id, titulo in enumerate(titulos):
+            inicio.extend((normalizar(a), doc_id) for a in alias[doc_id] if normalizar(a))
+            tokens = tokenizar(titulo)
+            if not tokens:
+                continue
+            inicio.append((' '.join(tokens), doc_id))
+            palabra.extend((' '.join(tokens[i:]), doc_id) for i in range(1, len(tokens)))
+        inicio.sort()
+        palabra.sort()
+        self.inicio = [clave for clave, _ in inicio]
+        self.ids_inicio = array('I', (doc_id for _, doc_id in inicio))
+        self.palabra = [clave for clave, _ in palabra]
+        self.ids_palabra = array('I', (doc_id for _, doc_id in palabra))
+
+    def sugerir(self, prefijo, limite):
+        """[(rango, clave, doc_id)]: rango 0 si el título empieza por el prefijo."""
+        vistos, resultado = set(), []
+        for rango, claves, ids in ((0, self.inicio, self.ids_inicio),
+                                   (1, self.palabra, self.ids_palabra)):
+            i = bisect_left(claves, prefijo)
+            while i < len(claves) and len(resultado) < limite and claves[i].startswith(prefijo):
+                if ids[i] not in vistos:
+                    vistos.add(ids[i])
+                    resultado.append((rango, claves[i], ids[i]))
+                i += 1
+        return resultado
+
+
+class _Fuente:
+    """
+    Índice invertido (inmutable) de una fuente. Los documentos se numeran en
+    orden alfabético de título, así que "los primeros N resultados" son
+    simplemente los N ids más pequeños. Hay dos juegos de postings: términos
+    del título (para rankear) y de todos los campos (para filtrar).
+    """
+    __slots__ = ('version', 'docs', 'titulos', 'alias', 'postings', 'postings_titulo', 'vocabulario',
+                 '_prefijos', '_trigramas', '_sugerencias')
+
+    def __init__(self, version, registros):
+        self.version = version
+        ordenados = sorted(registros, key=lambda r: normalizar(r[1]))
+        self.docs = [doc for doc, _, _, _ in ordenados]
+        self.titulos = [titulo for _, titulo, _, _ in ordenados]
+        self.alias = [alias for _, _, _, alias in ordenados]
+        postings, postings_titulo = {}, {}
+        for doc_id, (_, titulo, otros, _) in enumerate(ordenados):
+            tokens_titulo = set(tokenizar(titulo))
+            for token in tokens_titulo:
+                postings_titulo.setdefault(token, []).append(doc_id)
+            for token in tokens_titulo.union(*(tokenizar(t) for t in otros)):
+                postings.setdefault(token, []).append(doc_id)
+        self.postings = {t: frozenset(ids) for t, ids in postings.items()}
+        self.postings_titulo = {t: frozenset(ids) for t, ids in postings_titulo.items()}
+        self.vocabulario = sorted(self.postings)
+        # prefijo -> (ids, ids_titulo); se llena a demanda (lo que se escribe
+        # en el buscador se repite mucho entre usuarios)
+        self._prefijos = {}
+        # Trigramas (modo difuso) y sugerencias se construyen aquí, con el
+        # resto de la fuente y bajo el lock de IndiceBusqueda: construirlos
+        # al primer uso dejaba a varias peticiones haciéndolo a la vez
+        self._trigramas = _IndiceTrigramas(self.titulos)
+        self._sugerencias = _Sugerencias(self.titulos, self.alias)
+
+    def sugerir(self, prefijo, limite):
+        return [(rango, clave, self.docs[i]) for rango, clave, i in self._sugerencias.sugerir(prefijo, limite)]
+
+    def similares(self, q, limite, umbral=UMBRAL_SIMILITUD):
+        """(total, [(similitud, doc)]): ver _IndiceTrigramas.similares."""
+        total, mejores = self._trigramas.similares(q, limite, umbral)
+        return total, [(sim, self.docs[i]) for sim, i in mejores]
+
+    def _expandir(self, prefijo):
+        """(ids, ids_titulo, truncado) de los términos que empiezan por `prefijo`."""
+        cacheado = self._prefijos.get(prefijo)
+        if cacheado is not None:
+            return cacheado
+        i = bisect_left(self.vocabulario, prefijo)
+        terminos = []
+        while i < len(self.vocabulario) and len(terminos) < MAX_EXPANSION_PREFIJO \
+                and self.vocabulario[i].startswith(prefijo):
+            terminos.append(self.vocabulario[i])
+            i += 1
+        truncado = i < len(self.vocabulario) and self.vocabulario[i].startswith(prefijo)
+        resultado = (
+            frozenset().union(*(self.postings[t] for t in terminos)),
+            frozenset().union(*(self.postings_titulo.get(t, ()) for t in terminos)),
+            truncado,
+        )
+        if len(self._prefijos) < MAX_PREFIJOS_CACHEADOS:
+            self._prefijos[prefijo] = resultado
+        return resultado
+
+    def buscar(self, tokens, limite):
+        """
+        Documentos que contienen todos los tokens (el último, como prefijo).
+        Devuelve (total, mejores, truncado): primero los que tienen todos los
+        términos en el título, cada grupo en orden alfabético. truncado indica
+        que el prefijo abarcaba más de MAX_EXPANSION_PREFIJO términos.
+        """
+        todos, titulo = [], []
+        for token in tokens[:-1]:
+            todos.append(self.postings.get(token, frozenset()))
+            titulo.append(self.postings_titulo.get(token, frozenset()))
+        ids, ids_titulo, truncado = self._expandir(tokens[-1])
+        todos.append(ids)
+        titulo.append(ids_titulo)
+
+        coincidencias = _interseccion(todos)
+        if not coincidencias:
+            return 0, [], truncado
+        en_titulo = _interseccion(titulo)
+        mejores = heapq.nsmallest(limite, en_titulo)
+        if len(mejores) < limite:
+            resto = coincidencias - en_titulo if en_titulo else coincidencias
+            mejores += heapq.nsmallest(limite - len(mejores), resto)
+        return len(coincidencias), [
+            (0 if i in en_titulo else 1, i, self.docs[i]) for i in mejores
+        ], truncado
+
+
+def _interseccion(conjuntos):
+    conjuntos = sorted(conjuntos, key=len)
+    resultado = conjuntos[0]
+    for conjunto in conjuntos[1:]:
+        if not resultado:
+            break
+        resultado = resultado & conjunto
+    return resultado
+
+
+# --- Fuentes: (tablas de las que depende, función que lee los registros de
+# la instantánea del modelo de lectura) ---
+# Cada registro es (doc, título, otros campos buscables, alias para autocompletar)
+
+def _registros_candidatos(instantanea):
+    for c in instantanea.candidatos:
+        doc = {
+            'tipo': 'candidato',
+            'id': c.id,
+            'titulo': c.nombre_completo,
+            'subtitulo': ' - '.join(x for x in (c.tipo_candidatura, c.region) if x),
+        }
+        yield doc, c.nombre_completo, (c.region,), ()
+
+
+def _registros_partidos(instantanea):
+    for p in instantanea.partidos:
+        doc = {
+            'tipo': 'partido',
+            'id': p.id_partido,
+            'titulo': p.nombre_partido,
+            'subtitulo': p.siglas,
+        }
+        yield doc, p.nombre_partido, (p.siglas,), (p.siglas,)
+
+
+def _registros_centros(instantanea):
+    for c in instantanea.centros:
+        doc = {
+            'tipo': 'centro',
+            'id': c.id_centro,
+            'titulo': c.nombre,
+            'subtitulo': ', '.join(x for x in (c.direccion, c.distrito) if x),
+        }
+        yield doc, c.nombre, (c.direccion, c.distrito), ()
+
+
+FUENTES = {
+    'candidato': (('candidatos',), _registros_candidatos),
+    'partido': (('PartidosPoliticos',), _registros_partidos),
+    'centro': (('CentrosVotacion',), _registros_centros),
+}
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido en memoria sobre candidatos, partidos y centros.
+    Cada fuente se reconstruye por separado, a partir de la instantánea del
+    modelo de lectura (lectura.py), cuando cambia la versión de sus tablas; la
+    fuente nueva reemplaza a la anterior de una sola asignación, así que
+    las búsquedas en curso nunca ven un índice a medio construir.
+    """
+
+    def __init__(self):
+        self._fuentes = {}
+        self._lock = threading.Lock()
+
+    def _actualizar(self, tipo):
+        tablas, registros = FUENTES[tipo]
+        instantanea = modelo_lectura.actual()
+        version = instantanea.version(tablas)
+        fuente = self._fuentes.get(tipo)
+        if fuente is not None and fuente.version == version:
+            return fuente
+        with self._lock:
+            fuente = self._fuentes.get(tipo)
+            if fuente is None or fuente.version != version:
+                fuente = _Fuente(version, registros(instantanea))
+                self._fuentes[tipo] = fuente
+        return fuente
+
+    def similares(self, tipo, q, limite=20):
+        """
+        Modo difuso: [(similitud, doc)] de la fuente `tipo` cuyo título se
+        parece a `q` (trigramas), aunque tenga erratas o letras de menos.
+        """
+        return self._actualizar(tipo).similares(q, limite)[1]
+
+    def sugerir(self, q, tipos=None, limite=LIMITE_SUGERENCIAS):
+        """
+        Autocompletado: hasta `limite` documentos cuyo título (o alguna de sus
+        palabras) empieza por `q`. Primero los que empiezan desde la primera
+        palabra, luego el resto, en orden alfabético.
+        """
+        prefijo = normalizar(q)
+        if not prefijo:
+            return []
+        encontrados = []
+        for tipo in tipos or FUENTES:
+            encontrados.extend(self._actualizar(tipo).sugerir(prefijo, limite))
+        encontrados.sort(key=lambda r: (r[0], r[1]))
+        return [doc for _, _, doc in encontrados[:limite]]
+
+    def buscar(self, q, tipos=None, limite=20, fuzzy=False):
+        """
+        Devuelve (total, resultados, truncado). Los documentos con todos los
+        términos en el título van primero; dentro de cada grupo, por orden
+        alfabético. Con fuzzy=True se ordena por similitud de trigramas con
+        el título, y total cuenta todos los que superan el umbral (no solo
+        los `limite` devueltos). truncado: el último término era un prefijo
+        tan corto que solo se expandió a sus primeros MAX_EXPANSION_PREFIJO
+        términos, así que total y resultados son parciales.
+        """
+        if fuzzy:
+            total, encontrados = 0, []
+            for tipo in tipos or FUENTES:
+                n, mejores = self._actualizar(tipo).similares(q, limite)
+                total += n
+                encontrados.extend(mejores)
+            encontrados.sort(key=lambda r: -r[0])
+            return total, [dict(doc, similitud=round(sim, 3)) for sim, doc in encontrados[:limite]], False
+
+        tokens = tokenizar(q)
+        if not tokens:
+            return 0, [], False
+
+        total, encontrados, truncado = 0, [], False
+        for tipo in tipos or FUENTES:
+            n, mejores, parcial = self._actualizar(tipo).buscar(tokens, limite)
+            total += n
+            truncado = truncado or parcial
+            encontrados.extend((grupo, normalizar(doc['titulo']), doc) for grupo, _, doc in mejores)
+
+        encontrados.sort(key=lambda r: (r[0], r[1]))
+        return total, [doc for _, _, doc in encontrados[:limite]], truncado
+
+
+indice_busqueda = IndiceBusqueda()
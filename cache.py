@@ -0,0 +1,225 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, current_app, jsonify
+
+import compresion
+
+
+class ResponseCache:
+    """
+    Caché en memoria de respuestas JSON de solo lectura.
+
+    La clave es (ruta, query string normalizada) y cada entrada recuerda la
+    versión de datos (VersionesDatos) de las tablas de las que depende: la
+    entrada vale hasta que un scraper suba esa versión. Junto al cuerpo se
+    guardan sus versiones comprimidas (gzip/br/zstd), generadas una vez por
+    versión de datos. Se expulsa por LRU cuando el total de bytes (cuerpo +
+    comprimidos) supera RESPONSE_CACHE_MAX_BYTES.
+    """
+
+    def __init__(self, app=None):
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_usados = 0
+        self.max_bytes = 0
+        self.version_ttl = 0
+        self.hits = 0
+        self.misses = 0
+        self.expulsiones = 0
+        self._versiones = {}
+        self._versiones_leidas = 0.0
+        # Versión de datos con la que responden las vistas; el modelo de
+        # lectura (lectura.py) la reemplaza por la de su instantánea
+        self.version_vistas = self.versiones
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_bytes = app.config['RESPONSE_CACHE_MAX_BYTES']
+        self.version_ttl = app.config['RESPONSE_CACHE_VERSION_TTL']
+        app.extensions['response_cache'] = self
+        # GET condicional para el resto de respuestas JSON de ambos blueprints
+        app.after_request(etag_por_contenido)
+
+    # --- Versiones de datos ---
+
+    def versiones(self, tablas):
+        """
+        Versión actual de cada tabla. Los scrapers corren en otro proceso,
+        así que se relee VersionesDatos como mucho cada RESPONSE_CACHE_VERSION_TTL
+        segundos (una consulta de unas pocas filas).
+        """
+        ahora = time.monotonic()
+        if ahora - self._versiones_leidas >= self.version_ttl:
+            from models import VersionesDatos
+            self._versiones = VersionesDatos.todas()
+            self._versiones_leidas = ahora
+        return tuple(self._versiones.get(t, 0) for t in tablas)
+
+    def invalidar_versiones(self):
+        """Fuerza a releer las versiones en la próxima petición (mismo proceso)."""
+        self._versiones_leidas = 0.0
+
+    # --- Almacenamiento LRU ---
+
+    def get(self, clave, version):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada['version'] != version:
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.hits += 1
+            return entrada
+
+    def set(self, clave, version, body, mimetype):
+        tamano = len(body)
+        if tamano > self.max_bytes:
+            return None
+        entrada = {
+            'clave': clave,
+            'version': version,
+            'body': body,
+            'mimetype': mimetype,
+            'comprimidos': {},
+        }
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self.bytes_usados -= _tamano_entrada(anterior)
+            self._entradas[clave] = entrada
+            self.bytes_usados += tamano
+            self._expulsar()
+        return entrada
+
+    def comprimido(self, entrada, codificacion):
+        """Cuerpo de `entrada` comprimido con `codificacion` (se comprime una sola vez)."""
+        data = entrada['comprimidos'].get(codificacion)
+        if data is None:
+            data = compresion.comprimir(entrada['body'], codificacion)
+            with self._lock:
+                if codificacion not in entrada['comprimidos']:
+                    entrada['comprimidos'][codificacion] = data
+                    # Solo cuenta si la entrada sigue en la caché (no fue expulsada)
+                    if self._entradas.get(entrada['clave']) is entrada:
+                        self.bytes_usados += len(data)
+                        self._expulsar()
+        return data
+
+    def _expulsar(self):
+        while self.bytes_usados > self.max_bytes and self._entradas:
+            _, expulsada = self._entradas.popitem(last=False)
+            self.bytes_usados -= _tamano_entrada(expulsada)
+            self.expulsiones += 1
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self.bytes_usados = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self.bytes_usados,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expulsiones': self.expulsiones,
+            }
+
+    # --- Decorador para vistas ---
+
+    @staticmethod
+    def clave_peticion():
+        """(ruta, query string con los parámetros ordenados)."""
+        args = sorted(request.args.items(multi=True))
+        return request.path, tuple(args)
+
+    @staticmethod
+    def etag_version(clave, version):
+        """ETag débil derivado de la petición y de la versión de datos."""
+        return hashlib.sha1(repr((clave, version)).encode('utf-8')).hexdigest()
+
+    def cached(self, *tablas):
+        """
+        Cachea la respuesta 200 de la vista mientras no cambie la versión
+        de `tablas`. En un acierto no se toca la BD ni se serializa nada.
+
+        Además la respuesta lleva un ETag débil calculado de esa versión:
+        un If-None-Match que coincida recibe 304 antes de ejecutar la vista.
+        """
+        def decorador(vista):
+            @wraps(vista)
+            def envoltura(*args, **kwargs):
+                clave = self.clave_peticion()
+                try:
+                    # Puede cargar la instantánea o leer VersionesDatos: un error
+                    # de la BD responde como en las vistas, no con la página 500
+                    version = self.version_vistas(tablas)
+                except Exception as e:
+                    print(f"Error al leer la versión de datos de {request.path}: {e}")
+                    return jsonify({"error": str(e)}), 500
+                etag = self.etag_version(clave, version)
+
+                if request.if_none_match.contains_weak(etag):
+                    return _respuesta_con_etag(current_app.response_class(status=304), etag)
+
+                usar_cache = current_app.config['RESPONSE_CACHE_ENABLED']
+                entrada = self.get(clave, version) if usar_cache else None
+                if entrada is not None:
+                    response = current_app.response_class(entrada['body'], mimetype=entrada['mimetype'])
+                    return self._comprimir(_respuesta_con_etag(response, etag), entrada)
+
+                response = current_app.make_response(vista(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if usar_cache and not response.direct_passthrough:
+                    entrada = self.set(clave, version, response.get_data(), response.mimetype)
+                    if entrada is not None:
+                        self._comprimir(response, entrada)
+                return _respuesta_con_etag(response, etag)
+            return envoltura
+        return decorador
+
+    def _comprimir(self, response, entrada):
+        """Usa el cuerpo comprimido guardado en la entrada según Accept-Encoding."""
+        response.vary.add('Accept-Encoding')
+        codificacion = compresion.negociar(len(entrada['body']))
+        if codificacion is None:
+            return response
+        return compresion.aplicar(response, (codificacion, self.comprimido(entrada, codificacion)))
+
+
+def _tamano_entrada(entrada):
+    return len(entrada['body']) + sum(len(d) for d in entrada['comprimidos'].values())
+
+
+def _respuesta_con_etag(response, etag):
+    response.set_etag(etag, weak=True)
+    # Los clientes pueden guardar la respuesta, pero deben revalidarla
+    response.cache_control.no_cache = True
+    return response
+
+
+def etag_por_contenido(response):
+    """
+    after_request: a las respuestas JSON de GET que no traen ETag (las que
+    no usan @cached) se les asigna uno débil con el hash del cuerpo, y se
+    responde 304 si coincide con If-None-Match. Ahorra el envío, no la consulta.
+    """
+    if (
+        request.method == 'GET'
+        and response.status_code == 200
+        and response.mimetype == 'application/json'
+        and not response.direct_passthrough
+        and 'ETag' not in response.headers
+    ):
+        response.add_etag(weak=True)
+        response.cache_control.no_cache = True
+        response.make_conditional(request)
+    return response
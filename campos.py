@@ -0,0 +1,22 @@
+class CampoInvalido(ValueError):
+    """?fields= pide un campo que el endpoint no ofrece."""
+
+
+def leer_campos(args, disponibles):
+    """
+    Campos pedidos en ?fields=a,b,c, en el orden de `disponibles`.
+    Sin el parámetro se devuelven todos.
+    """
+    valor = args.get('fields')
+    if not valor:
+        return list(disponibles)
+    pedidos = {c.strip() for c in valor.split(',') if c.strip()}
+    desconocidos = pedidos - set(disponibles)
+    if desconocidos:
+        raise CampoInvalido(f"campos desconocidos: {', '.join(sorted(desconocidos))}")
+    return [c for c in disponibles if c in pedidos]
+
+
+def serializar(campos, definicion, *objetos):
+    """{campo: valor} según `definicion` ({campo: extractor(*objetos)})."""
+    return {campo: definicion[campo](*objetos) for campo in campos}
@@ -0,0 +1,218 @@
+import csv
+import json
+import os
+import re
+import time
+import uuid
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from extensions import db
+from models import ConteosDistrito, Mesas, Usuarios, VersionesDatos
+
+padron_cli = AppGroup('padron', help='Carga masiva del padrón electoral (DNI -> mesa).')
+
+LOTE_POR_DEFECTO = 10000
+_DNI = re.compile(r'[0-9]{8}')
+# DNI de una línea que no se pudo decodificar con --encoding
+_ILEGIBLE = object()
+
+
+def _ruta_progreso(archivo):
+    return archivo + '.progreso'
+
+
+def _firma(archivo):
+    """Tamaño y fecha del archivo: si cambian, el progreso guardado ya no vale."""
+    info = os.stat(archivo)
+    return [info.st_size, int(info.st_mtime)]
+
+
+def _leer_progreso(archivo):
+    try:
+        with open(_ruta_progreso(archivo), encoding='utf-8') as f:
+            progreso = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return progreso if progreso.get('firma') == _firma(archivo) else None
+
+
+def _guardar_progreso(archivo, progreso):
+    ruta = _ruta_progreso(archivo)
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(progreso, f)
+    os.replace(ruta + '.tmp', ruta)
+
+
+def _lector(formato, anchos, separador, encoding):
+    """Función línea (bytes) -> (dni, numero_mesa) según el formato del archivo."""
+    if formato == 'fijo':
+        fin_dni = anchos[0]
+        fin_mesa = anchos[0] + anchos[1]
+
+        def leer(linea):
+            texto = linea.decode(encoding)
+            return texto[:fin_dni].strip(), texto[fin_dni:fin_mesa].strip()
+    else:
+        def leer(linea):
+            campos = next(csv.reader([linea.decode(encoding)], delimiter=separador))
+            if len(campos) < 2:
+                return None, None
+            return campos[0].strip(), campos[1].strip()
+    return leer
+
+
+def _lotes(f, leer, tamano, linea_inicial):
+    """
+    Lee el archivo por lotes de `tamano` líneas sin cargarlo entero.
+    Devuelve (filas, posición en bytes al terminar el lote, líneas leídas),
+    donde cada fila es (número de línea, dni, numero_mesa, línea original).
+    """
+    filas, numero = [], linea_inicial
+    for linea in f:
+        numero += 1
+        if not linea.strip():
+            continue
+        try:
+            dni, mesa = leer(linea)
+        except UnicodeDecodeError:
+            # Una línea dañada se rechaza; no debe cortar la carga entera
+            dni, mesa = _ILEGIBLE, None
+        filas.append((numero, dni, mesa, linea))
+        if len(filas) >= tamano:
+            yield filas, f.tell(), numero
+            filas = []
+    if filas:
+        yield filas, f.tell(), numero
+
+
+def _validar(filas, mesas):
+    """
+    Valida el lote completo de una vez: formato de DNI con una expresión
+    compilada y mesa resuelta contra el diccionario numero_mesa -> id_mesa.
+    Devuelve (válidas ordenadas por DNI, rechazadas con su motivo).
+    """
+    validas, rechazadas = [], []
+    for numero, dni, mesa, linea in filas:
+        if dni is _ILEGIBLE:
+            rechazadas.append((numero, 'codificación inválida', linea))
+            continue
+        if dni is None or not _DNI.fullmatch(dni):
+            rechazadas.append((numero, 'dni inválido', linea))
+            continue
+        id_mesa = mesas.get(mesa)
+        if id_mesa is None:
+            rechazadas.append((numero, 'mesa desconocida', linea))
+            continue
+        validas.append({'id_usuario': str(uuid.uuid4()), 'dni': dni, 'id_mesa': id_mesa, 'rol': 'Elector'})
+    # Insertar en orden de la clave única hace que el índice crezca casi
+    # siempre por el final en lugar de partir páginas al azar
+    validas.sort(key=lambda fila: fila['dni'])
+    return validas, rechazadas
+
+
+def _sentencia_upsert(dialecto):
+    """
+    INSERT de varias filas que, si el DNI ya existe (p. ej. un usuario que
+    se registró antes), solo actualiza su mesa.
+    """
+    tabla = Usuarios.__table__
+    if dialecto == 'mysql':
+        sentencia = mysql.insert(tabla)
+        return sentencia.on_duplicate_key_update(id_mesa=sentencia.inserted.id_mesa)
+    modulo = postgresql if dialecto == 'postgresql' else sqlite
+    sentencia = modulo.insert(tabla)
+    return sentencia.on_conflict_do_update(
+        index_elements=[tabla.c.dni], set_={'id_mesa': sentencia.excluded.id_mesa}
+    )
+
+
+@padron_cli.command('cargar')
+@click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--formato', type=click.Choice(['csv', 'fijo']), default='csv',
+              help='csv (dni,numero_mesa) o ancho fijo (ver --anchos).')
+@click.option('--anchos', default='8,6', help='Ancho de los campos dni y mesa en formato fijo.')
+@click.option('--separador', default=',', help='Separador de campos en formato csv.')
+@click.option('--encoding', default='utf-8')
+@click.option('--cabecera/--sin-cabecera', default=True, help='Si la primera línea es la cabecera.')
+@click.option('--lote', type=int, default=LOTE_POR_DEFECTO, help='Filas por transacción.')
+@click.option('--desde-cero', is_flag=True, help='Ignora el progreso guardado de una carga anterior.')
+def cargar_padron(archivo, formato, anchos, separador, encoding, cabecera, lote, desde_cero):
+    """
+    Carga asignaciones DNI -> mesa en Usuarios (flask padron cargar ARCHIVO).
+
+    El archivo se lee por lotes, cada lote se valida de una vez y se inserta
+    con INSERT de varias filas en su propia transacción. Tras cada lote se
+    guarda el avance en ARCHIVO.progreso: si la carga se corta, volver a
+    ejecutar el comando la continúa desde ahí. Las líneas rechazadas se
+    escriben en ARCHIVO.rechazados con el motivo.
+    """
+    anchos = [int(a) for a in anchos.split(',')]
+    leer = _lector(formato, anchos, separador, encoding)
+    progreso = None if desde_cero else _leer_progreso(archivo)
+    if progreso:
+        print(f"Reanudando desde la línea {progreso['linea']:,} "
+              f"({progreso['cargadas']:,} cargadas, {progreso['rechazadas']:,} rechazadas).")
+    else:
+        progreso = {'firma': _firma(archivo), 'posicion': 0, 'linea': 0, 'cargadas': 0, 'rechazadas': 0}
+
+    # Las mesas se resuelven en memoria: son decenas de miles, no millones
+    mesas = dict(db.session.execute(select(Mesas.numero_mesa, Mesas.id_mesa)).all())
+    print(f"{len(mesas):,} mesas conocidas.")
+
+    tamano_total = progreso['firma'][0] or 1
+    with db.engine.connect() as conexion, open(archivo, 'rb') as f, \
+            open(archivo + '.rechazados', 'a' if progreso['posicion'] else 'w', encoding='utf-8') as rechazados:
+        dialecto = conexion.dialect.name
+        sentencia = _sentencia_upsert(dialecto)
+        if dialecto == 'mysql':
+            # Las mesas ya se validaron por lote: no hace falta que MySQL
+            # compruebe la clave foránea fila por fila
+            conexion.exec_driver_sql('SET foreign_key_checks = 0')
+
+        try:
+            f.seek(progreso['posicion'])
+            if progreso['posicion'] == 0 and cabecera:
+                f.readline()
+                progreso['linea'] = 1
+
+            inicio = time.monotonic()
+            cargadas_al_inicio = progreso['cargadas']
+            for filas, posicion, linea in _lotes(f, leer, lote, progreso['linea']):
+                validas, rechazos = _validar(filas, mesas)
+                if validas:
+                    conexion.execute(sentencia, validas)
+                conexion.commit()
+                for numero, motivo, original in rechazos:
+                    rechazados.write(f"{numero}\t{motivo}\t{original.decode(encoding, 'replace').rstrip()}\n")
+                rechazados.flush()
+
+                progreso.update(posicion=posicion, linea=linea)
+                progreso['cargadas'] += len(validas)
+                progreso['rechazadas'] += len(rechazos)
+                _guardar_progreso(archivo, progreso)
+
+                velocidad = (progreso['cargadas'] - cargadas_al_inicio) / max(time.monotonic() - inicio, 1e-6)
+                print(f"{progreso['linea']:,} líneas ({posicion * 100 / tamano_total:.1f}%): "
+                      f"{progreso['cargadas']:,} cargadas, {progreso['rechazadas']:,} rechazadas, "
+                      f"{velocidad:,.0f} filas/s")
+        finally:
+            if dialecto == 'mysql':
+                # La conexión vuelve al pool: se restablece la comprobación
+                # (descartando un lote a medias si la carga se cortó)
+                conexion.rollback()
+                conexion.exec_driver_sql('SET foreign_key_checks = 1')
+
+    # Los INSERT masivos no pasan por el ORM: los electores por distrito se recuentan
+    ConteosDistrito.recontar()
+    # El padrón en memoria (padron.py) se recarga al ver la versión nueva
+    VersionesDatos.incrementar('Usuarios')
+    db.session.commit()
+    # Un archivo vacío o con solo la cabecera no llega a guardar progreso
+    if os.path.exists(_ruta_progreso(archivo)):
+        os.remove(_ruta_progreso(archivo))
+    print(f"Padrón cargado: {progreso['cargadas']:,} asignaciones, "
+          f"{progreso['rechazadas']:,} líneas rechazadas (ver {archivo}.rechazados).")
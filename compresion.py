@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+
+from flask import current_app, render_template, request
+
+# brotli y zstd son opcionales: si no están instalados se negocia solo gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+MIMETYPES_COMPRIMIBLES = {
+    'application/json',
+    'application/javascript',
+    'application/geo+json',
+    'image/svg+xml',
+}
+
+
+def _gzip(data, nivel):
+    return gzip.compress(data, compresslevel=nivel, mtime=0)
+
+
+def _brotli(data, nivel):
+    return brotli.compress(data, quality=min(nivel + 2, 11))
+
+
+def _zstd(data, nivel):
+    if hasattr(zstd, 'ZstdCompressor'):
+        return zstd.ZstdCompressor(level=nivel).compress(data)
+    return zstd.compress(data, level=nivel)
+
+
+# Orden de preferencia del servidor cuando el cliente acepta varias con igual q
+CODIFICADORES = {'gzip': _gzip}
+if brotli is not None:
+    CODIFICADORES = {'br': _brotli, **CODIFICADORES}
+if zstd is not None:
+    CODIFICADORES = {'zstd': _zstd, **CODIFICADORES}
+
+
+def comprimir(data, codificacion):
+    return CODIFICADORES[codificacion](data, current_app.config['COMPRESS_LEVEL'])
+
+
+def negociar(tamano):
+    """
+    Codificación a usar según Accept-Encoding, o None si el cuerpo es
+    demasiado pequeño para que valga la pena o el cliente no acepta ninguna.
+    """
+    if tamano < current_app.config['COMPRESS_MIN_SIZE']:
+        return None
+    return request.accept_encodings.best_match(list(CODIFICADORES))
+
+
+def es_comprimible(response):
+    return (
+        response.status_code == 200
+        and not response.direct_passthrough
+        and 'Content-Encoding' not in response.headers
+        and (response.mimetype.startswith('text/') or response.mimetype in MIMETYPES_COMPRIMIBLES)
+    )
+
+
+def aplicar(response, data):
+    """Sustituye el cuerpo por `data` ya comprimido con la codificación negociada."""
+    codificacion, cuerpo = data
+    response.set_data(cuerpo)
+    response.headers['Content-Encoding'] = codificacion
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def comprimir_respuesta(response):
+    """
+    after_request: comprime al vuelo las respuestas que no vienen ya
+    comprimidas (las de @response_cache.cached reutilizan su versión
+    guardada en la caché y llegan aquí con Content-Encoding).
+    """
+    if request.method != 'GET' or not es_comprimible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    cuerpo = response.get_data()
+    codificacion = negociar(len(cuerpo))
+    if codificacion is None:
+        return response
+    return aplicar(response, (codificacion, comprimir(cuerpo, codificacion)))
+
+
+class PaginasPrecomprimidas:
+    """
+    Plantillas sin datos dinámicos (parte1, parte3, parte4) renderizadas y
+    comprimidas una sola vez al arrancar, en todas las codificaciones.
+    """
+
+    def __init__(self):
+        self._paginas = {}
+
+    def precomprimir(self, app, plantillas):
+        with app.test_request_context('/'):
+            for plantilla in plantillas:
+                html = render_template(plantilla).encode('utf-8')
+                self._paginas[plantilla] = {
+                    'etag': hashlib.sha1(html).hexdigest(),
+                    None: html,
+                    **{c: comprimir(html, c) for c in CODIFICADORES},
+                }
+
+    def enviar(self, plantilla):
+        pagina = self._paginas.get(plantilla)
+        # En modo debug (o si no se precomprimió) se renderiza en cada petición
+        if pagina is None or current_app.debug:
+            return render_template(plantilla)
+
+        response = current_app.response_class(mimetype='text/html')
+        response.set_etag(pagina['etag'])
+        response.vary.add('Accept-Encoding')
+        codificacion = negociar(len(pagina[None]))
+        if codificacion is None:
+            response.set_data(pagina[None])
+        else:
+            aplicar(response, (codificacion, pagina[codificacion]))
+        return response.make_conditional(request)
+
+
+paginas_estaticas = PaginasPrecomprimidas()
+
+
+def init_app(app):
+    # Flask ejecuta los after_request en orden inverso al de registro: al
+    # registrarse antes que el de ETag (cache.py), la compresión corre al
+    # final, sobre el cuerpo sin comprimir que ya tiene su ETag.
+    app.after_request(comprimir_respuesta)
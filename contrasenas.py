@@ -0,0 +1,164 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TiempoAgotado
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class HashingSaturado(Exception):
+    """El pool ya tiene PASSWORD_HASH_MAX_PENDIENTES hashes esperando (o uno no terminó a tiempo)."""
+
+
+def metodo_de(pw_hash):
+    """'scrypt:32768:8:1$sal$hash' -> 'scrypt:32768:8:1'."""
+    return pw_hash.split('$', 1)[0]
+
+
+def metodo_completo(metodo):
+    """
+    Prefijo que generate_password_hash(..., metodo) guarda en el hash, con
+    los valores por defecto de werkzeug para los parámetros omitidos:
+    'scrypt' -> 'scrypt:32768:8:1', 'pbkdf2' -> 'pbkdf2:sha256:<iteraciones>'.
+    """
+    nombre, *parametros = metodo.split(':')
+    if nombre == 'scrypt':
+        n, r, p = map(int, parametros) if parametros else (2 ** 15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if nombre == 'pbkdf2':
+        algoritmo = parametros[0] if parametros else 'sha256'
+        iteraciones = int(parametros[1]) if len(parametros) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{algoritmo}:{iteraciones}"
+    return metodo
+
+
+class PoolContrasenas:
+    """
+    Hashea y verifica contraseñas en un pool de procesos acotado. scrypt y
+    pbkdf2 gastan CPU a propósito: hechos en los hilos de las peticiones,
+    una ráfaga de logins ocupa todos los núcleos y frena al resto de las
+    rutas. Aquí corren como mucho PASSWORD_HASH_WORKERS a la vez; el hilo de
+    la petición solo espera el resultado. Si ya hay PASSWORD_HASH_MAX_PENDIENTES
+    esperando se rechaza con HashingSaturado en lugar de encolar sin límite.
+
+    El método (PASSWORD_HASH_METODO, p. ej. 'scrypt:32768:8:1') se puede
+    cambiar en cualquier momento: los hashes viejos se siguen verificando y
+    necesita_rehash() indica cuáles volver a generar en el próximo login.
+    """
+
+    def __init__(self, app=None):
+        self.metodo = None
+        self.workers = None
+        self.max_pendientes = None
+        self.timeout = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self.pendientes = 0
+        self.max_observado = 0
+        self.completados = 0
+        self.rechazados = 0
+        self.segundos = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.metodo = app.config['PASSWORD_HASH_METODO']
+        self.workers = app.config['PASSWORD_HASH_WORKERS'] or os.cpu_count() or 1
+        self.max_pendientes = app.config['PASSWORD_HASH_MAX_PENDIENTES']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+        app.extensions['pool_contrasenas'] = self
+
+    def _ejecutor(self):
+        # Los procesos se crean en la primera petición: con un servidor que
+        # hace fork de varios workers, cada uno tiene su propio pool. Se
+        # arrancan con spawn (no fork) para no copiar los hilos y conexiones
+        # del servidor. Cada proceso vuelve a importar el script principal
+        # como __mp_main__: con `python app.py`, todos los módulos del
+        # proyecto, pero sin crear otra app ni conectarse a MySQL (ver el
+        # final de app.py); luego solo ejecuta funciones de werkzeug.security
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                    )
+        return self._pool
+
+    def _ejecutar(self, funcion, *args):
+        with self._lock:
+            if self.pendientes >= self.max_pendientes:
+                self.rechazados += 1
+                raise HashingSaturado(f"{self.pendientes} hashes pendientes")
+            self.pendientes += 1
+            self.max_observado = max(self.max_observado, self.pendientes)
+
+        inicio = time.monotonic()
+        pool = self._ejecutor()
+        try:
+            futuro = pool.submit(funcion, *args)
+        except Exception as e:
+            self._liberar()
+            if isinstance(e, BrokenProcessPool):
+                self._descartar(pool)
+            raise
+        # El cupo se libera cuando el proceso termina, no cuando la petición
+        # deja de esperar: un hash que agotó el timeout sigue ocupando un worker
+        futuro.add_done_callback(self._liberar)
+
+        try:
+            resultado = futuro.result(timeout=self.timeout)
+        except TiempoAgotado:
+            futuro.cancel()
+            with self._lock:
+                self.rechazados += 1
+            raise HashingSaturado(f"el hash no terminó en {self.timeout} s")
+        except BrokenProcessPool:
+            self._descartar(pool)
+            raise
+
+        with self._lock:
+            self.completados += 1
+            self.segundos += time.monotonic() - inicio
+        return resultado
+
+    def _liberar(self, futuro=None):
+        with self._lock:
+            self.pendientes -= 1
+
+    def _descartar(self, pool):
+        """Un proceso murió (p. ej. por memoria): el próximo pedido crea otro pool."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def generar(self, password):
+        """Hash de `password` con el método configurado."""
+        return self._ejecutar(generate_password_hash, password, self.metodo)
+
+    def verificar(self, pw_hash, password):
+        return self._ejecutar(check_password_hash, pw_hash, password)
+
+    def necesita_rehash(self, pw_hash):
+        """True si `pw_hash` no usa el método y los parámetros configurados ahora."""
+        return metodo_de(pw_hash) != metodo_completo(self.metodo)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'metodo': self.metodo,
+                'workers': self.workers,
+                'max_pendientes': self.max_pendientes,
+                'pendientes': self.pendientes,
+                'en_cola': max(0, self.pendientes - self.workers),
+                'max_observado': self.max_observado,
+                'completados': self.completados,
+                'rechazados': self.rechazados,
+                'ms_promedio': round(self.segundos * 1000 / self.completados, 1) if self.completados else None,
+            }
+
+
+pool_contrasenas = PoolContrasenas()
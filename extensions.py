@@ -1,4 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
+from media.store import MediaStore
+from cache import ResponseCache
 
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+media_store = MediaStore()
+response_cache = ResponseCache()
\ No newline at end of file
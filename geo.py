@@ -0,0 +1,343 @@
+import heapq
+import math
+from collections import namedtuple
+
+RADIO_TIERRA_KM = 6371.0088
+# Puntos por hoja del árbol k-d: por debajo de esto es más barato medir todos
+TAMANO_HOJA = 8
+# Zoom (escala de Leaflet/OSM) desde el que el mapa recibe centros sueltos
+ZOOM_CENTROS = 14
+# Lado de la celda de agrupación en píxeles de pantalla (256 px por tesela):
+# en el zoom z hay 2^(z+2) celdas por lado
+CELDAS_POR_TESELA_LOG2 = 2
+# Latitud máxima de la proyección de Mercator web
+LATITUD_MAXIMA = 85.05112878
+# Entradas por nodo del árbol STR de límites distritales
+CAPACIDAD_NODO = 8
+# Franjas horizontales por polígono para la prueba de punto en polígono
+MAX_FRANJAS = 4096
+
+
+def leer_coordenadas(args):
+    """(lat, lng) de ?lat=&lng=; ValueError si faltan o están fuera de rango."""
+    try:
+        lat = float(args['lat'])
+        lng = float(args['lng'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('lat y lng deben ser números')
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('lat/lng fuera de rango')
+    return lat, lng
+
+
+def leer_bbox(args):
+    """
+    (oeste, sur, este, norte) de ?bbox=oeste,sur,este,norte (el formato de
+    map.getBounds().toBBoxString() en Leaflet); ValueError si no es válido.
+    """
+    try:
+        oeste, sur, este, norte = (float(v) for v in args['bbox'].split(','))
+    except (KeyError, ValueError):
+        raise ValueError('bbox debe ser oeste,sur,este,norte')
+    if not (sur <= norte and oeste <= este):
+        raise ValueError('bbox invertido')
+    return max(oeste, -180.0), max(sur, -90.0), min(este, 180.0), min(norte, 90.0)
+
+
+def _mercator(lat, lng):
+    """(x, y) en [0, 1] de la proyección de Mercator web, y creciendo hacia el sur."""
+    lat = max(-LATITUD_MAXIMA, min(LATITUD_MAXIMA, lat))
+    seno = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + seno) / (1 - seno)) / (4 * math.pi)
+    return (lng + 180) / 360, y
+
+
+def _celda(x, y, zoom):
+    lado = 1 << (zoom + CELDAS_POR_TESELA_LOG2)
+    return min(int(x * lado), lado - 1), min(int(y * lado), lado - 1)
+
+
+def _vector(lat, lng):
+    """Punto de la esfera unidad: la distancia recta entre dos de estos
+    ordena igual que la distancia sobre la superficie (haversine)."""
+    p, l = math.radians(lat), math.radians(lng)
+    return (math.cos(p) * math.cos(l), math.cos(p) * math.sin(l), math.sin(p))
+
+
+def _cuerda_a_km(cuerda2):
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(cuerda2) / 2))
+
+
+def _km_a_cuerda2(km):
+    return (2 * math.sin(min(km / RADIO_TIERRA_KM, math.pi) / 2)) ** 2
+
+
+class ArbolCentros:
+    """
+    Índice espacial de los centros con coordenadas: árbol k-d sobre sus
+    puntos en la esfera unidad (x, y, z). Cada nodo parte por la mediana del
+    eje más extendido, así que se adapta a la densidad (Lima frente a la
+    selva). Para los k más cercanos solo se baja a las ramas que todavía
+    pueden tener algo más cerca que el k-ésimo encontrado, sin medir la
+    distancia a todos los centros del país.
+    """
+    __slots__ = ('centros', 'puntos', 'raiz')
+
+    def __init__(self, centros):
+        self.centros = [c for c in centros if c.latitud is not None and c.longitud is not None]
+        self.puntos = [_vector(c.latitud, c.longitud) for c in self.centros]
+        # Una lista por eje: ordenar con key=lista.__getitem__ no pasa por Python
+        ejes = [[p[e] for p in self.puntos] for e in range(3)]
+        self.raiz = self._construir(list(range(len(self.centros))), ejes) if self.centros else None
+
+    def _construir(self, indices, ejes):
+        """Nodo interno: tupla (eje, corte, izquierda, derecha); hoja: lista de índices."""
+        if len(indices) <= TAMANO_HOJA:
+            return indices
+        extension = []
+        for coordenadas in ejes:
+            valores = [coordenadas[i] for i in indices]
+            extension.append(max(valores) - min(valores))
+        eje = extension.index(max(extension))
+        indices.sort(key=ejes[eje].__getitem__)
+        medio = len(indices) // 2
+        return (eje, ejes[eje][indices[medio]],
+                self._construir(indices[:medio], ejes), self._construir(indices[medio:], ejes))
+
+    def cercanos(self, lat, lng, k, radio_km=None):
+        """[(distancia_km, centro)] de los k centros más cercanos, del más cercano al más lejano."""
+        if self.raiz is None or k < 1:
+            return []
+        qx, qy, qz = q = _vector(lat, lng)
+        limite = _km_a_cuerda2(radio_km) if radio_km is not None else math.inf
+        puntos = self.puntos
+        mejores = []  # montículo de (-distancia², índice) con los k mejores
+
+        def peor():
+            return -mejores[0][0] if len(mejores) == k else limite
+
+        def visitar(nodo):
+            if isinstance(nodo, tuple):
+                eje, corte, izquierda, derecha = nodo
+                diferencia = q[eje] - corte
+                cerca, lejos = (izquierda, derecha) if diferencia < 0 else (derecha, izquierda)
+                visitar(cerca)
+                if diferencia * diferencia < peor():
+                    visitar(lejos)
+                return
+            for i in nodo:
+                px, py, pz = puntos[i]
+                d2 = (px - qx) ** 2 + (py - qy) ** 2 + (pz - qz) ** 2
+                if d2 > limite:
+                    continue
+                if len(mejores) < k:
+                    heapq.heappush(mejores, (-d2, i))
+                elif d2 < -mejores[0][0]:
+                    heapq.heapreplace(mejores, (-d2, i))
+
+        visitar(self.raiz)
+        return [(_cuerda_a_km(-d2), self.centros[i]) for d2, i in sorted(mejores, reverse=True)]
+
+
+# Grupo de centros cercanos en un zoom: cantidad, centroide y, si la celda
+# tiene un solo centro, ese centro (se muestra como marcador normal)
+Grupo = namedtuple('Grupo', ['cantidad', 'lat', 'lng', 'centro'])
+
+
+class IndiceMapa:
+    """
+    Agrupación de marcadores precalculada para cada zoom de 0 a ZOOM_CENTROS.
+    Cada zoom divide el mapa en celdas de unos 64 px de pantalla y guarda por
+    celda cuántos centros tiene y su centroide. Una celda del zoom z es
+    exactamente cuatro del z + 1, así que cada nivel se arma sumando el de
+    abajo. Desde ZOOM_CENTROS cada celda guarda sus centros, sin agrupar.
+    """
+    __slots__ = ('niveles',)
+
+    def __init__(self, centros):
+        celdas = {}
+        for c in centros:
+            if c.latitud is None or c.longitud is None:
+                continue
+            celdas.setdefault(_celda(*_mercator(c.latitud, c.longitud), ZOOM_CENTROS), []).append(c)
+        self.niveles = [None] * (ZOOM_CENTROS + 1)
+        self.niveles[ZOOM_CENTROS] = {celda: tuple(cs) for celda, cs in celdas.items()}
+
+        # Acumuladores [cantidad, suma de latitudes, suma de longitudes, centro]
+        sumas = {}
+        for (cx, cy), cs in celdas.items():
+            sumas[cx, cy] = [len(cs), sum(c.latitud for c in cs), sum(c.longitud for c in cs),
+                             cs[0] if len(cs) == 1 else None]
+        for zoom in range(ZOOM_CENTROS - 1, -1, -1):
+            superiores = {}
+            for (cx, cy), (cantidad, lat, lng, centro) in sumas.items():
+                acumulado = superiores.get((cx >> 1, cy >> 1))
+                if acumulado is None:
+                    superiores[cx >> 1, cy >> 1] = [cantidad, lat, lng, centro]
+                else:
+                    acumulado[0] += cantidad
+                    acumulado[1] += lat
+                    acumulado[2] += lng
+                    acumulado[3] = None
+            sumas = superiores
+            self.niveles[zoom] = {
+                celda: Grupo(cantidad, lat / cantidad, lng / cantidad, centro)
+                for celda, (cantidad, lat, lng, centro) in sumas.items()
+            }
+
+    def _celdas(self, zoom, oeste, sur, este, norte):
+        """Valores de las celdas del zoom que tocan el recuadro."""
+        nivel = self.niveles[zoom]
+        x0, y0 = _celda(*_mercator(norte, oeste), zoom)
+        x1, y1 = _celda(*_mercator(sur, este), zoom)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(nivel):
+            # Recuadro con más celdas que ocupadas: se recorren las ocupadas
+            return [v for (cx, cy), v in nivel.items() if x0 <= cx <= x1 and y0 <= cy <= y1]
+        return [nivel[cx, cy] for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1) if (cx, cy) in nivel]
+
+    def en_vista(self, oeste, sur, este, norte, zoom):
+        """
+        (centros, grupos) a mostrar en el recuadro con ese zoom. Desde
+        ZOOM_CENTROS solo hay centros, exactamente los del recuadro; por
+        debajo, los grupos de las celdas visibles y los centros que están
+        solos en su celda.
+        """
+        zoom = max(0, min(ZOOM_CENTROS, zoom))
+        if zoom == ZOOM_CENTROS:
+            centros = [c for cs in self._celdas(zoom, oeste, sur, este, norte) for c in cs
+                       if sur <= c.latitud <= norte and oeste <= c.longitud <= este]
+            return centros, []
+        centros, grupos = [], []
+        for grupo in self._celdas(zoom, oeste, sur, este, norte):
+            if grupo.centro is not None:
+                centros.append(grupo.centro)
+            else:
+                grupos.append(grupo)
+        return centros, grupos
+
+
+def indice_mapa(instantanea):
+    """IndiceMapa de los centros de la instantánea (lectura.py), uno por versión."""
+    return instantanea.derivado('indice_mapa', lambda i: IndiceMapa(i.centros))
+
+
+class _Poligono:
+    """
+    Un distrito (Polygon o MultiPolygon con sus huecos) para la prueba de
+    punto en polígono por cruces de rayo. Los lados se reparten en franjas
+    horizontales: un punto solo se compara con los lados de su franja, no
+    con los miles de vértices del límite.
+    """
+    __slots__ = ('nombre', 'caja', 'y0', 'alto_franja', 'franjas')
+
+    def __init__(self, nombre, anillos):
+        self.nombre = nombre
+        lados = []
+        for anillo in anillos:
+            # Cada lado con su extremo inferior primero; los horizontales no cruzan el rayo
+            lados.extend((x1, y1, x2, y2) if y1 < y2 else (x2, y2, x1, y1)
+                         for (x1, y1), (x2, y2) in zip(anillo, anillo[1:] + anillo[:1]) if y1 != y2)
+        xs = [x for anillo in anillos for x, _ in anillo]
+        ys = [y for anillo in anillos for _, y in anillo]
+        self.caja = (min(xs), min(ys), max(xs), max(ys))
+        y0 = self.y0 = self.caja[1]
+        # Unos dos lados por franja, pero no franjas más bajas que el lado
+        # promedio: cada lado se copia en todas las franjas que cruza
+        alto_lado = sum(lado[3] - lado[1] for lado in lados) / len(lados) if lados else 1.0
+        cantidad = max(1, min(len(lados) // 2, int((self.caja[3] - y0) / alto_lado), MAX_FRANJAS))
+        alto = self.alto_franja = (self.caja[3] - y0) / cantidad or 1.0
+        ultima = cantidad - 1
+        franjas = [[] for _ in range(cantidad)]
+        for lado in lados:
+            desde = min(ultima, int((lado[1] - y0) / alto))
+            hasta = min(ultima, int((lado[3] - y0) / alto))
+            if desde == hasta:
+                franjas[desde].append(lado)
+            else:
+                for i in range(desde, hasta + 1):
+                    franjas[i].append(lado)
+        self.franjas = [tuple(f) for f in franjas]
+
+    def _franja(self, y, cantidad):
+        return max(0, min(cantidad - 1, int((y - self.y0) / self.alto_franja)))
+
+    def contiene(self, x, y):
+        x0, y0, x1, y1 = self.caja
+        if not (x0 <= x <= x1 and y0 <= y <= y1):
+            return False
+        dentro = False
+        for ax, ay, bx, by in self.franjas[self._franja(y, len(self.franjas))]:
+            if ay <= y < by and x < ax + (y - ay) * (bx - ax) / (by - ay):
+                dentro = not dentro
+        return dentro
+
+
+def _anillos(geometria):
+    """Anillos [(lng, lat)...] de una geometría GeoJSON Polygon o MultiPolygon."""
+    if geometria['type'] == 'Polygon':
+        poligonos = [geometria['coordinates']]
+    elif geometria['type'] == 'MultiPolygon':
+        poligonos = geometria['coordinates']
+    else:
+        return []
+    return [[(float(p[0]), float(p[1])) for p in anillo] for poligono in poligonos for anillo in poligono]
+
+
+class IndiceDistritos:
+    """
+    Límites distritales en un árbol STR (Sort-Tile-Recursive): las cajas de
+    los distritos se ordenan por x, se cortan en columnas, cada columna se
+    ordena por y y se agrupa de CAPACIDAD_NODO en CAPACIDAD_NODO; lo mismo
+    con los nodos resultantes hasta llegar a la raíz. Un punto baja solo por
+    las cajas que lo contienen y al final se prueba contra uno o dos
+    polígonos.
+    """
+    __slots__ = ('poligonos', 'raiz')
+
+    def __init__(self, poligonos):
+        self.poligonos = poligonos
+        # Nodo: (caja, hijos, es_hoja); en las hojas los hijos son polígonos
+        nivel = [(p.caja, p, True) for p in poligonos]
+        while len(nivel) > CAPACIDAD_NODO:
+            nivel = self._empaquetar(nivel)
+        self.raiz = (self._caja([n[0] for n in nivel]) if nivel else None, nivel, False)
+
+    @classmethod
+    def desde_geojson(cls, datos, campo):
+        """Índice de un FeatureCollection cuyas features tienen el nombre en properties[campo]."""
+        poligonos = []
+        for feature in datos.get('features', ()):
+            anillos = _anillos(feature.get('geometry') or {'type': None})
+            if anillos:
+                poligonos.append(_Poligono(feature['properties'][campo], anillos))
+        return cls(poligonos)
+
+    @staticmethod
+    def _caja(cajas):
+        return (min(c[0] for c in cajas), min(c[1] for c in cajas),
+                max(c[2] for c in cajas), max(c[3] for c in cajas))
+
+    def _empaquetar(self, nodos):
+        hojas = math.ceil(len(nodos) / CAPACIDAD_NODO)
+        por_columna = math.ceil(math.sqrt(hojas)) * CAPACIDAD_NODO
+        nodos = sorted(nodos, key=lambda n: n[0][0] + n[0][2])
+        superiores = []
+        for i in range(0, len(nodos), por_columna):
+            columna = sorted(nodos[i:i + por_columna], key=lambda n: n[0][1] + n[0][3])
+            for j in range(0, len(columna), CAPACIDAD_NODO):
+                hijos = columna[j:j + CAPACIDAD_NODO]
+                superiores.append((self._caja([n[0] for n in hijos]), hijos, False))
+        return superiores
+
+    def distrito_en(self, lat, lng):
+        """Nombre del distrito que contiene el punto, o None si cae fuera de todos."""
+        pendientes = [self.raiz] if self.raiz and self.raiz[0] else []
+        while pendientes:
+            _, hijos, _ = pendientes.pop()
+            for caja, hijo, es_hoja in hijos:
+                if caja[0] <= lng <= caja[2] and caja[1] <= lat <= caja[3]:
+                    if not es_hoja:
+                        pendientes.append((caja, hijo, False))
+                    elif hijo.contiene(lng, lat):
+                        return hijo.nombre
+        return None
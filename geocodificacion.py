@@ -0,0 +1,184 @@
+import csv
+import json
+import os
+import time
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, or_, select, update
+
+from busqueda import normalizar_lote
+from extensions import db
+from models import CentrosVotacion, VersionesDatos
+from teselas import almacen_teselas
+
+# Centros por UPDATE de varias filas
+LOTE_ACTUALIZACION = 1000
+# Palabras del inicio de la dirección que no son parte del nombre de la vía
+TIPOS_VIA = frozenset('av avda avenida jr jiron ca calle cl psje pje pasaje prol prolongacion'.split())
+# Desde estas palabras (o desde un número) sigue la numeración, no la vía
+FIN_VIA = frozenset('n nro no num numero s sn mz lt km cdra cuadra int dpto'.split())
+# Precisión de cada resultado, de mejor a peor
+PRECISIONES = ('via', 'distrito')
+
+
+def clave_via(direccion):
+    """
+    'av jose galvez 500 frente al parque' (ya normalizada) -> 'jose galvez'.
+    Un número al inicio es parte del nombre ('av 28 de julio 1250' ->
+    '28 de julio') salvo que no le siga nada o siga la numeración ('av 500 int 3').
+    """
+    palabras = direccion.split()
+    inicio = 0
+    while inicio < len(palabras) and palabras[inicio] in TIPOS_VIA:
+        inicio += 1
+    via = []
+    for i in range(inicio, len(palabras)):
+        palabra = palabras[i]
+        if palabra in FIN_VIA:
+            break
+        if palabra.isdigit():
+            siguiente = palabras[i + 1] if i + 1 < len(palabras) else None
+            if via or siguiente is None or siguiente in FIN_VIA:
+                break
+        via.append(palabra)
+    return ' '.join(via)
+
+
+def _firma(archivo):
+    info = os.stat(archivo)
+    return [info.st_size, int(info.st_mtime)]
+
+
+class Nomenclator:
+    """
+    Vías y distritos de un CSV local con columnas distrito, via, latitud,
+    longitud. Una fila con via vacía es el centroide del distrito; si una
+    vía aparece en varias filas (tramos), se usa el promedio.
+    """
+
+    def __init__(self, archivo, encoding='utf-8', separador=','):
+        with open(archivo, encoding=encoding, newline='') as f:
+            filas = [
+                fila for fila in csv.DictReader(f, delimiter=separador)
+                if fila.get('latitud') and fila.get('longitud')
+            ]
+        distritos = normalizar_lote(fila['distrito'] for fila in filas)
+        vias = normalizar_lote(fila.get('via') for fila in filas)
+
+        sumas = {}
+        for fila, distrito, via in zip(filas, distritos, vias):
+            if via:
+                clave = (distrito, clave_via(via))
+                if not clave[1]:
+                    # Vía sin nombre reconocible: no se mezcla con otras en (distrito, '')
+                    continue
+            else:
+                clave = (distrito, None)
+            suma = sumas.setdefault(clave, [0, 0.0, 0.0])
+            suma[0] += 1
+            suma[1] += float(fila['latitud'])
+            suma[2] += float(fila['longitud'])
+        self.puntos = {clave: (lat / n, lng / n) for clave, (n, lat, lng) in sumas.items()}
+
+    def __len__(self):
+        return len(self.puntos)
+
+    def resolver(self, distrito, direccion):
+        """[lat, lng, precisión] de una dirección y distrito ya normalizados, o None."""
+        via = clave_via(direccion)
+        if via and (distrito, via) in self.puntos:
+            return [*self.puntos[distrito, via], 'via']
+        if (distrito, None) in self.puntos:
+            return [*self.puntos[distrito, None], 'distrito']
+        return None
+
+
+def _leer_cache(ruta, firma):
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache['resultados'] if cache.get('firma') == firma else {}
+
+
+def _guardar_cache(ruta, firma, resultados):
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'firma': firma, 'resultados': resultados}, f, ensure_ascii=False)
+    os.replace(ruta + '.tmp', ruta)
+
+
+@click.command('geocodificar')
+@click.argument('nomenclator', type=click.Path(exists=True, dir_okay=False))
+@click.option('--encoding', default='utf-8')
+@click.option('--separador', default=',', help='Separador de campos del CSV.')
+@click.option('--precision', type=click.Choice(PRECISIONES), default='distrito',
+              help='Peor precisión aceptada: via o distrito (centroide del distrito).')
+@click.option('--cache', 'ruta_cache', default=None,
+              help='Archivo de resultados ya resueltos (por defecto NOMENCLATOR.cache.json).')
+@click.option('--todos', is_flag=True, help='Geocodifica también los centros que ya tienen coordenadas.')
+@click.option('--simular', is_flag=True, help='Resuelve y muestra el resumen sin escribir en la BD.')
+@with_appcontext
+def geocodificar_centros(nomenclator, encoding, separador, precision, ruta_cache, todos, simular):
+    """
+    Completa latitud/longitud de los centros desde un nomenclátor local
+    (flask mapa geocodificar NOMENCLATOR), sin servicios externos.
+
+    Direcciones y distritos se normalizan en bloque y cada dirección
+    distinta se resuelve una sola vez con búsquedas en diccionario. Los
+    resultados (también los fallidos) se guardan en un cache en disco que
+    vale mientras no cambie el nomenclátor.
+    """
+    inicio = time.monotonic()
+    ruta_cache = ruta_cache or nomenclator + '.cache.json'
+    firma = _firma(nomenclator)
+    cache = _leer_cache(ruta_cache, firma)
+
+    consulta = select(CentrosVotacion.id_centro, CentrosVotacion.direccion, CentrosVotacion.distrito)
+    if not todos:
+        consulta = consulta.where(or_(CentrosVotacion.latitud.is_(None), CentrosVotacion.longitud.is_(None)))
+    centros = db.session.execute(consulta).all()
+    print(f"{len(centros):,} centros por geocodificar.")
+
+    direcciones = normalizar_lote(c.direccion for c in centros)
+    distritos = normalizar_lote(c.distrito for c in centros)
+    claves = [f"{distrito}\t{direccion}" for distrito, direccion in zip(distritos, direcciones)]
+
+    pendientes = {clave for clave in claves if clave not in cache}
+    if pendientes:
+        indice = Nomenclator(nomenclator, encoding, separador)
+        print(f"Nomenclátor: {len(indice):,} vías y distritos; {len(pendientes):,} direcciones nuevas.")
+        for clave in pendientes:
+            cache[clave] = indice.resolver(*clave.split('\t'))
+        _guardar_cache(ruta_cache, firma, cache)
+
+    aceptadas = PRECISIONES[:PRECISIONES.index(precision) + 1]
+    cambios, por_precision, sin_resolver = [], dict.fromkeys(PRECISIONES, 0), []
+    for centro, clave in zip(centros, claves):
+        resultado = cache[clave]
+        if resultado is None or resultado[2] not in aceptadas:
+            sin_resolver.append(centro)
+            continue
+        por_precision[resultado[2]] += 1
+        cambios.append({'b_id': centro.id_centro, 'b_lat': resultado[0], 'b_lng': resultado[1]})
+
+    if cambios and not simular:
+        tabla = CentrosVotacion.__table__
+        sentencia = (
+            update(tabla)
+            .where(tabla.c.id_centro == bindparam('b_id'))
+            .values(latitud=bindparam('b_lat'), longitud=bindparam('b_lng'))
+        )
+        for i in range(0, len(cambios), LOTE_ACTUALIZACION):
+            db.session.execute(sentencia, cambios[i:i + LOTE_ACTUALIZACION])
+        # El modelo de lectura y las teselas se regeneran con la versión nueva
+        VersionesDatos.incrementar('CentrosVotacion')
+        db.session.commit()
+        print(f"{almacen_teselas.generar_vigentes():,} teselas generadas.")
+
+    print(f"{'Se resolverían' if simular else 'Geocodificados'} {len(cambios):,} centros "
+          f"({por_precision['via']:,} por vía, {por_precision['distrito']:,} por distrito) "
+          f"en {time.monotonic() - inicio:.1f} s; {len(sin_resolver):,} sin resolver.")
+    for centro in sin_resolver[:10]:
+        print(f"  sin resolver: {centro.id_centro} {centro.direccion!r} ({centro.distrito})")
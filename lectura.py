@@ -0,0 +1,232 @@
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from flask import current_app, g
+from sqlalchemy import select
+
+from extensions import db, response_cache
+from models import Candidatos, CentrosVotacion, Mesas, PartidosPoliticos
+
+# Tablas de referencia que cubre la instantánea (nombres de VersionesDatos)
+TABLAS = ('PartidosPoliticos', 'candidatos', 'CentrosVotacion', 'Mesas')
+
+
+def _registro(nombre, modelo):
+    """Tupla con nombre (inmutable, sin __dict__) con las columnas de `modelo`."""
+    return namedtuple(nombre, [c.key for c in modelo.__table__.columns])
+
+
+Partido = _registro('Partido', PartidosPoliticos)
+Candidato = _registro('Candidato', Candidatos)
+Centro = _registro('Centro', CentrosVotacion)
+Mesa = _registro('Mesa', Mesas)
+
+
+def _leer(registro, modelo, **conversiones):
+    """Filas de la tabla completa como `registro`, sin pasar por el ORM."""
+    filas = db.session.execute(select(modelo.__table__)).all()
+    if not conversiones:
+        return [registro(*fila) for fila in filas]
+    posiciones = [(registro._fields.index(campo), fn) for campo, fn in conversiones.items()]
+    registros = []
+    for fila in filas:
+        valores = list(fila)
+        for i, fn in posiciones:
+            if valores[i] is not None:
+                valores[i] = fn(valores[i])
+        registros.append(registro(*valores))
+    return registros
+
+
+def _indice(registros, campo):
+    """{valor de `campo`: (registros...)} de solo lectura."""
+    grupos = {}
+    for r in registros:
+        grupos.setdefault(getattr(r, campo), []).append(r)
+    return MappingProxyType({valor: tuple(rs) for valor, rs in grupos.items()})
+
+
+def clave_mesa(numero_mesa):
+    """
+    Orden de las mesas: numérico si numero_mesa son solo dígitos ('9' antes
+    que '10', con o sin ceros a la izquierda) y, después, el resto por texto.
+    """
+    if numero_mesa.isascii() and numero_mesa.isdigit():
+        return 0, int(numero_mesa), numero_mesa
+    return 1, 0, numero_mesa
+
+
+def _por_id(registros, campo):
+    return MappingProxyType({getattr(r, campo): r for r in registros})
+
+
+class Instantanea:
+    """
+    Copia inmutable de partidos, candidatos, centros de votación y mesas,
+    con índices por id, región, partido, distrito y centro. Los listados van en el
+    orden en que los devuelve la API (ver main/routes.py).
+    """
+    __slots__ = ('versiones', 'partidos', 'partidos_por_id',
+                 'candidatos', 'candidatos_por_id', 'candidatos_por_region', 'candidatos_por_partido',
+                 'centros', 'centros_por_id', 'centros_por_distrito',
+                 'mesas_por_id', 'mesas_por_centro', '_derivados')
+
+    def __init__(self, versiones):
+        self.versiones = MappingProxyType(dict(zip(TABLAS, versiones)))
+
+        partidos = _leer(Partido, PartidosPoliticos)
+        partidos.sort(key=lambda p: (p.nombre_partido, p.id_partido))
+        self.partidos = tuple(partidos)
+        self.partidos_por_id = _por_id(partidos, 'id_partido')
+
+        candidatos = _leer(Candidato, Candidatos)
+        candidatos.sort(key=lambda c: c.id)
+        self.candidatos = tuple(candidatos)
+        self.candidatos_por_id = _por_id(candidatos, 'id')
+        self.candidatos_por_region = _indice(candidatos, 'region')
+        self.candidatos_por_partido = _indice(candidatos, 'partido_politico_id')
+
+        # Coordenadas como float: se serializan tal cual en cada respuesta
+        centros = _leer(Centro, CentrosVotacion, latitud=float, longitud=float)
+        centros.sort(key=lambda c: c.id_centro)
+        self.centros = tuple(centros)
+        self.centros_por_id = _por_id(centros, 'id_centro')
+        self.centros_por_distrito = _indice(centros, 'distrito')
+
+        mesas = _leer(Mesa, Mesas)
+        mesas.sort(key=lambda m: clave_mesa(m.numero_mesa))
+        self.mesas_por_id = _por_id(mesas, 'id_mesa')
+        self.mesas_por_centro = _indice(mesas, 'id_centro')
+
+        self._derivados = {}
+
+    def version(self, tablas):
+        return tuple(self.versiones[t] for t in tablas)
+
+    def partido_de(self, candidato):
+        return self.partidos_por_id.get(candidato.partido_politico_id)
+
+    def resumen_centros(self):
+        """
+        Cada centro con su cantidad de mesas, la primera y la última
+        (por numero_mesa, ver clave_mesa) y una ubicacion_detalle representativa (la de la
+        primera mesa que la tenga). Sale de las mesas ya agrupadas por
+        centro, sin una consulta por centro; se arma una vez por versión.
+        """
+        return self.derivado('resumen_centros', _resumir_centros)
+
+    def resumen_de(self, id_centro):
+        """Entrada de resumen_centros() del centro `id_centro`, o None."""
+        por_id = self.derivado('resumen_por_centro', lambda i: {r['id_centro']: r for r in i.resumen_centros()})
+        return por_id.get(id_centro)
+
+    def derivado(self, nombre, construir):
+        """
+        Estructura calculada a partir de esta instantánea (índice espacial,
+        respuestas armadas...), construida una sola vez con `construir(self)`.
+        Se descarta junto con la instantánea, así que nunca queda desfasada.
+        """
+        valor = self._derivados.get(nombre)
+        if valor is None:
+            valor = self._derivados.setdefault(nombre, construir(self))
+        return valor
+
+
+def _resumir_centros(instantanea):
+    resumen = []
+    for c in instantanea.centros:
+        mesas = instantanea.mesas_por_centro.get(c.id_centro, ())
+        resumen.append({
+            'id_centro': c.id_centro,
+            'nombre': c.nombre,
+            'distrito': c.distrito,
+            'latitud': c.latitud,
+            'longitud': c.longitud,
+            'mesas': len(mesas),
+            'ubicacion_detalle': next((m.ubicacion_detalle for m in mesas if m.ubicacion_detalle), None),
+            'primera_mesa': mesas[0].numero_mesa if mesas else None,
+            'ultima_mesa': mesas[-1].numero_mesa if mesas else None,
+        })
+    return tuple(resumen)
+
+
+class ModeloLectura:
+    """
+    Modelo de lectura en memoria para los datos de referencia, que solo
+    cambian cuando corre un scraper o una importación. Las vistas leen de `actual()` y no
+    tocan MySQL. Cuando VersionesDatos trae una versión nueva, la
+    instantánea siguiente se carga en un hilo aparte y se publica con una
+    sola asignación; mientras tanto se sigue sirviendo la anterior, así que
+    ninguna lectura espera a la BD salvo la primera del proceso.
+    """
+
+    def __init__(self, app=None):
+        self._actual = None
+        self._lock = threading.Lock()
+        self._recargando = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['modelo_lectura'] = self
+        # Las respuestas cacheadas se etiquetan con la versión de la
+        # instantánea que las generó, no con la última de VersionesDatos
+        response_cache.version_vistas = self.versiones
+
+    def actual(self):
+        """
+        Instantanea vigente. Dentro de una petición siempre es la misma,
+        aunque se publique otra a mitad de camino.
+        """
+        if 'instantanea' in g:
+            return g.instantanea
+        g.instantanea = self._instantanea()
+        return g.instantanea
+
+    def _instantanea(self):
+        instantanea = self._actual
+        version = response_cache.versiones(TABLAS)
+        if instantanea is None:
+            with self._lock:
+                if self._actual is None:
+                    self._actual = Instantanea(version)
+                return self._actual
+        if instantanea.version(TABLAS) != version and not self._recargando:
+            with self._lock:
+                if not self._recargando:
+                    self._recargando = True
+                    threading.Thread(
+                        target=self._recargar,
+                        args=(current_app._get_current_object(), version),
+                        daemon=True,
+                    ).start()
+        return instantanea
+
+    def recargar(self):
+        """
+        Carga ya la instantánea de los datos confirmados y la publica. Para
+        los comandos que acaban de importar datos, que no pueden esperar
+        a la recarga en segundo plano.
+        """
+        response_cache.invalidar_versiones()
+        self._actual = g.instantanea = Instantanea(response_cache.versiones(TABLAS))
+        return self._actual
+
+    def _recargar(self, app, version):
+        try:
+            with app.app_context():
+                self._actual = Instantanea(version)
+        except Exception as e:
+            print(f"Error al recargar el modelo de lectura: {e}")
+        finally:
+            self._recargando = False
+
+    def versiones(self, tablas):
+        """Versión de `tablas` con la que responden las vistas."""
+        if not set(tablas) <= set(TABLAS):
+            return response_cache.versiones(tablas)
+        return self.actual().version(tablas)
+
+
+modelo_lectura = ModeloLectura()
@@ -0,0 +1,39 @@
+import json
+import threading
+
+from geo import IndiceDistritos
+
+
+class LimitesDistritales:
+    """
+    Límites de los distritos (GeoJSON local, DISTRITOS_GEOJSON) en un
+    IndiceDistritos. El archivo no cambia con los datos de la BD: se lee
+    una sola vez por proceso, en la primera consulta. No se distribuye con
+    el repositorio; config.py indica de dónde obtenerlo.
+    """
+
+    def __init__(self, app=None):
+        self.ruta = None
+        self.campo = None
+        self._indice = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ruta = app.config['DISTRITOS_GEOJSON']
+        self.campo = app.config['DISTRITOS_CAMPO_NOMBRE']
+        app.extensions['limites_distritales'] = self
+
+    def indice(self):
+        """IndiceDistritos cargado; OSError si el archivo no está."""
+        if self._indice is None:
+            with self._lock:
+                if self._indice is None:
+                    with open(self.ruta, encoding='utf-8') as f:
+                        self._indice = IndiceDistritos.desde_geojson(json.load(f), self.campo)
+                    print(f"Límites distritales: {len(self._indice.poligonos)} distritos cargados.")
+        return self._indice
+
+
+limites_distritales = LimitesDistritales()
@@ -1,92 +1,260 @@
-import base64
-from flask import Blueprint, render_template, jsonify, request
-from werkzeug.security import generate_password_hash, check_password_hash
-from models import PartidosPoliticos, CentrosVotacion, Candidatos, Usuarios, Mesas
-from extensions import db
+import hmac
+from functools import wraps
+
+from flask import Blueprint, current_app, render_template, jsonify, request, url_for, abort
+from models import Usuarios, Mesas
+from extensions import db, response_cache
+from media.routes import enviar_media
+from compresion import paginas_estaticas
+from paginacion import LIMITE_MAXIMO, CursorInvalido, leer_parametros, paginar
+from campos import CampoInvalido, leer_campos, serializar
+from busqueda import FUENTES, LIMITE_SUGERENCIAS, MAX_SUGERENCIAS, indice_busqueda, normalizar
+from lectura import modelo_lectura
+from padron import normalizar_dni, padron
+from contrasenas import HashingSaturado, pool_contrasenas
 
 main = Blueprint('main', __name__)
 
 @main.route('/')
 def index():
-    """Ruta principal (web)."""
-    centros_query = CentrosVotacion.query.all()
-    centros = [
-        {
-            "id_centro": c.id_centro,
-            "nombre": c.nombre,
-            "distrito": c.distrito,
-            "latitud": float(c.latitud) if c.latitud is not None else None,
-            "longitud": float(c.longitud) if c.longitud is not None else None,
-            "ubicacion_detalle": c.mesas[0].ubicacion_detalle if c.mesas else None
-        }
-        for c in centros_query
-    ]
-    return render_template('index.html', centros=centros)
+    """Ruta principal (web). Los centros llegan aparte, en las teselas del mapa."""
+    return render_template('index.html')
 
 # --- INICIO: API PARA LA APP MÓVIL ---
 
+# Coincidencias que devuelve el modo difuso (?fuzzy=1) si no se pasa ?limit=
+LIMITE_FUZZY = 50
+
+
+def _es_fuzzy():
+    return request.args.get('fuzzy', '').lower() in ('1', 'true', 'si')
+
+
+def _limite_fuzzy():
+    return min(request.args.get('limit', LIMITE_FUZZY, type=int), LIMITE_MAXIMO)
+
+
+def _logo_url(sha256):
+    # El logo ya no viaja en base64: se entrega la URL inmutable del
+    # almacén de medios para que el cliente lo descargue (y cachee) aparte.
+    return url_for('media.get_media', sha256=sha256) if sha256 else None
+
+
+def _contiene(texto, buscado):
+    """ILIKE '%buscado%' en memoria: `buscado` ya viene normalizado (sin tildes)."""
+    return buscado in normalizar(texto or '')
+
+
+# Campos de /api/partidos y cómo se serializa cada uno a partir del registro
+# de la instantánea; ?fields= elige un subconjunto.
+CAMPOS_PARTIDO = {
+    'id_partido': lambda p: p.id_partido,
+    'jne_id_simbolo': lambda p: p.jne_id_simbolo,
+    'nombre_partido': lambda p: p.nombre_partido,
+    'siglas': lambda p: p.siglas,
+    'fecha_inscripcion': lambda p: p.fecha_inscripcion.isoformat() if p.fecha_inscripcion else None,
+    # URL del logo (ver /media/<sha256>, admite ?size=<px>)
+    'logo_url': lambda p: _logo_url(p.logo_sha256),
+    'logo_placeholder': lambda p: p.logo_placeholder,
+    'direccion_legal': lambda p: p.direccion_legal,
+    'telefonos': lambda p: p.telefonos,
+    'sitio_web': lambda p: p.sitio_web,
+    'email_contacto': lambda p: p.email_contacto,
+    'personero_titular': lambda p: p.personero_titular,
+    'personero_alterno': lambda p: p.personero_alterno,
+    'ideologia': lambda p: p.ideologia,
+}
+
+
 @main.route('/api/partidos')
+@response_cache.cached('PartidosPoliticos')
 def get_partidos():
     """
     Endpoint de API para obtener todos los partidos políticos
     y servirlos a la app de React Native.
+    Con ?limit=N[&after=<cursor>] responde {"items": [...], "next_cursor": ...}.
+    Con ?fields=a,b solo se devuelven esos campos.
+    ?nombre_partido=texto filtra por nombre o siglas; con &fuzzy=1 tolera
+    erratas y devuelve las coincidencias más parecidas primero.
+    Se lee del modelo de lectura en memoria (lectura.py), no de MySQL.
     """
     try:
-        # Consultar la base de datos usando el modelo PartidosPoliticos
-        partidos = PartidosPoliticos.query.all()
-        
-        lista_partidos_json = []
-        for partido in partidos:
-            
-            # Codificar el logo BLOB a base64 para enviarlo como string en el JSON
-            # La app móvil puede decodificar esto para mostrar la imagen.
-            logo_base64 = None
-            if partido.logo_blob:
-                # 'utf-8' es el encoding del string base64, no de la imagen
-                logo_base64 = base64.b64encode(partido.logo_blob).decode('utf-8')
-
-            lista_partidos_json.append({
-                'id_partido': partido.id_partido,
-                'jne_id_simbolo': partido.jne_id_simbolo,
-                'nombre_partido': partido.nombre_partido,
-                'siglas': partido.siglas,
-                'fecha_inscripcion': partido.fecha_inscripcion.isoformat() if partido.fecha_inscripcion else None,
-                
-                # Devuelve el logo como un string base64
-                'logo_base64': logo_base64, 
-                
-                'direccion_legal': partido.direccion_legal,
-                'telefonos': partido.telefonos,
-                'sitio_web': partido.sitio_web,
-                'email_contacto': partido.email_contacto,
-                'personero_titular': partido.personero_titular,
-                'personero_alterno': partido.personero_alterno,
-                'ideologia': partido.ideologia
-            })
+        nombre_partido = request.args.get('nombre_partido', None)
+        fuzzy = _es_fuzzy() and nombre_partido
+
+        # Paginación opcional por clave: ?limit=&after=<next_cursor>
+        pagina = None if fuzzy else leer_parametros(request.args)
+        campos = leer_campos(request.args, CAMPOS_PARTIDO)
+        instantanea = modelo_lectura.actual()
+
+        # La instantánea ya viene ordenada por (nombre_partido, id_partido)
+        if fuzzy:
+            # Índice de trigramas en memoria (busqueda.py): por similitud
+            partidos = [
+                instantanea.partidos_por_id[doc['id']]
+                for _, doc in indice_busqueda.similares('partido', nombre_partido, _limite_fuzzy())
+            ]
+        elif nombre_partido:
+            buscado = normalizar(nombre_partido)
+            partidos = [
+                p for p in instantanea.partidos
+                if _contiene(p.nombre_partido, buscado) or _contiene(p.siglas, buscado)
+            ]
+        else:
+            partidos = instantanea.partidos
+
+        if pagina is not None:
+            partidos, next_cursor = paginar(partidos, ('nombre_partido', 'id_partido'), *pagina)
+
+        lista_partidos_json = [serializar(campos, CAMPOS_PARTIDO, partido) for partido in partidos]
             
         # Devolver la lista de partidos como una respuesta JSON
-        return jsonify(lista_partidos_json)
+        if pagina is None:
+            return jsonify(lista_partidos_json)
+        return jsonify({'items': lista_partidos_json, 'next_cursor': next_cursor})
 
+    except (CursorInvalido, CampoInvalido) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error en /api/partidos: {e}")
         # Devolver un error 500 en formato JSON si algo falla
         return jsonify({"error": str(e)}), 500
 
+
+@main.route('/api/partidos/<id_partido>/logo')
+def get_partido_logo(id_partido):
+    """
+    Devuelve el logo del partido como bytes crudos (no base64),
+    con ETag fuerte (el sha256); el cliente revalida con If-None-Match.
+    """
+    partido = modelo_lectura.actual().partidos_por_id.get(id_partido)
+    if partido is None or not partido.logo_sha256:
+        abort(404)
+    # La URL por id cambia de imagen al volver a scrapear: sin caché larga
+    return enviar_media(partido.logo_sha256, immutable=False)
+
+@main.route('/api/search')
+def api_search():
+    """
+    Búsqueda unificada sobre candidatos, partidos (nombre, siglas) y centros
+    de votación (nombre, dirección, distrito), sin distinguir tildes ni
+    mayúsculas. ?q=texto[&tipo=candidato|partido|centro][&limit=20]
+    Con &fuzzy=1 tolera erratas (similitud de trigramas sobre el título).
+    "truncado": true indica que el último término era un prefijo demasiado
+    corto y total/resultados son parciales (conviene seguir escribiendo).
+    """
+    q = request.args.get('q', '')
+    tipo = request.args.get('tipo')
+    limite = min(request.args.get('limit', 20, type=int), 100)
+
+    if tipo and tipo not in FUENTES:
+        return jsonify({'error': f"tipo debe ser uno de: {', '.join(FUENTES)}"}), 400
+
+    try:
+        total, resultados, truncado = indice_busqueda.buscar(
+            q, tipos=[tipo] if tipo else None, limite=limite, fuzzy=_es_fuzzy()
+        )
+        return jsonify({'q': q, 'total': total, 'resultados': resultados, 'truncado': truncado})
+    except Exception as e:
+        print(f"Error en /api/search: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@main.route('/api/autocomplete')
+def api_autocomplete():
+    """
+    Sugerencias para los buscadores mientras se escribe (nombres de
+    candidatos, partidos o siglas y centros): ?q=prefijo[&tipo=...][&limit=8]
+    Solo lee el índice en memoria, así que se puede llamar en cada tecla.
+    """
+    q = request.args.get('q', '')
+    tipo = request.args.get('tipo')
+    limite = min(request.args.get('limit', LIMITE_SUGERENCIAS, type=int), MAX_SUGERENCIAS)
+
+    if tipo and tipo not in FUENTES:
+        return jsonify({'error': f"tipo debe ser uno de: {', '.join(FUENTES)}"}), 400
+
+    try:
+        sugerencias = indice_busqueda.sugerir(q, tipos=[tipo] if tipo else None, limite=limite)
+        return jsonify({'q': q, 'sugerencias': sugerencias})
+    except Exception as e:
+        print(f"Error en /api/autocomplete: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@main.route('/api/local-votacion/<dni>')
+def local_votacion(dni):
+    """
+    ¿Dónde voto? Mesa y centro de votación del elector con ese DNI:
+    numero_mesa, ubicacion_detalle y el centro con sus coordenadas.
+    Se resuelve en memoria (padron.py), sin pasar por la caché de
+    respuestas: una entrada por DNI desplazaría a las demás.
+    """
+    numero = normalizar_dni(dni)
+    if numero is None:
+        return jsonify({'error': 'El DNI debe tener 8 dígitos'}), 400
+
+    try:
+        local = padron.local_de(numero)
+        if local is None:
+            return jsonify({'error': 'DNI no encontrado en el padrón'}), 404
+        return jsonify(local)
+    except Exception as e:
+        print(f"Error en /api/local-votacion: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+def _requiere_token_stats(vista):
+    """
+    Los contadores internos no son públicos: sin STATS_TOKEN en la config
+    la ruta responde 404, y con él hay que mandarlo en la cabecera
+    X-Stats-Token (403 si no coincide).
+    """
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        token = current_app.config.get('STATS_TOKEN')
+        if not token:
+            abort(404)
+        enviado = request.headers.get('X-Stats-Token', '')
+        if not hmac.compare_digest(enviado.encode(), token.encode()):
+            return jsonify({'error': 'Forbidden'}), 403
+        return vista(*args, **kwargs)
+    return envoltura
+
+
+@main.route('/api/cache/stats')
+@_requiere_token_stats
+def cache_stats():
+    """Contadores de la caché de respuestas (hits, misses, bytes, expulsiones)."""
+    return jsonify(response_cache.stats())
+
+
+@main.route('/api/auth/stats')
+@_requiere_token_stats
+def auth_stats():
+    """Contadores del pool de hash de contraseñas (pendientes, en cola, rechazados, latencia)."""
+    return jsonify(pool_contrasenas.stats())
+
+
+def _servidor_ocupado(ruta, e):
+    print(f"{ruta}: pool de contraseñas saturado ({e})")
+    return jsonify({'error': 'Server busy, retry shortly'}), 503, {'Retry-After': '1'}
+
 # --- FIN: API PARA LA APP MÓVIL ---
 
 # ... (puedes añadir tus otras rutas web aquí si es necesario)
 
 @main.route('/parte1')
 def parte1():
-    return render_template('parte1.html')
+    return paginas_estaticas.enviar('parte1.html')
 
 @main.route('/parte3')
 def parte3():
-    return render_template('parte3.html')
+    return paginas_estaticas.enviar('parte3.html')
 
 @main.route('/parte4')
 def parte4():
-    return render_template('parte4.html')
+    return paginas_estaticas.enviar('parte4.html')
 
 # --- AUTENTICACIÓN: registro e inicio de sesión (API móvil) ---
 @main.route('/api/register', methods=['POST'])
@@ -117,8 +285,8 @@ def api_register():
             if mesa is None:
                 return jsonify({'error': 'Mesa not found'}), 400
 
-        # Hashear contraseña
-        pw_hash = generate_password_hash(password)
+        # Hashear contraseña (en el pool de procesos, ver contrasenas.py)
+        pw_hash = pool_contrasenas.generar(password)
 
         nuevo = Usuarios(
             dni=dni,
@@ -138,6 +306,9 @@ def api_register():
             'id_mesa': nuevo.id_mesa
         }), 201
 
+    except HashingSaturado as e:
+        db.session.rollback()
+        return _servidor_ocupado('/api/register', e)
     except Exception as e:
         db.session.rollback()
         print(f"Error en /api/register: {e}")
@@ -167,9 +338,20 @@ def api_login():
         if not user or not user.password_hash:
             return jsonify({'error': 'Invalid credentials'}), 401
 
-        if not check_password_hash(user.password_hash, password):
+        if not pool_contrasenas.verificar(user.password_hash, password):
             return jsonify({'error': 'Invalid credentials'}), 401
 
+        # Si cambió PASSWORD_HASH_METODO, se aprovecha que tenemos la contraseña.
+        # El login ya es válido: si el pool está saturado (o falla el commit)
+        # se deja para el siguiente, en lugar de responder 503
+        if pool_contrasenas.necesita_rehash(user.password_hash):
+            try:
+                user.password_hash = pool_contrasenas.generar(password)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"/api/login: re-hash omitido ({e})")
+
         # Responder con la info del usuario (sin password)
         return jsonify({
             'success': True,
@@ -180,6 +362,9 @@ def api_login():
             'id_mesa': user.id_mesa
         })
 
+    except HashingSaturado as e:
+        db.session.rollback()
+        return _servidor_ocupado('/api/login', e)
     except Exception as e:
         print(f"Error en /api/login: {e}")
         return jsonify({'error': str(e)}), 500
@@ -193,22 +378,21 @@ def candidatos_view():
     Obtiene todos los candidatos y los pasa a la plantilla.
     """
     try:
-        # Obtén todos los candidatos de la base de datos con su partido asociado
-        candidatos_db = db.session.query(Candidatos).join(
-            PartidosPoliticos, 
-            Candidatos.partido_politico_id == PartidosPoliticos.id_partido
-        ).all()
+        # Candidatos con su partido, desde la instantánea en memoria
+        # (el partido se resuelve por id, sin JOIN ni consultas extra).
+        instantanea = modelo_lectura.actual()
 
         candidatos_serializados = []
-        for candidato in candidatos_db:
-            imagen_base64 = None
-            if candidato.imagen_blob:
-                imagen_base64 = base64.b64encode(candidato.imagen_blob).decode('utf-8')
+        for candidato in instantanea.candidatos:
+            partido = instantanea.partido_de(candidato)
+            if partido is None:
+                continue
 
-            # Codificar el logo del partido a base64
-            logo_partido_base64 = None
-            if candidato.partido_politico and candidato.partido_politico.logo_blob:
-                logo_partido_base64 = base64.b64encode(candidato.partido_politico.logo_blob).decode('utf-8')
+            # Las imágenes se referencian por URL; el navegador las pide
+            # (y cachea) aparte en lugar de incrustarlas en el HTML.
+            imagen_url = None
+            if candidato.imagen_sha256:
+                imagen_url = url_for('media.get_media', sha256=candidato.imagen_sha256)
 
             candidatos_serializados.append({
                 'id': candidato.id,
@@ -217,11 +401,13 @@ def candidatos_view():
                 'perfil_url': candidato.perfil_url,
                 'region': candidato.region,
                 'biografia': candidato.biografia,
-                'imagen_base64': imagen_base64,
+                'imagen_url': imagen_url,
+                'imagen_placeholder': candidato.imagen_placeholder,
                 'partido': {
-                    'nombre': candidato.partido_politico.nombre_partido,
-                    'siglas': candidato.partido_politico.siglas,
-                    'logo_base64': logo_partido_base64
+                    'nombre': partido.nombre_partido,
+                    'siglas': partido.siglas,
+                    'logo_url': _logo_url(partido.logo_sha256),
+                    'logo_placeholder': partido.logo_placeholder
                 }
             })
 
@@ -234,59 +420,115 @@ def candidatos_view():
         return render_template('candidatos.html', candidatos=[], error=str(e))
 
 
+# Campos de /api/candidatos. El extractor recibe (candidato, partido) y el
+# partido puede ser None (candidato sin partido).
+CAMPOS_CANDIDATO = {
+    'id': lambda c, p: c.id,
+    'nombre_partido': lambda c, p: p.nombre_partido if p else "Sin Partido",
+    'siglas_partido': lambda c, p: p.siglas if p else "",
+    # URL de la foto del candidato (ver /media/<sha256>)
+    'foto_url': lambda c, p: url_for('media.get_media', sha256=c.imagen_sha256) if c.imagen_sha256 else None,
+    'foto_placeholder': lambda c, p: c.imagen_placeholder,
+    'direccion_legal_partido': lambda c, p: p.direccion_legal if p else "No disponible",
+    'nombre_completo': lambda c, p: c.nombre_completo,
+    'tipo_candidatura': lambda c, p: c.tipo_candidatura,
+    'perfil_url': lambda c, p: c.perfil_url,
+    'jne_id_simbolo': lambda c, p: p.jne_id_simbolo if p else "N/A",
+    'region': lambda c, p: c.region,
+    'biografia': lambda c, p: c.biografia,
+}
+
+
 @main.route('/api/candidatos')
+@response_cache.cached('candidatos', 'PartidosPoliticos')
 def api_candidatos():
     """
     Endpoint de API para obtener los candidatos con filtros.
     Ahora incluye región y biografía, y permite filtrar por nombre del partido.
-    Usa LEFT JOIN para mostrar candidatos sin partido.
+    Incluye los candidatos sin partido.
+    Filtros combinables: nombre_completo, partido_nombre (nombre o siglas),
+    id_partido, region y tipo_candidatura.
+    Con ?limit=N[&after=<cursor>] responde {"items": [...], "next_cursor": ...}.
+    Con ?fields=a,b solo se devuelven esos campos.
+    Con ?fuzzy=1, nombre_completo tolera erratas: se devuelven las
+    coincidencias más parecidas primero (sin paginación).
+    Se lee del modelo de lectura en memoria (lectura.py), no de MySQL.
     """
     try:
         # --- CAMBIO: Se obtiene 'nombre_completo' en lugar de 'partido_nombre' ---
         nombre_candidato = request.args.get('nombre_completo', None)
+        partido_nombre = request.args.get('partido_nombre', None)
+        id_partido = request.args.get('id_partido', None)
+        region = request.args.get('region', None)
+        tipo_candidatura = request.args.get('tipo_candidatura', None)
 
-        # Construir la consulta inicial usando OUTERJOIN (LEFT JOIN)
-        query = db.session.query(Candidatos, PartidosPoliticos).outerjoin(
-            PartidosPoliticos, 
-            Candidatos.partido_politico_id == PartidosPoliticos.id_partido
-        )
+        campos = leer_campos(request.args, CAMPOS_CANDIDATO)
+        instantanea = modelo_lectura.actual()
 
         # --- CAMBIO: Aplicar filtro por nombre del candidato si se proporciona ---
-        if nombre_candidato:
-            query = query.filter(Candidatos.nombre_completo.ilike(f'%{nombre_candidato}%'))
-
-        # Ejecutar la consulta
-        results = query.all()
+        fuzzy = _es_fuzzy() and nombre_candidato
+        if fuzzy:
+            # Índice de trigramas en memoria (busqueda.py): por similitud
+            candidatos = [
+                instantanea.candidatos_por_id[doc['id']]
+                for _, doc in indice_busqueda.similares('candidato', nombre_candidato, _limite_fuzzy())
+            ]
+        elif id_partido:
+            # Se parte del índice más selectivo; todos conservan el orden por id
+            candidatos = instantanea.candidatos_por_partido.get(id_partido, ())
+        elif region:
+            candidatos = instantanea.candidatos_por_region.get(region, ())
+        else:
+            candidatos = instantanea.candidatos
+
+        if nombre_candidato and not fuzzy:
+            buscado = normalizar(nombre_candidato)
+            candidatos = [c for c in candidatos if _contiene(c.nombre_completo, buscado)]
+        if tipo_candidatura:
+            candidatos = [c for c in candidatos if c.tipo_candidatura == tipo_candidatura]
+        if region:
+            candidatos = [c for c in candidatos if c.region == region]
+        if id_partido:
+            candidatos = [c for c in candidatos if c.partido_politico_id == id_partido]
+        if partido_nombre:
+            # La tabla de partidos es pequeña: primero se resuelven los ids
+            # que coinciden y luego se filtra por la FK
+            buscado = normalizar(partido_nombre)
+            ids_partidos = {
+                p.id_partido for p in instantanea.partidos
+                if _contiene(p.nombre_partido, buscado) or _contiene(p.siglas, buscado)
+            }
+            candidatos = [c for c in candidatos if c.partido_politico_id in ids_partidos]
+
+        # Con ?limit=&after= se pagina por id (clave primaria)
+        pagina = None if fuzzy else leer_parametros(request.args)
+        if pagina is not None:
+            candidatos, next_cursor = paginar(candidatos, ('id',), *pagina)
 
         # Serializar los resultados
-        lista_candidatos = []
-        for candidato, partido in results:
-            # Codificar la imagen del candidato a base64
-            foto_candidato_principal = None
-            if candidato.imagen_blob:
-                foto_candidato_principal = base64.b64encode(candidato.imagen_blob).decode('utf-8')
-
-            # Manejar el caso donde el partido es NULL
-            nombre_partido = partido.nombre_partido if partido else "Sin Partido"
-            siglas_partido = partido.siglas if partido else ""
-            direccion_legal_partido = partido.direccion_legal if partido else "No disponible"
-            jne_id_simbolo = partido.jne_id_simbolo if partido else "N/A"
-
-            lista_candidatos.append({
-                'nombre_partido': nombre_partido,
-                'siglas_partido': siglas_partido,
-                'foto_candidato_principal': foto_candidato_principal,
-                'direccion_legal_partido': direccion_legal_partido,
-                'nombre_completo': candidato.nombre_completo,
-                'tipo_candidatura': candidato.tipo_candidatura,
-                'perfil_url': candidato.perfil_url,
-                'jne_id_simbolo': jne_id_simbolo,
-                'region': candidato.region,
-                'biografia': candidato.biografia
-            })
+        lista_candidatos = [
+            serializar(campos, CAMPOS_CANDIDATO, candidato, instantanea.partido_de(candidato))
+            for candidato in candidatos
+        ]
 
-        return jsonify(lista_candidatos)
+        if pagina is None:
+            return jsonify(lista_candidatos)
+        return jsonify({'items': lista_candidatos, 'next_cursor': next_cursor})
 
+    except (CursorInvalido, CampoInvalido) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error en /api/candidatos: {e}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+@main.route('/api/candidatos/<int:id>/foto')
+def get_candidato_foto(id):
+    """
+    Devuelve la foto del candidato como bytes crudos.
+    Soporta ETag/If-None-Match (304) y peticiones parciales con Range (206).
+    """
+    candidato = modelo_lectura.actual().candidatos_por_id.get(id)
+    if candidato is None or not candidato.imagen_sha256:
+        abort(404)
+    return enviar_media(candidato.imagen_sha256, immutable=False)
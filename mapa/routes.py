@@ -1,45 +1,327 @@
-from flask import Blueprint, render_template, request, jsonify
-from models import CentrosVotacion, Mesas
-from extensions import db
+import os
+
+from flask import Blueprint, abort, current_app, render_template, request, jsonify, send_file
+from extensions import db, response_cache
+from models import ConteosDistrito, VersionesDatos
+from busqueda import normalizar
+from lectura import modelo_lectura
+from padron import normalizar_dni, padron
+from geo import ZOOM_CENTROS, ArbolCentros, indice_mapa, leer_bbox, leer_coordenadas
+from teselas import TABLAS as TABLAS_TESELAS, TESELA_VACIA, almacen_teselas, nombre_version, tesela
+from geocodificacion import geocodificar_centros
+from limites import limites_distritales
 
 mapa = Blueprint("mapa", __name__)
 
+# Centros que devuelve /api/centros/nearby por defecto y como máximo
+K_CERCANOS = 5
+MAX_CERCANOS = 50
+# Puntos por petición en POST /api/distritos/ubicar
+MAX_PUNTOS_UBICAR = 10000
+
 @mapa.route("/")
 def mapa_index():
     return render_template("mapa.html")
 
 
+def _centro_json(c):
+    return {
+        "id": c.id_centro,
+        "nombre": c.nombre,
+        "distrito": c.distrito,
+        "lat": c.latitud,
+        "lng": c.longitud
+    }
+
+
+def _centro_con_mesas(instantanea, c):
+    """_centro_json más lo que muestra el popup del mapa (ubicación y rango de mesas)."""
+    resumen = instantanea.resumen_de(c.id_centro)
+    return dict(
+        _centro_json(c),
+        ubicacion_detalle=resumen["ubicacion_detalle"],
+        mesas=resumen["mesas"],
+        primera_mesa=resumen["primera_mesa"],
+        ultima_mesa=resumen["ultima_mesa"],
+    )
+
+
 # API para filtrar centros
 @mapa.route("/api/centros")
 def api_centros():
-    distrito = request.args.get("distrito")
     dni = request.args.get("dni")
+    if dni:
+        return centros_de_elector(dni)
+    if "bbox" in request.args:
+        return centros_en_vista()
+    return centros_filtrados()
+
+
+def centros_de_elector(dni):
+    """
+    ?dni=: el centro donde vota ese elector (padrón en memoria, padron.py).
+    No pasa por la caché de respuestas: una entrada por DNI desplazaría al resto.
+    """
+    numero = normalizar_dni(dni)
+    if numero is None:
+        return jsonify({"error": "El DNI debe tener 8 dígitos"}), 400
+
+    try:
+        local = padron.local_de(numero)
+        # El padrón puede apuntar a un centro que la instantánea aún no tiene
+        centro = modelo_lectura.actual().centros_por_id.get(local["centro"]["id"]) if local else None
+        return jsonify([_centro_json(centro)] if centro is not None else [])
+    except Exception as e:
+        print(f"Error en /mapa/api/centros?dni: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+def centros_en_vista():
+    """
+    ?bbox=oeste,sur,este,norte&zoom=: lo que el mapa debe dibujar en esa
+    vista. Desde el zoom ZOOM_CENTROS (o sin ?zoom=) devuelve los centros
+    del recuadro (con su ubicación y rango de mesas, para el popup); por
+    debajo, grupos con su cantidad y centroide, más los centros que quedan
+    solos. Sale del índice por zoom de geo.py, armado una vez por versión
+    de los datos; no se cachea porque cada vista es un recuadro distinto.
+    """
+    try:
+        oeste, sur, este, norte = leer_bbox(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    zoom = request.args.get("zoom", ZOOM_CENTROS, type=int)
+
+    try:
+        instantanea = modelo_lectura.actual()
+        centros, grupos = indice_mapa(instantanea).en_vista(oeste, sur, este, norte, zoom)
+        return jsonify({
+            "centros": [_centro_con_mesas(instantanea, c) for c in centros],
+            "grupos": [
+                {"lat": round(g.lat, 6), "lng": round(g.lng, 6), "cantidad": g.cantidad}
+                for g in grupos
+            ]
+        })
+    except Exception as e:
+        print(f"Error en /mapa/api/centros?bbox: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@mapa.route("/tiles/<int:z>/<int:x>/<int:y>")
+def tesela_centros(z, x, y):
+    """
+    Tesela GeoJSON z/x/y de los centros, con grupos por debajo del zoom
+    ZOOM_CENTROS (los mismos que /api/centros?bbox=). Se sirve del disco
+    (teselas.py); si la versión vigente aún no está generada, se arma en
+    memoria mientras se genera en segundo plano. Con ?v= igual a la versión
+    vigente (la de /api/centros/teselas) la respuesta es inmutable.
+    """
+    if not (0 <= z <= ZOOM_CENTROS and 0 <= x < 1 << z and 0 <= y < 1 << z):
+        abort(404)
+    instantanea = modelo_lectura.actual()
+    version = nombre_version(instantanea)
+    max_age = current_app.config["TESELAS_MAX_AGE"] if request.args.get("v") == version else 0
+    etag = f"{version}/{z}/{x}/{y}"
+
+    if almacen_teselas.completa(version):
+        ruta = almacen_teselas.ruta(version, z, x, y)
+        if os.path.isfile(ruta + ".gz") and request.accept_encodings["gzip"]:
+            response = send_file(ruta + ".gz", mimetype="application/geo+json",
+                                 etag=etag + ".gz", conditional=True, max_age=max_age)
+            response.headers["Content-Encoding"] = "gzip"
+        elif os.path.isfile(ruta):
+            response = send_file(ruta, mimetype="application/geo+json",
+                                 etag=etag, conditional=True, max_age=max_age)
+        else:
+            response = current_app.response_class(TESELA_VACIA, mimetype="application/geo+json")
+    else:
+        almacen_teselas.generar_en_segundo_plano(instantanea)
+        response = current_app.response_class(tesela(instantanea, z, x, y), mimetype="application/geo+json")
+
+    if not response.direct_passthrough:
+        response.set_etag(etag)
+        response.cache_control.max_age = max_age
+        response = response.make_conditional(request)
+    response.cache_control.public = True
+    response.cache_control.immutable = max_age > 0
+    if max_age == 0:
+        response.cache_control.no_cache = True
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+@mapa.route("/api/centros/teselas")
+def api_teselas():
+    """Plantilla de URL de las teselas de la versión vigente, para L.tileLayer y similares."""
+    try:
+        version = nombre_version(modelo_lectura.actual())
+        return jsonify({
+            "url": f"{request.script_root}/mapa/tiles/{{z}}/{{x}}/{{y}}?v={version}",
+            "version": version,
+            "zoom_maximo": ZOOM_CENTROS
+        })
+    except Exception as e:
+        print(f"Error en /mapa/api/centros/teselas: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@mapa.cli.command("teselas")
+def generar_teselas():
+    """Genera las teselas de la versión actual de centros y mesas (flask mapa teselas)."""
+    cantidad = almacen_teselas.generar_vigentes()
+    print(f"{cantidad} teselas generadas en {almacen_teselas.root}.")
+
+
+@mapa.cli.command("recontar")
+def recontar_distritos():
+    """
+    Tras importar centros o mesas por SQL (flask mapa recontar): rehace los
+    conteos por distrito, sube las versiones de ambas tablas (cachés,
+    instantánea y teselas dejan de servir los datos viejos) y regenera
+    las teselas.
+    """
+    cantidad = ConteosDistrito.recontar()
+    VersionesDatos.incrementar(*TABLAS_TESELAS)
+    db.session.commit()
+    print(f"Conteos de {cantidad} distritos recalculados.")
+    print(f"{almacen_teselas.generar_vigentes()} teselas generadas en {almacen_teselas.root}.")
+
+
+# flask mapa geocodificar NOMENCLATOR
+mapa.cli.add_command(geocodificar_centros)
+
+
+@response_cache.cached("CentrosVotacion")
+def centros_filtrados():
+    distrito = request.args.get("distrito")
     nombre = request.args.get("nombre")
 
-    query = CentrosVotacion.query
+    try:
+        # Centros desde la instantánea en memoria (lectura.py), indexados por distrito
+        instantanea = modelo_lectura.actual()
+        if distrito:
+            centros = instantanea.centros_por_distrito.get(distrito, ())
+        else:
+            centros = instantanea.centros
 
-    if distrito:
-        query = query.filter_by(distrito=distrito)
+        if nombre:
+            buscado = normalizar(nombre)
+            centros = [c for c in centros if buscado in normalizar(c.nombre)]
 
-    if nombre:
-        query = query.filter(CentrosVotacion.nombre.like(f"%{nombre}%"))
+        return jsonify([_centro_json(c) for c in centros])
+    except Exception as e:
+        print(f"Error en /mapa/api/centros: {e}")
+        return jsonify({"error": str(e)}), 500
 
-    if dni:
-        # Filtrado por dni no implementado: la estructura actual de modelos
-        # no incluye 'dni_responsable' en 'Mesas'. Omite este filtro.
-        pass
-
-    centros = query.all()
-
-    result = [
-        {
-            "id": c.id_centro,
-            "nombre": c.nombre,
-            "distrito": c.distrito,
-            "lat": float(c.latitud) if c.latitud is not None else None,
-            "lng": float(c.longitud) if c.longitud is not None else None
+
+@mapa.route("/api/centros/resumen")
+@response_cache.cached("CentrosVotacion", "Mesas")
+def api_resumen_centros():
+    """
+    Todos los centros con su cantidad de mesas, la primera y la última, y
+    una ubicacion_detalle representativa (Instantanea.resumen_centros).
+    """
+    try:
+        return jsonify(list(modelo_lectura.actual().resumen_centros()))
+    except Exception as e:
+        print(f"Error en /mapa/api/centros/resumen: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@mapa.route("/api/distritos")
+def api_distritos():
+    """
+    Faceta por distrito: centros, mesas y electores registrados de cada uno,
+    leídos de los contadores de ConteosDistrito (una fila por distrito, sin
+    GROUP BY). No pasa por la caché: cambia con cada elector que se registra.
+    """
+    try:
+        conteos = ConteosDistrito.query.order_by(ConteosDistrito.distrito).all()
+        return jsonify([c.to_dict() for c in conteos])
+    except Exception as e:
+        print(f"Error en /mapa/api/distritos: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+def _centros_por_distrito_normalizado(instantanea):
+    """Centros por nombre de distrito normalizado: los límites pueden traer 'MIRAFLORES' y la BD 'Miraflores'."""
+    grupos = {}
+    for distrito, centros in instantanea.centros_por_distrito.items():
+        grupos.setdefault(normalizar(distrito), []).extend(centros)
+    return grupos
+
+
+def _leer_puntos(datos):
+    """[(lat, lng)] del cuerpo {"puntos": [[lat, lng], ...]}; ValueError si no es válido."""
+    puntos = datos.get("puntos") if isinstance(datos, dict) else None
+    if not isinstance(puntos, list) or not puntos:
+        raise ValueError('Se espera {"puntos": [[lat, lng], ...]}')
+    if len(puntos) > MAX_PUNTOS_UBICAR:
+        raise ValueError(f"Máximo {MAX_PUNTOS_UBICAR} puntos por petición")
+    try:
+        return [leer_coordenadas({"lat": p[0], "lng": p[1]}) for p in puntos]
+    except (TypeError, IndexError, KeyError):
+        raise ValueError("Cada punto debe ser [lat, lng]")
+
+
+@mapa.route("/api/distritos/ubicar", methods=["GET", "POST"])
+def api_ubicar_distrito():
+    """
+    Distrito que contiene un punto según los límites distritales locales
+    (limites.py, árbol STR de geo.py), con sus centros de votación.
+    GET ?lat=&lng=: {distrito, centros}. POST {"puntos": [[lat, lng], ...]}:
+    {distritos: [uno por punto], centros: {distrito: [...]}} con los centros
+    de cada distrito una sola vez. Fuera de todo distrito, null.
+    """
+    try:
+        if request.method == "POST":
+            puntos = _leer_puntos(request.get_json(silent=True))
+        else:
+            puntos = [leer_coordenadas(request.args)]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        indice = limites_distritales.indice()
+    except OSError as e:
+        print(f"Límites distritales no disponibles: {e}")
+        return jsonify({"error": "Límites distritales no disponibles: falta el GeoJSON de "
+                                 "DISTRITOS_GEOJSON (ver config.py para descargarlo)"}), 503
+
+    try:
+        distritos = [indice.distrito_en(lat, lng) for lat, lng in puntos]
+        centros_por_distrito = modelo_lectura.actual().derivado(
+            "centros_por_distrito_normalizado", _centros_por_distrito_normalizado
+        )
+        centros = {
+            d: [_centro_json(c) for c in centros_por_distrito.get(normalizar(d), ())]
+            for d in set(distritos) if d is not None
         }
-        for c in centros
-    ]
+        if request.method == "POST":
+            return jsonify({"distritos": distritos, "centros": centros})
+        return jsonify({"distrito": distritos[0], "centros": centros.get(distritos[0], [])})
+    except Exception as e:
+        print(f"Error en /mapa/api/distritos/ubicar: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@mapa.route("/api/centros/nearby")
+def api_centros_cercanos():
+    """
+    Los k centros más cercanos a ?lat=&lng= (por defecto 5, máximo 50),
+    con su distancia en km; ?radio_km= limita la búsqueda. Usa el árbol
+    k-d de geo.py, construido una vez por versión de los datos.
+    """
+    try:
+        lat, lng = leer_coordenadas(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    k = min(request.args.get("k", K_CERCANOS, type=int), MAX_CERCANOS)
+    radio_km = request.args.get("radio_km", type=float)
 
-    return jsonify(result)
+    try:
+        arbol = modelo_lectura.actual().derivado("arbol_centros", lambda i: ArbolCentros(i.centros))
+        cercanos = arbol.cercanos(lat, lng, k, radio_km)
+        return jsonify([dict(_centro_json(c), distancia_km=round(d, 3)) for d, c in cercanos])
+    except Exception as e:
+        print(f"Error en /mapa/api/centros/nearby: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1 @@
+"""Almacén de imágenes direccionado por contenido (sha256)."""
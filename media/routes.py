@@ -0,0 +1,170 @@
+import click
+from flask import Blueprint, abort, current_app, request, send_file
+from sqlalchemy import inspect, text
+from extensions import db, media_store
+from models import VersionesDatos
+from media.store import detectar_mimetype, es_sha256
+from media.variantes import generar_variantes
+
+media = Blueprint('media', __name__, cli_group='media')
+
+
+def _elegir_variante(sha256):
+    """
+    Negocia la variante a servir: ?size=<px> elige la miniatura más pequeña
+    que lo cubra y un Accept con image/webp prefiere WebP. Devuelve
+    (ruta, etag, mimetype) o None para servir el original.
+    """
+    tamano = request.args.get('size', type=int)
+    acepta_webp = 'image/webp' in request.accept_mimetypes.values()
+    if not tamano and not acepta_webp:
+        return None
+
+    formatos = ['webp', 'jpeg', 'png'] if acepta_webp else ['jpeg', 'png']
+    variante = media_store.buscar_variante(sha256, tamano or 0, formatos)
+    if variante is None:
+        return None
+    t, formato = variante
+    return media_store.ruta_variante(sha256, t, formato), f"{sha256}-{t}.{formato}", f"image/{formato}"
+
+
+def enviar_media(sha256, immutable=True):
+    """
+    Sirve un archivo del almacén con send_file: el servidor WSGI puede usar
+    sendfile (wsgi.file_wrapper) o X-Sendfile si USE_X_SENDFILE está activo,
+    sin copiar los bytes por Python. El sha256 es el ETag y send_file
+    resuelve If-None-Match (304) y Range (206).
+
+    Con immutable=False (URLs por id, cuyo archivo cambia al volver a
+    scrapear) no hay caché larga: el cliente revalida cada vez con el ETag.
+    """
+    if not media_store.existe(sha256):
+        abort(404)
+
+    variante = _elegir_variante(sha256)
+    if variante is not None:
+        # Las variantes se generan en un formato conocido
+        ruta, etag, mimetype = variante
+    else:
+        # El original puede ser de cualquier formato: se deduce de sus primeros bytes
+        ruta, etag = media_store.ruta(sha256), sha256
+        mimetype = detectar_mimetype(media_store.leer_cabecera(sha256))
+
+    response = send_file(
+        ruta,
+        mimetype=mimetype,
+        etag=etag,
+        conditional=True,
+        max_age=current_app.config['MEDIA_MAX_AGE'] if immutable else 0,
+    )
+    response.cache_control.public = True
+    if immutable:
+        # Una URL /media/<sha256> nunca cambia de contenido
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    # La variante depende de Accept (WebP o no)
+    response.vary.add('Accept')
+    return response
+
+
+@media.route('/media/<sha256>')
+def get_media(sha256):
+    """
+    Imagen por su hash de contenido, con caché inmutable.
+    Acepta ?size=<px> para pedir una miniatura (ver media/variantes.py).
+    """
+    if not es_sha256(sha256):
+        abort(404)
+    return enviar_media(sha256)
+
+
+# --- Migración: BLOBs en MySQL -> almacén en disco ---
+
+# (tabla, clave primaria, columna BLOB, columna hash)
+COLUMNAS_BLOB = [
+    ('PartidosPoliticos', 'id_partido', 'logo_blob', 'logo_sha256'),
+    ('candidatos', 'id', 'imagen_blob', 'imagen_sha256'),
+]
+
+# (tabla, columna hash, columna placeholder)
+COLUMNAS_VARIANTES = [
+    ('PartidosPoliticos', 'logo_sha256', 'logo_placeholder'),
+    ('candidatos', 'imagen_sha256', 'imagen_placeholder'),
+]
+TIPO_PLACEHOLDER = 'VARCHAR(1024)'
+
+
+def _asegurar_columna(tabla, columna, tipo):
+    """Agrega `columna` a `tabla` si aún no existe (create_all no altera tablas)."""
+    columnas = {c['name'] for c in inspect(db.engine).get_columns(tabla)}
+    if columna not in columnas:
+        print(f"Agregando columna {tabla}.{columna}...")
+        db.session.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {columna} {tipo} NULL"))
+        db.session.commit()
+    return columnas | {columna}
+
+
+def _migrar_columna(tabla, pk, col_blob, col_hash, conservar_blobs):
+    """Mueve una columna BLOB al almacén y deja solo el hash en la tabla."""
+    columnas = _asegurar_columna(tabla, col_hash, 'CHAR(64)')
+
+    if col_blob not in columnas:
+        print(f"{tabla}.{col_blob} ya no existe; nada que migrar.")
+        return
+
+    # Se leen los BLOBs en streaming para no cargar la tabla entera en memoria
+    filas = db.session.execute(
+        text(f"SELECT {pk}, {col_blob} FROM {tabla} WHERE {col_blob} IS NOT NULL"),
+        execution_options={'stream_results': True, 'yield_per': 100},
+    )
+    hashes = [{'pk': fila[0], 'sha': media_store.guardar(fila[1])} for fila in filas]
+    filas.close()
+
+    if hashes:
+        db.session.execute(
+            text(f"UPDATE {tabla} SET {col_hash} = :sha WHERE {pk} = :pk"),
+            hashes,
+        )
+    VersionesDatos.incrementar(tabla)
+    db.session.commit()
+    print(f"{tabla}: {len(hashes)} imágenes movidas al almacén.")
+
+    if not conservar_blobs:
+        print(f"Eliminando columna {tabla}.{col_blob}...")
+        db.session.execute(text(f"ALTER TABLE {tabla} DROP COLUMN {col_blob}"))
+        db.session.commit()
+
+
+@media.cli.command('migrar')
+@click.option('--conservar-blobs', is_flag=True,
+              help='No elimina las columnas BLOB después de copiarlas.')
+def migrar_blobs(conservar_blobs):
+    """Mueve logo_blob e imagen_blob al almacén de medios (flask media migrar)."""
+    for tabla, pk, col_blob, col_hash in COLUMNAS_BLOB:
+        _migrar_columna(tabla, pk, col_blob, col_hash, conservar_blobs)
+    # Los modelos ya leen los placeholders; se llenan con `flask media variantes`
+    for tabla, _, col_placeholder in COLUMNAS_VARIANTES:
+        _asegurar_columna(tabla, col_placeholder, TIPO_PLACEHOLDER)
+    print("Migración de medios completada.")
+
+
+@media.cli.command('variantes')
+@click.option('--workers', type=int, default=None, help='Procesos del pool (por defecto, núcleos).')
+def generar_variantes_cmd(workers):
+    """Genera miniaturas, WebP y placeholders de todas las imágenes (flask media variantes)."""
+    for tabla, col_hash, col_placeholder in COLUMNAS_VARIANTES:
+        _asegurar_columna(tabla, col_placeholder, TIPO_PLACEHOLDER)
+        hashes = db.session.execute(
+            text(f"SELECT DISTINCT {col_hash} FROM {tabla} WHERE {col_hash} IS NOT NULL")
+        ).scalars().all()
+
+        placeholders, fallidas = generar_variantes(media_store, hashes, max_workers=workers)
+        if placeholders:
+            db.session.execute(
+                text(f"UPDATE {tabla} SET {col_placeholder} = :placeholder WHERE {col_hash} = :sha"),
+                [{'sha': sha, 'placeholder': ph} for sha, ph in placeholders.items()],
+            )
+        VersionesDatos.incrementar(tabla)
+        db.session.commit()
+        print(f"{tabla}: variantes generadas para {len(placeholders)} imágenes, {len(fallidas)} con error.")
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import tempfile
+
+
+def detectar_mimetype(data):
+    """Deduce el Content-Type de una imagen a partir de sus primeros bytes."""
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[:256].lstrip().startswith((b'<?xml', b'<svg')):
+        return 'image/svg+xml'
+    return 'application/octet-stream'
+
+
+def es_sha256(valor):
+    """True si `valor` es un sha256 en hexadecimal (minúsculas)."""
+    return (
+        isinstance(valor, str)
+        and len(valor) == 64
+        and all(c in '0123456789abcdef' for c in valor)
+    )
+
+
+class MediaStore:
+    """
+    Guarda cada imagen una sola vez en disco, con su sha256 como nombre:
+    MEDIA_ROOT/ab/abcdef...  (dos niveles para no llenar un único directorio).
+    Las tablas solo guardan el hash; dos candidatos con la misma foto o
+    un logo repetido entre ejecuciones del scraper ocupan un único archivo.
+    Las variantes (miniaturas, WebP) se guardan junto al original como
+    MEDIA_ROOT/ab/abcdef....96.webp (ver media/variantes.py).
+    """
+
+    def __init__(self, app=None, root=None):
+        self.root = root
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.root = app.config['MEDIA_ROOT']
+        os.makedirs(self.root, exist_ok=True)
+        app.extensions['media_store'] = self
+
+    def ruta(self, sha256):
+        """Ruta en disco del archivo con ese hash (exista o no)."""
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def existe(self, sha256):
+        return es_sha256(sha256) and os.path.isfile(self.ruta(sha256))
+
+    def guardar(self, data):
+        """
+        Escribe `data` en el almacén si aún no existe y devuelve su sha256.
+        La escritura es atómica (archivo temporal + os.replace), así que un
+        lector concurrente nunca ve un archivo a medias.
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        destino = self.ruta(sha256)
+        if not os.path.isfile(destino):
+            _escribir_atomico(destino, data)
+        return sha256
+
+    def ruta_variante(self, sha256, tamano, formato):
+        return f"{self.ruta(sha256)}.{tamano}.{formato}"
+
+    def guardar_variante(self, sha256, tamano, formato, data):
+        _escribir_atomico(self.ruta_variante(sha256, tamano, formato), data)
+
+    def buscar_variante(self, sha256, tamano, formatos):
+        """
+        Devuelve (tamano, formato) de la variante más pequeña que cubra
+        `tamano` en el primer formato disponible de `formatos`, o None si
+        no se generaron variantes para esa imagen. tamano=0 es el tamaño
+        original (solo existe en WebP).
+        """
+        from media.variantes import TAMANOS
+
+        if tamano:
+            candidatos = [t for t in TAMANOS if t >= tamano] or [TAMANOS[-1]]
+        else:
+            candidatos = [0]
+        for formato in formatos:
+            for t in candidatos:
+                if os.path.isfile(self.ruta_variante(sha256, t, formato)):
+                    return t, formato
+        return None
+
+    def leer_cabecera(self, sha256, n=256):
+        """Primeros `n` bytes del archivo (para deducir el Content-Type)."""
+        with open(self.ruta(sha256), 'rb') as f:
+            return f.read(n)
+
+
+def _escribir_atomico(destino, data):
+    directorio = os.path.dirname(destino)
+    os.makedirs(directorio, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directorio, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, destino)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,108 @@
+import base64
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Este módulo es lo único que ejecutan los procesos del pool: no debe
+# importar app, extensions ni models (ni nada que cree la app o conecte a MySQL)
+from media.store import MediaStore
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow es opcional: sin él solo se sirven los originales
+    Image = None
+
+# Anchos máximos (px) generados para cada imagen. 48/96 cubren los avatares
+# de candidatos.tsx y partidos.tsx (1x y 2x); 256 las tarjetas de la web.
+TAMANOS = (48, 96, 256)
+# Ancho del placeholder difuminado que se incrusta en el JSON de las listas
+TAMANO_PLACEHOLDER = 16
+# Un data URI más largo que esto no compensa incrustarlo (y no cabe en la columna)
+MAX_PLACEHOLDER = 1024
+
+CALIDAD_JPEG = 82
+CALIDAD_WEBP = 80
+
+
+def disponible():
+    return Image is not None
+
+
+def _codificar(imagen, formato, calidad):
+    buffer = io.BytesIO()
+    if formato == 'jpeg':
+        imagen.convert('RGB').save(buffer, 'JPEG', quality=calidad, optimize=True, progressive=True)
+    elif formato == 'png':
+        imagen.save(buffer, 'PNG', optimize=True)
+    else:
+        imagen.save(buffer, 'WEBP', quality=calidad, method=4)
+    return buffer.getvalue()
+
+
+def _generar(root, sha256):
+    """
+    Trabajo de un proceso del pool: lee el original del almacén, escribe
+    sus miniaturas (formato base + WebP) y devuelve (sha256, placeholder,
+    error). El placeholder puede ser None sin error (si no cabe en la columna).
+    """
+    store = MediaStore(root=root)
+    try:
+        with Image.open(store.ruta(sha256)) as original:
+            original.load()
+            con_alfa = original.mode in ('RGBA', 'LA', 'P')
+            imagen = original.convert('RGBA' if con_alfa else 'RGB')
+    except Exception as e:
+        return sha256, None, str(e)
+
+    try:
+        # Los logos suelen tener transparencia: PNG; las fotos, JPEG
+        formato_base = 'png' if con_alfa else 'jpeg'
+        for tamano in TAMANOS:
+            miniatura = imagen.copy()
+            miniatura.thumbnail((tamano, tamano * 4), Image.LANCZOS)
+            store.guardar_variante(sha256, tamano, formato_base, _codificar(miniatura, formato_base, CALIDAD_JPEG))
+            store.guardar_variante(sha256, tamano, 'webp', _codificar(miniatura, 'webp', CALIDAD_WEBP))
+
+        # WebP a tamaño original (tamano 0) para clientes que no piden ?size=
+        store.guardar_variante(sha256, 0, 'webp', _codificar(imagen, 'webp', CALIDAD_WEBP))
+
+        diminuta = imagen.copy()
+        diminuta.thumbnail((TAMANO_PLACEHOLDER, TAMANO_PLACEHOLDER * 4), Image.BILINEAR)
+        datos = base64.b64encode(_codificar(diminuta, 'webp', 30)).decode('ascii')
+    except Exception as e:
+        return sha256, None, str(e)
+    placeholder = f"data:image/webp;base64,{datos}"
+    return sha256, placeholder if len(placeholder) <= MAX_PLACEHOLDER else None, None
+
+
+def generar_variantes(store, hashes, max_workers=None):
+    """
+    Genera las variantes de cada hash en un pool de procesos (en el momento
+    de la ingesta, no en la petición) y devuelve ({sha256: placeholder},
+    {sha256: error}) con las imágenes que se procesaron y las que fallaron;
+    cada fallo se informa por consola. Sin Pillow devuelve dos dicts vacíos
+    y las rutas sirven el original.
+
+    Los procesos arrancan con spawn en todas las plataformas (como en
+    Windows, sin copiar las conexiones abiertas del proceso padre): vuelven
+    a importar el script principal como __mp_main__, así que los scripts
+    que lo usan crean la app solo bajo `if __name__ == "__main__"`.
+    """
+    hashes = sorted(set(h for h in hashes if h))
+    if not hashes:
+        return {}, {}
+    if not disponible():
+        print("Pillow no está instalado: se omiten miniaturas y placeholders.")
+        return {}, {}
+
+    workers = max_workers or min(len(hashes), os.cpu_count() or 1)
+    placeholders, fallidas = {}, {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        for sha256, placeholder, error in pool.map(_generar, [store.root] * len(hashes), hashes, chunksize=8):
+            if error is None:
+                placeholders[sha256] = placeholder
+            else:
+                fallidas[sha256] = error
+                print(f"No se pudo procesar la imagen {sha256}: {error}")
+    return placeholders, fallidas
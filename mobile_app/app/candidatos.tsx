@@ -21,9 +21,10 @@ const API_BASE = "http://192.168.18.55:5000";
 
 // Interface basada en la respuesta de tu API /api/candidatos
 interface Candidato {
+  id: number;
   nombre_partido: string;
   siglas_partido: string;
-  foto_candidato_principal: string | null; // Base64 string
+  foto_url: string | null; // Ruta relativa a API_BASE
   nombre_completo: string;
   tipo_candidatura: string;
   perfil_url: string;
@@ -81,8 +82,8 @@ export default function CandidatosScreen() {
         <Image
           style={styles.cardImage}
           source={
-            item.foto_candidato_principal
-              ? { uri: `data:image/jpeg;base64,${item.foto_candidato_principal}` }
+            item.foto_url
+              ? { uri: `${API_BASE}${item.foto_url}?size=256` }
               : require("../assets/images/icon.png") // Un placeholder
           }
         />
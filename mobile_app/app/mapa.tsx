@@ -1,9 +1,11 @@
-import React, { useState, useEffect } from "react";
-import { View, Text, StyleSheet, ActivityIndicator, ScrollView, Dimensions, TouchableOpacity } from "react-native";
-import { WebView } from "react-native-webview";
-import axios from "axios";
+import React, { useState, useMemo } from "react";
+import { View, Text, StyleSheet, ScrollView, Dimensions, TouchableOpacity } from "react-native";
+import { WebView, WebViewMessageEvent } from "react-native-webview";
 import ChatbotScreen from "./chatbot/chatbot";
 
+/* Para esta parte es necesario que se cambie la ruta "192.168.18.55" por la ipv4 propia de la computadora */
+const API_CENTROS = "http://192.168.18.55:5000/mapa/api/centros";
+
 interface Centro {
   id: string;
   nombre: string;
@@ -13,40 +15,22 @@ interface Centro {
 }
 
 export default function MapaScreen() {
+  // Centros visibles en el mapa, los que envía el WebView al moverse
   const [centros, setCentros] = useState<Centro[]>([]);
-  const [loading, setLoading] = useState(true);
-  const [selectedCentro, setSelectedCentro] = useState<Centro | null>(null);
   const [isChatbotVisible, setIsChatbotVisible] = useState(false);
 
-  useEffect(() => {
-    fetchCentros();
-  }, []);
-
-  const fetchCentros = async () => {
+  const onMapMessage = (event: WebViewMessageEvent) => {
     try {
-      /* Para esta parte es necesario que se cambie la ruta "192.168.18.55" por la ipv4 propia de la computadora */
-      const response = await axios.get("http://192.168.18.55:5000/mapa/api/centros");
-      setCentros(response.data);
-      setLoading(false);
+      setCentros(JSON.parse(event.nativeEvent.data));
     } catch (error) {
-      console.error("Error fetching centros:", error);
-      setLoading(false);
+      console.error("Error leyendo centros del mapa:", error);
     }
   };
 
+  /* El mapa pide solo lo que entra en pantalla (?bbox=&zoom=): grupos con su
+     cantidad con zoom bajo y centros sueltos al acercarse */
   const generateMapHTML = () => {
-    const mapCenter = centros.length > 0 ? centros[0] : { lat: -12.0464, lng: -77.0428 };
-
-    const markers = centros
-      .map((c) => {
-        if (!c.lat || !c.lng) return "";
-        return `
-          L.marker([${c.lat}, ${c.lng}])
-            .addTo(map)
-            .bindPopup('<strong>${c.nombre}</strong><br>Distrito: ${c.distrito}');
-        `;
-      })
-      .join("\n");
+    const mapCenter = { lat: -12.0464, lng: -77.0428 };
 
     return `
       <!DOCTYPE html>
@@ -57,6 +41,8 @@ export default function MapaScreen() {
         <style>
           body { margin: 0; padding: 0; }
           #map { width: 100%; height: 100vh; }
+          .grupo { background: rgba(0, 122, 255, 0.85); color: #fff; border: 2px solid #fff;
+                   border-radius: 50%; font-weight: bold; line-height: 36px; text-align: center; }
         </style>
       </head>
       <body>
@@ -67,26 +53,52 @@ export default function MapaScreen() {
             maxZoom: 19,
             attribution: '© OpenStreetMap contributors'
           }).addTo(map);
-          ${markers}
+
+          const capa = L.layerGroup().addTo(map);
+          let peticion = null;
+
+          function cargarVista() {
+            if (peticion) peticion.abort();
+            peticion = new AbortController();
+            const params = new URLSearchParams({ bbox: map.getBounds().toBBoxString(), zoom: map.getZoom() });
+            fetch('${API_CENTROS}?' + params, { signal: peticion.signal })
+              .then((r) => r.json())
+              .then((vista) => {
+                capa.clearLayers();
+                vista.grupos.forEach((g) => {
+                  const icono = L.divIcon({ className: 'grupo', html: String(g.cantidad), iconSize: [40, 40] });
+                  L.marker([g.lat, g.lng], { icon: icono })
+                    .on('click', () => map.setView([g.lat, g.lng], map.getZoom() + 2))
+                    .addTo(capa);
+                });
+                vista.centros.forEach((c) => {
+                  const popup = document.createElement('div');
+                  popup.innerHTML = '<strong></strong><br>Distrito: <span></span>';
+                  popup.querySelector('strong').textContent = c.nombre;
+                  popup.querySelector('span').textContent = c.distrito;
+                  L.marker([c.lat, c.lng]).addTo(capa).bindPopup(popup);
+                });
+                window.ReactNativeWebView.postMessage(JSON.stringify(vista.centros));
+              })
+              .catch((e) => { if (e.name !== 'AbortError') console.error(e); });
+          }
+
+          map.on('moveend', cargarVista);
+          cargarVista();
         </script>
       </body>
       </html>
     `;
   };
 
-  if (loading) {
-    return (
-      <View style={styles.centerContainer}>
-        <ActivityIndicator size="large" color="#0000ff" />
-        <Text style={{ marginTop: 10 }}>Cargando centros de votación...</Text>
-      </View>
-    );
-  }
+  // El HTML no depende del estado: regenerarlo recargaría el mapa
+  const mapHTML = useMemo(generateMapHTML, []);
 
   return (
     <View style={styles.container}>
       <WebView
-        source={{ html: generateMapHTML() }}
+        source={{ html: mapHTML }}
+        onMessage={onMapMessage}
         style={{ width: "100%", height: Dimensions.get("window").height * 0.7 }}
       />
       <ScrollView style={styles.infoPanelContainer}>
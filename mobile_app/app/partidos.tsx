@@ -25,7 +25,7 @@ interface Partido {
   nombre_partido: string;
   siglas: string | null;
   fecha_inscripcion: string | null;
-  logo_base64: string | null;
+  logo_url: string | null; // Ruta relativa a API_BASE
   direccion_legal: string | null;
   telefonos: string | null;
   sitio_web: string | null;
@@ -92,8 +92,8 @@ export default function PartidosScreen() {
           <Image
             style={styles.logo}
             source={
-              item.logo_base64
-                ? { uri: `data:image/jpeg;base64,${item.logo_base64}` }
+              item.logo_url
+                ? { uri: `${API_BASE}${item.logo_url}?size=96` }
                 : require("../assets/images/icon.png") // Placeholder
             }
           />
@@ -1,8 +1,10 @@
 import uuid
 from extensions import db
-from sqlalchemy import String, Integer, Date, Enum, ForeignKey, Numeric, Text, DateTime
-from sqlalchemy.dialects.mysql import CHAR, MEDIUMBLOB
-from sqlalchemy.orm import relationship
+from collections import Counter
+from sqlalchemy import String, Integer, Date, Enum, ForeignKey, Numeric, Text, DateTime, event, func, inspect, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.dialects.mysql import CHAR
+from sqlalchemy.orm import Session, relationship
 from datetime import datetime, timezone 
 
 # --- Modelos de Usuarios y Ubicación ---
@@ -17,7 +19,7 @@ class CentrosVotacion(db.Model):
     id_centro = db.Column(CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     nombre = db.Column(db.String(255), nullable=False)
     direccion = db.Column(db.String(255), nullable=False)
-    distrito = db.Column(db.String(100))
+    distrito = db.Column(db.String(100), index=True)
     latitud = db.Column(db.Numeric(10, 8), nullable=True)
     longitud = db.Column(db.Numeric(11, 8), nullable=True)
     
@@ -85,7 +87,8 @@ class Usuarios(db.Model):
 class PartidosPoliticos(db.Model):
     """
     Almacena las agrupaciones políticas.
-    Optimizado para los datos del JNE y para almacenar el logo como BLOB.
+    Optimizado para los datos del JNE. El logo vive en el almacén de medios
+    (media/store.py); aquí solo se guarda su sha256.
     """
     __tablename__ = 'PartidosPoliticos'
     
@@ -95,8 +98,10 @@ class PartidosPoliticos(db.Model):
     siglas = db.Column(db.String(50), nullable=True)
     fecha_inscripcion = db.Column(db.Date, nullable=True)
     
-    # --- Campo BLOB para el logo (para la IA) ---
-    logo_blob = db.Column(MEDIUMBLOB, nullable=True, comment='Datos binarios de la imagen del logo')
+    # --- Logo: sha256 del archivo en el almacén de medios ---
+    logo_sha256 = db.Column(CHAR(64), nullable=True, comment='sha256 del logo en MEDIA_ROOT')
+    # Miniatura difuminada (data URI) para mostrar mientras carga el logo
+    logo_placeholder = db.Column(db.String(1024), nullable=True)
     
     # --- Campos de información de contacto (del HTML/scraper) ---
     direccion_legal = db.Column(db.String(255), nullable=True)
@@ -122,6 +127,13 @@ class PartidosPoliticos(db.Model):
 
 class Candidatos(db.Model):
     __tablename__ = 'candidatos'
+    __table_args__ = (
+        # Filtros de /api/candidatos: tipo (+ región) y partido. La API los
+        # resuelve en la instantánea en memoria (lectura.py); en MySQL sirven
+        # a las consultas directas y el de partido respalda la clave foránea
+        db.Index('idx_candidatos_tipo_region', 'tipo_candidatura', 'region'),
+        db.Index('idx_candidatos_partido', 'partido_politico_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     nombre_completo = db.Column(db.String(255), nullable=False)
@@ -132,8 +144,9 @@ class Candidatos(db.Model):
     # URL al perfil detallado en eleccionesperu.pe
     perfil_url = db.Column(db.String(500), unique=True) 
     
-    # BLOB para almacenar la foto descargada
-    imagen_blob = db.Column(MEDIUMBLOB, nullable=True)
+    # sha256 de la foto descargada, guardada en el almacén de medios
+    imagen_sha256 = db.Column(CHAR(64), nullable=True)
+    imagen_placeholder = db.Column(db.String(1024), nullable=True)
     partido_politico_id = db.Column(
         CHAR(36), 
         db.ForeignKey('PartidosPoliticos.id_partido'),
@@ -148,4 +161,252 @@ class Candidatos(db.Model):
     partido_politico = relationship('PartidosPoliticos', backref=db.backref('candidatos', lazy=True))
 
     def __repr__(self):
-        return f'<Candidato {self.nombre_completo}>'
\ No newline at end of file
+        return f'<Candidato {self.nombre_completo}>'
+
+# --- Versiones de datos (invalidación de cachés) ---
+
+class VersionesDatos(db.Model):
+    """
+    Un contador por tabla que los scrapers incrementan en la misma
+    transacción en que reemplazan los datos. Las cachés de respuestas
+    comparan contra esta versión en lugar de caducar por tiempo.
+    """
+    __tablename__ = 'VersionesDatos'
+
+    tabla = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    actualizado = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
+                            onupdate=lambda: datetime.now(timezone.utc))
+
+    @classmethod
+    def incrementar(cls, *tablas, sesion=None):
+        """Sube la versión de cada tabla dentro de la sesión actual o `sesion` (sin commit)."""
+        if sesion is None:
+            sesion = db.session
+        for tabla in tablas:
+            fila = sesion.get(cls, tabla, with_for_update=True)
+            if fila is None:
+                sesion.add(cls(tabla=tabla, version=1))
+            else:
+                fila.version += 1
+
+    @classmethod
+    def todas(cls):
+        """Diccionario {tabla: version} con una sola consulta."""
+        return dict(db.session.query(cls.tabla, cls.version).all())
+
+    def __repr__(self):
+        return f'<VersionesDatos {self.tabla}={self.version}>'
+
+
+# --- Conteos por distrito (facetas del mapa) ---
+
+class ConteosDistrito(db.Model):
+    """
+    Centros, mesas y electores registrados de cada distrito. Se mantienen
+    en cada alta, baja o cambio por el ORM (ver _contar_cambios) en lugar
+    de agrupar las tres tablas en cada consulta; las cargas masivas que no
+    pasan por el ORM (padrón, scripts SQL) los rehacen al final con recontar().
+    """
+    __tablename__ = 'ConteosDistrito'
+
+    distrito = db.Column(db.String(100), primary_key=True)
+    centros = db.Column(db.Integer, nullable=False, default=0)
+    mesas = db.Column(db.Integer, nullable=False, default=0)
+    electores = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def sumar(cls, sesion, distrito, centros=0, mesas=0, electores=0):
+        """
+        Suma a los contadores del distrito dentro de `sesion` (sin commit).
+        Es un solo INSERT ... ON DUPLICATE KEY UPDATE: dos transacciones que
+        dan de alta a la vez el primer centro de un distrito nuevo no chocan
+        con la clave primaria, y la suma la hace la BD sobre la fila vigente.
+        """
+        tabla = cls.__table__
+        sumas = {'centros': centros, 'mesas': mesas, 'electores': electores}
+        dialecto = sesion.get_bind().dialect.name
+        if dialecto == 'mysql':
+            sentencia = mysql.insert(tabla).values(distrito=distrito, **sumas)
+            sentencia = sentencia.on_duplicate_key_update(
+                **{campo: tabla.c[campo] + cantidad for campo, cantidad in sumas.items()}
+            )
+        else:
+            modulo = postgresql if dialecto == 'postgresql' else sqlite
+            sentencia = modulo.insert(tabla).values(distrito=distrito, **sumas)
+            sentencia = sentencia.on_conflict_do_update(
+                index_elements=[tabla.c.distrito],
+                set_={campo: tabla.c[campo] + cantidad for campo, cantidad in sumas.items()},
+            )
+        sesion.execute(sentencia)
+
+    @classmethod
+    def recontar(cls):
+        """Rehace todos los contadores con un GROUP BY por tabla (sin commit)."""
+        conteos = {}
+        consultas = {
+            'centros': select(CentrosVotacion.distrito, func.count()),
+            'mesas': select(CentrosVotacion.distrito, func.count())
+                .join(Mesas, Mesas.id_centro == CentrosVotacion.id_centro),
+            'electores': select(CentrosVotacion.distrito, func.count())
+                .join(Mesas, Mesas.id_centro == CentrosVotacion.id_centro)
+                .join(Usuarios, Usuarios.id_mesa == Mesas.id_mesa),
+        }
+        for campo, consulta in consultas.items():
+            consulta = consulta.where(CentrosVotacion.distrito.isnot(None)).group_by(CentrosVotacion.distrito)
+            for distrito, cantidad in db.session.execute(consulta):
+                conteos.setdefault(distrito, {'distrito': distrito, 'centros': 0, 'mesas': 0, 'electores': 0})
+                conteos[distrito][campo] = cantidad
+        db.session.execute(cls.__table__.delete())
+        if conteos:
+            db.session.execute(cls.__table__.insert(), list(conteos.values()))
+        return len(conteos)
+
+    @classmethod
+    def recontar_si_vacia(cls):
+        """Llena la tabla recién creada si ya hay centros cargados."""
+        if db.session.query(cls.distrito).first() is None and db.session.query(CentrosVotacion.id_centro).first():
+            print("Calculando conteos por distrito...")
+            cls.recontar()
+            db.session.commit()
+
+    def to_dict(self):
+        return {
+            'distrito': self.distrito,
+            'centros': self.centros,
+            'mesas': self.mesas,
+            'electores': self.electores,
+        }
+
+    def __repr__(self):
+        return f'<ConteosDistrito {self.distrito}>'
+
+
+def _distrito_de_centro(sesion, id_centro):
+    centro = sesion.get(CentrosVotacion, id_centro) if id_centro is not None else None
+    return centro.distrito if centro is not None else None
+
+
+def _distrito_de_mesa(sesion, mesa):
+    if mesa is None:
+        return None
+    if mesa.centro_votacion is not None:
+        return mesa.centro_votacion.distrito
+    return _distrito_de_centro(sesion, mesa.id_centro)
+
+
+def _anterior(sesion, obj, columna):
+    """Valor de `columna` que `obj` tiene en la BD, antes de los cambios de este flush."""
+    historia = inspect(obj).attrs[columna.key].history
+    if historia.deleted:
+        return historia.deleted[0]
+    if not historia.added:
+        return getattr(obj, columna.key)
+    # Se asignó sin haberlo leído antes: el valor anterior sigue en la BD
+    pk = inspect(type(obj)).primary_key[0]
+    return sesion.execute(select(columna).where(pk == getattr(obj, pk.key))).scalar()
+
+
+def _relacionado(sesion, obj, relacion, columna, modelo):
+    """Objeto al que apunta `obj` tras este flush, asignado por `relacion` o por su FK `columna`."""
+    asignado = inspect(obj).attrs[relacion].history.added
+    if asignado:
+        return asignado[0]
+    valor = getattr(obj, columna.key)
+    return sesion.get(modelo, valor) if valor is not None else None
+
+
+def _distritos(sesion, obj, nuevo, borrado):
+    """(campo, distrito antes del flush, distrito después) de un centro, mesa o elector."""
+    if isinstance(obj, CentrosVotacion):
+        antes = None if nuevo else _anterior(sesion, obj, CentrosVotacion.distrito)
+        return 'centros', antes, None if borrado else obj.distrito
+    if isinstance(obj, Mesas):
+        antes = None if nuevo else _distrito_de_centro(sesion, _anterior(sesion, obj, Mesas.id_centro))
+        centro = None if borrado else _relacionado(sesion, obj, 'centro_votacion', Mesas.id_centro, CentrosVotacion)
+        return 'mesas', antes, centro.distrito if centro is not None else None
+    if isinstance(obj, Usuarios):
+        id_mesa = None if nuevo else _anterior(sesion, obj, Usuarios.id_mesa)
+        antes = _distrito_de_mesa(sesion, sesion.get(Mesas, id_mesa) if id_mesa is not None else None)
+        mesa = None if borrado else _relacionado(sesion, obj, 'mesa', Usuarios.id_mesa, Mesas)
+        return 'electores', antes, _distrito_de_mesa(sesion, mesa)
+    return None, None, None
+
+
+@event.listens_for(Session, 'before_flush')
+def _contar_cambios(sesion, contexto, instancias):
+    """
+    Lleva a ConteosDistrito los centros, mesas y electores que este flush
+    inserta, borra o pasa a otro distrito: un centro con otro distrito, una
+    mesa en otro centro o un elector en otra mesa. Al mudarse un centro o
+    una mesa se mudan también sus mesas y electores.
+    """
+    cambios = {}
+
+    def mover(campo, antes, despues, cantidad=1):
+        if antes != despues and cantidad:
+            if antes:
+                cambios.setdefault(antes, Counter())[campo] -= cantidad
+            if despues:
+                cambios.setdefault(despues, Counter())[campo] += cantidad
+
+    with sesion.no_autoflush:
+        objetos = [(obj, True, False) for obj in sesion.new]
+        objetos += [(obj, False, True) for obj in sesion.deleted]
+        objetos += [(obj, False, False) for obj in sesion.dirty if sesion.is_modified(obj)]
+        for obj, nuevo, borrado in objetos:
+            campo, antes, despues = _distritos(sesion, obj, nuevo, borrado)
+            if campo is None or antes == despues:
+                continue
+            mover(campo, antes, despues)
+            if nuevo or borrado:
+                # Un centro o una mesa se borra sin nada que cuelgue de él (claves foráneas)
+                continue
+            # Un centro o una mesa que cambia de distrito se lleva lo que cuelga de él
+            if isinstance(obj, CentrosVotacion):
+                de_sus_mesas = Mesas.id_centro == obj.id_centro
+                mover('mesas', antes, despues, sesion.execute(
+                    select(func.count()).select_from(Mesas).where(de_sus_mesas)).scalar())
+                mover('electores', antes, despues, sesion.execute(
+                    select(func.count()).select_from(Usuarios).join(Mesas).where(de_sus_mesas)).scalar())
+            elif isinstance(obj, Mesas):
+                mover('electores', antes, despues, sesion.execute(
+                    select(func.count()).select_from(Usuarios).where(Usuarios.id_mesa == obj.id_mesa)).scalar())
+
+    for distrito, cantidades in cambios.items():
+        ConteosDistrito.sumar(sesion, distrito, **cantidades)
+
+
+# Modelos del mapa cuyo cambio invalida la instantánea y las teselas
+_TABLAS_DEL_MAPA = {CentrosVotacion: 'CentrosVotacion', Mesas: 'Mesas'}
+
+
+@event.listens_for(Session, 'before_flush')
+def _versionar_mapa(sesion, contexto, instancias):
+    """
+    Sube la versión de CentrosVotacion o Mesas cuando este flush inserta,
+    modifica o borra alguno por el ORM; las cargas por SQL lo hacen con
+    `flask mapa recontar`.
+    """
+    tablas = {_TABLAS_DEL_MAPA.get(type(obj)) for obj in (*sesion.new, *sesion.deleted)}
+    tablas.update(_TABLAS_DEL_MAPA.get(type(obj)) for obj in sesion.dirty if sesion.is_modified(obj))
+    tablas.discard(None)
+    if tablas:
+        VersionesDatos.incrementar(*sorted(tablas), sesion=sesion)
+
+
+def crear_indices_faltantes():
+    """
+    db.create_all() no toca tablas que ya existen, así que los índices
+    declarados después en los modelos se crean aquí si todavía no están.
+    """
+    inspector = db.inspect(db.engine)
+    for tabla in db.metadata.sorted_tables:
+        if not inspector.has_table(tabla.name):
+            continue
+        existentes = {i['name'] for i in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in existentes:
+                print(f"Creando índice {indice.name} en {tabla.name}...")
+                indice.create(db.engine)
+
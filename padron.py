@@ -0,0 +1,161 @@
+import threading
+from array import array
+from bisect import bisect_left
+
+from flask import current_app
+from sqlalchemy import select
+
+from extensions import db, response_cache
+from lectura import modelo_lectura
+from models import Usuarios
+
+# Tabla de VersionesDatos que sube la carga del padrón
+TABLAS = ('Usuarios',)
+# Filas por lote al leer el padrón desde MySQL
+LOTE_CARGA = 50000
+
+
+def normalizar_dni(valor):
+    """'01234567' -> 1234567 (el DNI cabe en 32 bits); None si no son 8 dígitos."""
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    if len(valor) != 8 or not valor.isascii() or not valor.isdigit():
+        return None
+    return int(valor)
+
+
+def formatear_dni(dni):
+    return f"{dni:08d}"
+
+
+class Asignaciones:
+    """
+    DNI -> id_mesa como dos arreglos paralelos de enteros de 32 bits,
+    ordenados por DNI: 8 bytes por elector (decenas de millones caben en
+    unos cientos de MB, a diferencia de un dict) y búsqueda con bisect.
+    """
+    __slots__ = ('version', 'dnis', 'mesas')
+
+    def __init__(self, version, dnis, mesas):
+        self.version = version
+        self.dnis = dnis
+        self.mesas = mesas
+
+    def __len__(self):
+        return len(self.dnis)
+
+    def mesa_de(self, dni):
+        i = bisect_left(self.dnis, dni)
+        if i < len(self.dnis) and self.dnis[i] == dni:
+            return self.mesas[i]
+        return None
+
+
+def _leer_asignaciones(version):
+    """Lee Usuarios en lotes, ya ordenado por el índice único de dni."""
+    dnis, mesas = array('I'), array('I')
+    consulta = (
+        select(Usuarios.dni, Usuarios.id_mesa)
+        .where(Usuarios.id_mesa.isnot(None))
+        .order_by(Usuarios.dni)
+        .execution_options(yield_per=LOTE_CARGA)
+    )
+    for dni, id_mesa in db.session.execute(consulta):
+        numero = normalizar_dni(dni)
+        if numero is not None:
+            dnis.append(numero)
+            mesas.append(id_mesa)
+    return Asignaciones(version, dnis, mesas)
+
+
+class PadronElectoral:
+    """
+    Resuelve "¿dónde voto?": DNI -> mesa -> centro en una sola búsqueda en
+    memoria. Las asignaciones se recargan en un hilo aparte cuando sube la
+    versión de Usuarios (la carga masiva del padrón); mientras tanto se
+    siguen usando las anteriores. Solo mientras corre la primera carga del
+    proceso se busca en MySQL (por el índice único de dni); después, un DNI
+    que no está en memoria no está en el padrón y no cuesta una consulta.
+    Un elector que se registra con mesa por /api/register aparece tras la
+    siguiente carga del padrón.
+
+    La mesa y el centro salen del modelo de lectura (lectura.py), con la
+    respuesta de cada mesa ya armada.
+    """
+
+    def __init__(self):
+        self._asignaciones = None
+        self._cargando = False
+        self._lock = threading.Lock()
+
+    def _vigentes(self):
+        asignaciones = self._asignaciones
+        version = response_cache.versiones(TABLAS)
+        if (asignaciones is None or asignaciones.version != version) and not self._cargando:
+            with self._lock:
+                if not self._cargando:
+                    self._cargando = True
+                    threading.Thread(
+                        target=self._cargar,
+                        args=(current_app._get_current_object(), version),
+                        daemon=True,
+                    ).start()
+        return asignaciones
+
+    def _cargar(self, app, version):
+        try:
+            with app.app_context():
+                self._asignaciones = _leer_asignaciones(version)
+        except Exception as e:
+            print(f"Error al cargar el padrón en memoria: {e}")
+        finally:
+            self._cargando = False
+
+    def mesa_de(self, dni):
+        """id_mesa del elector (DNI ya normalizado) o None."""
+        asignaciones = self._vigentes()
+        if asignaciones is not None:
+            return asignaciones.mesa_de(dni)
+        # Primera carga en curso: se responde desde MySQL mientras tanto
+        return db.session.execute(
+            select(Usuarios.id_mesa).where(Usuarios.dni == formatear_dni(dni))
+        ).scalar()
+
+    def _local_de_mesa(self, id_mesa):
+        """Centro, mesa y coordenadas de `id_mesa`, armados una vez por versión."""
+        instantanea = modelo_lectura.actual()
+        locales = instantanea.derivado('locales_por_mesa', lambda _: {})
+        local = locales.get(id_mesa)
+        if local is None:
+            mesa = instantanea.mesas_por_id.get(id_mesa)
+            centro = instantanea.centros_por_id.get(mesa.id_centro) if mesa else None
+            if centro is None:
+                return None
+            local = {
+                'numero_mesa': mesa.numero_mesa,
+                'ubicacion_detalle': mesa.ubicacion_detalle,
+                'centro': {
+                    'id': centro.id_centro,
+                    'nombre': centro.nombre,
+                    'direccion': centro.direccion,
+                    'distrito': centro.distrito,
+                    'lat': centro.latitud,
+                    'lng': centro.longitud,
+                },
+            }
+            locales[id_mesa] = local
+        return local
+
+    def local_de(self, dni):
+        """{dni, numero_mesa, ubicacion_detalle, centro} del elector, o None."""
+        id_mesa = self.mesa_de(dni)
+        if id_mesa is None:
+            return None
+        local = self._local_de_mesa(id_mesa)
+        if local is None:
+            return None
+        return dict(local, dni=formatear_dni(dni))
+
+
+padron = PadronElectoral()
@@ -0,0 +1,70 @@
+import base64
+import json
+from bisect import bisect_right
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 500
+
+
+class CursorInvalido(ValueError):
+    """El parámetro `after` o `limit` no tiene un formato válido."""
+
+
+def codificar_cursor(valores):
+    """Cursor opaco (base64url de JSON) con los valores de la clave de orden."""
+    data = json.dumps(list(valores), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, n_columnas):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        raise CursorInvalido('cursor inválido')
+    if not isinstance(valores, list) or len(valores) != n_columnas:
+        raise CursorInvalido('cursor inválido')
+    return valores
+
+
+def leer_parametros(args):
+    """
+    (limit, after) de la query string. Devuelve None si la petición no pide
+    paginación, para que las rutas mantengan la respuesta de lista completa.
+    """
+    if 'limit' not in args and 'after' not in args:
+        return None
+    try:
+        limite = int(args.get('limit', LIMITE_POR_DEFECTO))
+    except ValueError:
+        raise CursorInvalido('limit debe ser un entero')
+    if limite < 1:
+        raise CursorInvalido('limit debe ser mayor que 0')
+    return min(limite, LIMITE_MAXIMO), args.get('after') or None
+
+
+def paginar(filas, columnas, limite, after):
+    """
+    Paginación por clave (keyset) sobre `filas`, ya ordenadas por los
+    atributos `columnas` (únicos en conjunto): la posición de `after` se
+    busca con bisect, así que el coste de una página no depende de su
+    posición, al contrario de OFFSET.
+    Devuelve (filas, next_cursor).
+    """
+    def clave(fila):
+        return tuple(getattr(fila, c) for c in columnas)
+
+    inicio = 0
+    if after:
+        try:
+            inicio = bisect_right(filas, tuple(decodificar_cursor(after, len(columnas))), key=clave)
+        except TypeError:
+            # Valores de otro tipo que la clave (p. ej. texto donde va un id)
+            raise CursorInvalido('cursor inválido')
+    pagina = filas[inicio:inicio + limite + 1]
+
+    next_cursor = None
+    if len(pagina) > limite:
+        pagina = pagina[:limite]
+        next_cursor = codificar_cursor(clave(pagina[-1]))
+    return pagina, next_cursor
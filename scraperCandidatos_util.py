@@ -3,9 +3,9 @@ import requests
 import re
 from bs4 import BeautifulSoup
 from datetime import datetime
-from app import create_app
-from extensions import db
-from models import Candidatos
+from extensions import db, media_store
+from models import Candidatos, VersionesDatos
+from media.variantes import generar_variantes
 from sqlalchemy.exc import IntegrityError
 
 #instalar dependencias: source venv38/Scripts/activate && pip install -r requirements.txt
@@ -137,15 +137,17 @@ def populate_database(app):
             print(f"Se eliminaron {num_deleted} registros antiguos.")
             
             print(f"Insertando {len(unique_candidates)} candidatos nuevos en la BD...")
+            nuevos_candidatos = []
 
             for data in unique_candidates:
                 imagen_blob = download_image(data.get('imagen_url'))
+                imagen_sha256 = media_store.guardar(imagen_blob) if imagen_blob else None
 
                 nuevo_candidato = Candidatos(
                     nombre_completo=data.get('nombre_candidato'),
                     tipo_candidatura=data.get('tipo_candidato'),
                     perfil_url=data.get('perfil_url'),
-                    imagen_blob=imagen_blob
+                    imagen_sha256=imagen_sha256
                 )
                 try:
                     db.session.add(nuevo_candidato)
@@ -155,6 +157,18 @@ def populate_database(app):
                     db.session.rollback()
                     print(f"Omitido candidato duplicado en BD: {data.get('perfil_url')}")
                     continue
+                nuevos_candidatos.append(nuevo_candidato)
+
+            # Miniaturas y WebP en un pool de procesos (fuera del camino de las peticiones)
+            print("Generando variantes de las fotos...")
+            placeholders, fallidas = generar_variantes(media_store, [c.imagen_sha256 for c in nuevos_candidatos])
+            if fallidas:
+                print(f"{len(fallidas)} fotos sin variantes (se servirá el original).")
+            for candidato in nuevos_candidatos:
+                candidato.imagen_placeholder = placeholders.get(candidato.imagen_sha256)
+
+            # Invalida las respuestas cacheadas que dependen de esta tabla
+            VersionesDatos.incrementar(table_name)
 
             # Commit final después de filtrar/omitir duplicados
             db.session.commit()
@@ -166,5 +180,8 @@ def populate_database(app):
 
 if __name__ == "__main__":
     print("Creando contexto de la aplicación Flask...")
+    # Se importa aquí: los procesos del pool de variantes vuelven a importar
+    # este script (spawn) y no deben crear otra app
+    from app import create_app
     app = create_app()
     populate_database(app)
\ No newline at end of file
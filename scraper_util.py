@@ -3,9 +3,9 @@ import requests
 import re
 from bs4 import BeautifulSoup
 from datetime import datetime
-from app import create_app  # Importa el factory de tu app Flask
-from extensions import db
-from models import PartidosPoliticos
+from extensions import db, media_store
+from models import PartidosPoliticos, VersionesDatos
+from media.variantes import generar_variantes
 
 #instalar dependencias: source venv38/Scripts/activate && pip install -r requirements.txt
 #Ejecución: python scraper_util.py
@@ -155,16 +155,18 @@ def populate_database(app):
             print(f"Se eliminaron {num_deleted} registros antiguos.")
             
             print(f"Insertando {len(partidos_list)} partidos nuevos en la BD...")
+            nuevos_partidos = []
             for data in partidos_list:
-                # Descargar el logo y obtener los bytes (BLOB)
+                # Descargar el logo y guardarlo en el almacén de medios
                 logo_blob = download_logo(data.get('logo_url'))
+                logo_sha256 = media_store.guardar(logo_blob) if logo_blob else None
                 
                 # Crear la nueva instancia del modelo
                 nuevo_partido = PartidosPoliticos(
                     jne_id_simbolo=data.get('jne_id_simbolo'),
                     nombre_partido=data.get('nombre_partido'),
                     fecha_inscripcion=data.get('fecha_inscripcion'),
-                    logo_blob=logo_blob, # Guardamos los datos binarios
+                    logo_sha256=logo_sha256, # Solo el hash; los bytes van a MEDIA_ROOT
                     direccion_legal=data.get('direccion_legal'),
                     telefonos=data.get('telefonos'),
                     sitio_web=data.get('sitio_web'),
@@ -174,6 +176,18 @@ def populate_database(app):
                     # 'siglas' e 'ideologia' se dejan por defecto (NULL o 'Desconocido')
                 )
                 db.session.add(nuevo_partido)
+                nuevos_partidos.append(nuevo_partido)
+
+            # Miniaturas y WebP en un pool de procesos (fuera del camino de las peticiones)
+            print("Generando variantes de los logos...")
+            placeholders, fallidas = generar_variantes(media_store, [p.logo_sha256 for p in nuevos_partidos])
+            if fallidas:
+                print(f"{len(fallidas)} logos sin variantes (se servirá el original).")
+            for partido in nuevos_partidos:
+                partido.logo_placeholder = placeholders.get(partido.logo_sha256)
+
+            # Invalida las respuestas cacheadas que dependen de esta tabla
+            VersionesDatos.incrementar(PartidosPoliticos.__tablename__)
             
             # Confirmar la transacción
             db.session.commit()
@@ -188,5 +202,8 @@ if __name__ == "__main__":
     # Creamos una instancia de la app Flask para tener el contexto
     # de la base de datos (SQLAlchemy) según tu factory pattern en app.py
     print("Creando contexto de la aplicación Flask...")
+    # Se importa aquí: los procesos del pool de variantes vuelven a importar
+    # este script (spawn) y no deben crear otra app
+    from app import create_app  # Importa el factory de tu app Flask
     app = create_app()
     populate_database(app)
\ No newline at end of file
@@ -74,7 +74,8 @@ CREATE TABLE IF NOT EXISTS PartidosPoliticos (
   siglas VARCHAR(50) NULL,
   fecha_inscripcion DATE NULL,
   
-  logo_blob MEDIUMBLOB NULL COMMENT 'Datos binarios de la imagen del logo',
+  logo_sha256 CHAR(64) NULL COMMENT 'sha256 del logo en MEDIA_ROOT',
+  logo_placeholder VARCHAR(1024) NULL COMMENT 'Miniatura difuminada (data URI) del logo',
   nombre_candidato_principal VARCHAR(255) NULL COMMENT 'Nombre del candidato principal',
   foto_candidato_principal MEDIUMBLOB NULL COMMENT 'Foto del candidato principal',
   
@@ -91,7 +92,32 @@ CREATE TABLE IF NOT EXISTS PartidosPoliticos (
   -- Índice para acelerar búsquedas por nombre (como en models.py)
   INDEX idx_nombre_partido (nombre_partido)
   
-) COMMENT='Agrupaciones políticas. Logos guardados como BLOB.';
+) COMMENT='Agrupaciones políticas. Logos en el almacén de medios (sha256).';
+
+
+-- -----------------------------------------------------
+-- Tabla: candidatos
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS candidatos (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  nombre_completo VARCHAR(255) NOT NULL,
+  tipo_candidatura VARCHAR(11) NULL COMMENT 'Gobernador o Alcalde',
+  perfil_url VARCHAR(500) NULL UNIQUE COMMENT 'Perfil en eleccionesperu.pe',
+
+  imagen_sha256 CHAR(64) NULL COMMENT 'sha256 de la foto en MEDIA_ROOT',
+  imagen_placeholder VARCHAR(1024) NULL COMMENT 'Miniatura difuminada (data URI) de la foto',
+
+  partido_politico_id CHAR(36) NULL,
+  region VARCHAR(50) NULL,
+  biografia TEXT NULL,
+  fecha_creacion DATETIME NULL,
+
+  -- Índices para los filtros de /api/candidatos (como en models.py)
+  INDEX idx_candidatos_tipo_region (tipo_candidatura, region),
+  INDEX idx_candidatos_partido (partido_politico_id),
+
+  FOREIGN KEY (partido_politico_id) REFERENCES PartidosPoliticos(id_partido)
+) COMMENT='Candidatos regionales y municipales. Fotos en el almacén de medios (sha256).';
 
 INSERT INTO CentrosVotacion (id_centro, nombre, direccion, distrito, latitud, longitud) VALUES
 (UUID(), 'IE 7069 José María Arguedas', 'Av. Los Héroes 345', 'San Juan de Miraflores', -12.157892, -76.971234),
@@ -0,0 +1,179 @@
+import gzip
+import json
+import os
+import shutil
+import threading
+
+from geo import ZOOM_CENTROS, CELDAS_POR_TESELA_LOG2, indice_mapa
+from lectura import modelo_lectura
+
+# Versiones de VersionesDatos que cambian el contenido de las teselas
+TABLAS = ('CentrosVotacion', 'Mesas')
+# Versiones anteriores que se conservan en disco para clientes con la página vieja
+VERSIONES_CONSERVADAS = 1
+# Marca de que el directorio de una versión está completo
+COMPLETA = '.completa'
+
+# Las teselas de al menos este tamaño se guardan también comprimidas (.gz)
+MINIMO_GZIP = 1024
+
+TESELA_VACIA = b'{"type":"FeatureCollection","features":[]}'
+
+
+def nombre_version(instantanea):
+    """'12-7': versión de centros y mesas; va en la URL de las teselas (?v=)."""
+    return '-'.join(str(v) for v in instantanea.version(TABLAS))
+
+
+def _punto(lat, lng, propiedades):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [round(lng, 6), round(lat, 6)]},
+        'properties': propiedades,
+    }
+
+
+def _centro(instantanea, c):
+    # Lleva todo lo que muestra el popup: la página no necesita otros datos
+    resumen = instantanea.resumen_de(c.id_centro)
+    return _punto(c.latitud, c.longitud, {
+        'id': c.id_centro,
+        'nombre': c.nombre,
+        'distrito': c.distrito,
+        'ubicacion_detalle': resumen['ubicacion_detalle'],
+        'mesas': resumen['mesas'],
+        'primera_mesa': resumen['primera_mesa'],
+        'ultima_mesa': resumen['ultima_mesa'],
+    })
+
+
+def _features(instantanea, zoom, valor):
+    """Features GeoJSON de una celda del IndiceMapa en ese zoom."""
+    if zoom == ZOOM_CENTROS:
+        return [_centro(instantanea, c) for c in valor]
+    if valor.centro is not None:
+        return [_centro(instantanea, valor.centro)]
+    return [_punto(valor.lat, valor.lng, {'cantidad': valor.cantidad})]
+
+
+def _coleccion(features):
+    return json.dumps({'type': 'FeatureCollection', 'features': features},
+                      ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def tesela(instantanea, z, x, y):
+    """GeoJSON de la tesela z/x/y (las celdas del IndiceMapa que caen en ella)."""
+    nivel = indice_mapa(instantanea).niveles[z]
+    lado = 1 << CELDAS_POR_TESELA_LOG2
+    features = []
+    for cx in range(x * lado, (x + 1) * lado):
+        for cy in range(y * lado, (y + 1) * lado):
+            valor = nivel.get((cx, cy))
+            if valor is not None:
+                features.extend(_features(instantanea, z, valor))
+    return _coleccion(features)
+
+
+def todas(instantanea):
+    """{(z, x, y): GeoJSON} de todas las teselas con algún centro, de 0 a ZOOM_CENTROS."""
+    indice = indice_mapa(instantanea)
+    teselas = {}
+    for z, nivel in enumerate(indice.niveles):
+        for (cx, cy), valor in nivel.items():
+            clave = (z, cx >> CELDAS_POR_TESELA_LOG2, cy >> CELDAS_POR_TESELA_LOG2)
+            teselas.setdefault(clave, []).extend(_features(instantanea, z, valor))
+    return {clave: _coleccion(features) for clave, features in teselas.items()}
+
+
+class AlmacenTeselas:
+    """
+    Teselas GeoJSON de los centros de votación pregeneradas en disco, una
+    carpeta por versión de los datos: TESELAS_ROOT/<version>/z/x/y.geojson.
+    Como el contenido de una versión no cambia, se sirven con caché
+    inmutable y el servidor web puede entregarlas como archivos estáticos.
+    Solo se escriben las teselas con algún centro; el resto son vacías.
+    Las grandes van también en .geojson.gz (sirve tal cual para gzip_static).
+    """
+
+    def __init__(self, app=None):
+        self.root = None
+        self._generando = set()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.root = app.config['TESELAS_ROOT']
+        os.makedirs(self.root, exist_ok=True)
+        app.extensions['almacen_teselas'] = self
+
+    def ruta(self, version, z, x, y):
+        return os.path.join(self.root, version, str(z), str(x), f"{y}.geojson")
+
+    def completa(self, version):
+        return os.path.isfile(os.path.join(self.root, version, COMPLETA))
+
+    def generar(self, instantanea):
+        """
+        Escribe todas las teselas de la versión de `instantanea` en una
+        carpeta temporal y la publica con un rename: quien sirve teselas
+        nunca ve una versión a medias. Devuelve cuántas se escribieron.
+        """
+        version = nombre_version(instantanea)
+        if self.completa(version):
+            return 0
+        temporal = os.path.join(self.root, f".{version}.{os.getpid()}.{threading.get_ident()}")
+        shutil.rmtree(temporal, ignore_errors=True)
+        teselas = todas(instantanea)
+        for (z, x, y), geojson in teselas.items():
+            ruta = os.path.join(temporal, str(z), str(x), f"{y}.geojson")
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            with open(ruta, 'wb') as f:
+                f.write(geojson)
+            if len(geojson) >= MINIMO_GZIP:
+                with open(ruta + '.gz', 'wb') as f:
+                    f.write(gzip.compress(geojson, mtime=0))
+        open(os.path.join(temporal, COMPLETA), 'wb').close()
+        try:
+            os.rename(temporal, os.path.join(self.root, version))
+        except OSError:
+            # Otro proceso publicó la misma versión primero
+            shutil.rmtree(temporal, ignore_errors=True)
+        self._limpiar(version)
+        return len(teselas)
+
+    def generar_vigentes(self):
+        """
+        Genera las teselas de los centros y mesas recién confirmados. Lo
+        llaman los comandos que los importan o modifican, para que el mapa
+        no tenga que armarlas en la primera petición.
+        """
+        return self.generar(modelo_lectura.recargar())
+
+    def _limpiar(self, vigente):
+        """Borra las versiones viejas, salvo las VERSIONES_CONSERVADAS más recientes."""
+        versiones = [v for v in os.listdir(self.root) if not v.startswith('.') and v != vigente]
+        versiones.sort(key=lambda v: os.path.getmtime(os.path.join(self.root, v)), reverse=True)
+        for version in versiones[VERSIONES_CONSERVADAS:]:
+            shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+
+    def generar_en_segundo_plano(self, instantanea):
+        """Genera la versión de `instantanea` en un hilo aparte si nadie lo está haciendo ya."""
+        version = nombre_version(instantanea)
+        with self._lock:
+            if version in self._generando:
+                return
+            self._generando.add(version)
+        threading.Thread(target=self._generar, args=(instantanea, version), daemon=True).start()
+
+    def _generar(self, instantanea, version):
+        try:
+            self.generar(instantanea)
+        except Exception as e:
+            print(f"Error al generar las teselas {version}: {e}")
+        finally:
+            with self._lock:
+                self._generando.discard(version)
+
+
+almacen_teselas = AlmacenTeselas()
@@ -0,0 +1,126 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Los módulos del proyecto están en la raíz del repositorio (sin paquete)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _vaciar_memoria():
+    """Las cachés en memoria son globales del proceso: cada test parte de cero."""
+    from busqueda import indice_busqueda
+    from extensions import response_cache
+    from lectura import modelo_lectura
+    from limites import limites_distritales
+    from padron import padron
+
+    response_cache.clear()
+    response_cache.invalidar_versiones()
+    response_cache.hits = response_cache.misses = response_cache.expulsiones = 0
+    modelo_lectura._actual = None
+    modelo_lectura._recargando = False
+    indice_busqueda._fuentes.clear()
+    padron._asignaciones = None
+    padron._cargando = False
+    limites_distritales._indice = None
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """
+    La app de create_app() sobre una BD SQLite temporal, con el almacén de
+    imágenes y las teselas en tmp_path. Config apunta a MySQL, así que se
+    parchea antes de importar app.py (que crea su propia app al importarse).
+    """
+    import config
+
+    configuracion = {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'MEDIA_ROOT': str(tmp_path / 'media'),
+        'TESELAS_ROOT': str(tmp_path / 'teselas'),
+        'DISTRITOS_GEOJSON': str(tmp_path / 'distritos.geojson'),
+        # Cada petición relee VersionesDatos: los cambios se ven al instante
+        'RESPONSE_CACHE_VERSION_TTL': 0,
+        'PASSWORD_HASH_WORKERS': 1,
+    }
+    for clave, valor in configuracion.items():
+        monkeypatch.setattr(config.Config, clave, valor)
+    _vaciar_memoria()
+
+    from app import create_app
+    from extensions import db
+
+    hilos = set(threading.enumerate())
+    app = create_app()
+    app.config['TESTING'] = True
+    yield app
+
+    # Los hilos de recarga (instantánea, padrón, teselas) no deben
+    # publicar nada en el test siguiente. El de la cola del pool de
+    # contraseñas vive lo que el pool
+    for hilo in set(threading.enumerate()) - hilos:
+        if hilo.daemon and hilo.name != 'QueueFeederThread':
+            hilo.join(timeout=10)
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def imagen(formato='PNG', color=(200, 30, 30, 255), tamano=(120, 80)):
+    """Bytes de una imagen de prueba (Pillow ya es dependencia del proyecto)."""
+    import io
+
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    modo = 'RGBA' if formato == 'PNG' else 'RGB'
+    Image.new(modo, tamano, color[:len(modo)]).save(buffer, formato)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def datos(app):
+    """
+    Dos partidos (uno con logo), tres candidatos (uno con foto y otro sin
+    partido) y dos centros en Miraflores y Lima con sus mesas. Devuelve
+    los ids que usan los tests.
+    """
+    from extensions import db, media_store
+    from models import Candidatos, CentrosVotacion, Mesas, PartidosPoliticos
+
+    with app.app_context():
+        logo = media_store.guardar(imagen('PNG'))
+        foto = media_store.guardar(imagen('JPEG', (30, 30, 200)))
+        pp = PartidosPoliticos(nombre_partido='Partido Popular', siglas='PP', logo_sha256=logo)
+        ap = PartidosPoliticos(nombre_partido='Acción Popular', siglas='AP')
+        db.session.add_all([pp, ap])
+        db.session.flush()
+        db.session.add_all([
+            Candidatos(nombre_completo='Juan Pérez Huamán', tipo_candidatura='Alcalde', perfil_url='u1',
+                       region='Lima', partido_politico_id=pp.id_partido, imagen_sha256=foto),
+            Candidatos(nombre_completo='Rosa Chávez Quispe', tipo_candidatura='Gobernador', perfil_url='u2',
+                       region='Cusco', partido_politico_id=ap.id_partido),
+            Candidatos(nombre_completo='María Flores', tipo_candidatura='Alcalde', perfil_url='u3', region='Lima'),
+        ])
+        miraflores = CentrosVotacion(nombre='IE Miraflores', direccion='Av. Larco 100', distrito='Miraflores',
+                                     latitud=-12.12, longitud=-77.03)
+        lima = CentrosVotacion(nombre='IE Lima', direccion='Jr. Huallaga 1', distrito='Lima',
+                               latitud=-12.05, longitud=-77.04)
+        db.session.add_all([miraflores, lima])
+        db.session.flush()
+        db.session.add_all([
+            Mesas(numero_mesa='000009', ubicacion_detalle='Pabellón A', id_centro=miraflores.id_centro),
+            Mesas(numero_mesa='000010', id_centro=miraflores.id_centro),
+            Mesas(numero_mesa='000100', ubicacion_detalle='Patio', id_centro=lima.id_centro),
+        ])
+        db.session.commit()
+        return {
+            'pp': pp.id_partido, 'ap': ap.id_partido, 'logo': logo, 'foto': foto,
+            'miraflores': miraflores.id_centro, 'lima': lima.id_centro,
+        }
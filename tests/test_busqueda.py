@@ -0,0 +1,215 @@
+import threading
+import time
+
+import pytest
+
+import busqueda
+from busqueda import MAX_EXPANSION_PREFIJO, _Fuente, normalizar, normalizar_lote
+from extensions import db
+from lectura import modelo_lectura
+from models import Candidatos, VersionesDatos
+
+
+def _fuente(registros):
+    """_Fuente de (título, otros campos, alias); el doc es el propio título."""
+    return _Fuente(1, [({'titulo': t}, t, otros, alias) for t, otros, alias in registros])
+
+
+CANDIDATOS = _fuente([
+    ('José Quispe Mamani', ('Cusco',), ()),
+    ('Juan Pérez Huamán', ('Lima',), ()),
+    ('María Huamán Flores', ('Lima',), ()),
+    ('Rosa Chávez Quispe', ('Puno',), ()),
+])
+
+PARTIDOS = _fuente([
+    ('Partido Popular', ('PP',), ('PP',)),
+    ('Acción Popular', ('AP',), ('AP',)),
+    ('Perú Posible', ('PPO',), ('PPO',)),
+])
+
+
+def test_normalizar():
+    assert normalizar('Pérez-Ñañez  N°5') == 'perez nanez n 5'
+    assert normalizar(None) == ''
+
+
+def test_normalizar_lote_igual_a_normalizar():
+    textos = ['Pérez-Ñañez', 'Av. 28 de Julio N° 1250', None, '', 'ßtraße\nLínea', '  Ç  ']
+    assert normalizar_lote(textos) == [normalizar(t.replace('\n', ' ') if t else t) for t in textos]
+
+
+def test_buscar_sin_tildes_y_titulo_primero():
+    total, mejores, truncado = CANDIDATOS.buscar(['huaman'], 10)
+    assert total == 2
+    assert not truncado
+    assert [doc['titulo'] for _, _, doc in mejores] == ['Juan Pérez Huamán', 'María Huamán Flores']
+
+
+def test_buscar_ultimo_termino_como_prefijo():
+    total, mejores, _ = CANDIDATOS.buscar(['quispe', 'mam'], 10)
+    assert total == 1
+    assert mejores[0][2]['titulo'] == 'José Quispe Mamani'
+
+
+def test_buscar_en_otros_campos_va_despues():
+    # "lima" solo está en la región: coincide, pero no en el título
+    total, mejores, _ = CANDIDATOS.buscar(['lima'], 10)
+    assert total == 2
+    assert {grupo for grupo, _, _ in mejores} == {1}
+
+
+def test_buscar_prefijo_truncado():
+    fuente = _fuente([(f'Cand a{i:04d}', (), ()) for i in range(MAX_EXPANSION_PREFIJO + 50)])
+    total, _, truncado = fuente.buscar(['a'], 10)
+    assert truncado
+    assert total == MAX_EXPANSION_PREFIJO
+    total, _, truncado = fuente.buscar(['a00'], 10)
+    assert not truncado
+    assert total == 100
+
+
+def test_api_search(client, datos):
+    respuesta = client.get('/api/search?q=huaman')
+    assert respuesta.status_code == 200
+    assert respuesta.json['total'] == 1
+    assert [(r['tipo'], r['titulo']) for r in respuesta.json['resultados']] == [('candidato', 'Juan Pérez Huamán')]
+    assert respuesta.json['truncado'] is False
+
+
+def test_api_search_en_todas_las_fuentes(client, datos):
+    # "popular" está en los partidos; "larco", en la dirección de un centro
+    titulos = {r['titulo'] for r in client.get('/api/search?q=popular').json['resultados']}
+    assert titulos == {'Partido Popular', 'Acción Popular'}
+    resultado = client.get('/api/search?q=larco&tipo=centro').json['resultados']
+    assert [(r['tipo'], r['id']) for r in resultado] == [('centro', datos['miraflores'])]
+    assert client.get('/api/search?q=larco&tipo=partido').json['total'] == 0
+
+
+def test_api_search_tipo_invalido(client):
+    assert client.get('/api/search?q=x&tipo=mesa').status_code == 400
+
+
+def test_api_search_ve_los_datos_nuevos(app, client, datos):
+    assert client.get('/api/search?q=quispe&tipo=candidato').json['total'] == 1
+    with app.app_context():
+        db.session.add(Candidatos(nombre_completo='Ana Quispe', perfil_url='u4'))
+        VersionesDatos.incrementar('candidatos')
+        db.session.commit()
+        modelo_lectura.recargar()
+    assert client.get('/api/search?q=quispe&tipo=candidato').json['total'] == 2
+
+
+def _titulos(resultado):
+    _, mejores = resultado
+    return [doc['titulo'] for _, doc in mejores]
+
+
+@pytest.mark.parametrize('q, esperado', [
+    ('Qispe', 'José Quispe Mamani'),       # letra de menos
+    ('Huamna', 'Juan Pérez Huamán'),       # letras cambiadas
+    ('maria huaman', 'María Huamán Flores'),
+])
+def test_similares_tolera_erratas(q, esperado):
+    assert _titulos(CANDIDATOS.similares(q, 1)) == [esperado]
+
+
+def test_similares_ordena_por_similitud():
+    total, resultados = CANDIDATOS.similares('quispe', 10)
+    assert total == 2
+    assert set(_titulos((total, resultados))) == {'José Quispe Mamani', 'Rosa Chávez Quispe'}
+    similitudes = [sim for sim, _ in resultados]
+    assert similitudes == sorted(similitudes, reverse=True)
+
+
+def test_similares_total_no_depende_del_limite():
+    total, resultados = CANDIDATOS.similares('quispe', 1)
+    assert (total, len(resultados)) == (2, 1)
+
+
+def test_similares_sin_parecido():
+    assert CANDIDATOS.similares('zzzz', 10) == (0, [])
+
+
+def test_api_candidatos_fuzzy(client, datos):
+    respuesta = client.get('/api/candidatos?nombre_completo=Rosa Chaves&fuzzy=1')
+    assert [c['nombre_completo'] for c in respuesta.json] == ['Rosa Chávez Quispe']
+    # Sin fuzzy, la errata no coincide
+    assert client.get('/api/candidatos?nombre_completo=Rosa Chaves').json == []
+
+
+def test_api_partidos_fuzzy(client, datos):
+    respuesta = client.get('/api/partidos?nombre_partido=Partdo Populr&fuzzy=1')
+    assert respuesta.json[0]['nombre_partido'] == 'Partido Popular'
+
+
+def test_api_search_fuzzy(client, datos):
+    respuesta = client.get('/api/search?q=Huamna&fuzzy=1&tipo=candidato')
+    resultados = respuesta.json['resultados']
+    assert [r['titulo'] for r in resultados] == ['Juan Pérez Huamán']
+    assert 0 < resultados[0]['similitud'] <= 1
+
+
+def test_api_search_fuzzy_total_real(client, datos):
+    # Dos partidos se parecen a "populr": total los cuenta aunque limit=1
+    respuesta = client.get('/api/search?q=populr&fuzzy=1&tipo=partido&limit=1').json
+    assert len(respuesta['resultados']) == 1
+    assert respuesta['total'] == 2
+
+
+def test_indices_de_la_fuente_se_construyen_una_vez(app, datos, monkeypatch):
+    construidos = []
+    sugerencias = busqueda._Sugerencias
+
+    def contar(*args):
+        construidos.append(threading.get_ident())
+        time.sleep(0.05)    # una construcción lenta: las demás peticiones llegan mientras tanto
+        return sugerencias(*args)
+
+    monkeypatch.setattr(busqueda, '_Sugerencias', contar)
+    barrera = threading.Barrier(8)
+
+    def sugerir():
+        with app.test_request_context():
+            barrera.wait()
+            busqueda.indice_busqueda.sugerir('ju', tipos=['candidato'])
+
+    hilos = [threading.Thread(target=sugerir) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert len(construidos) == 1
+
+
+def test_sugerir_desde_cualquier_palabra():
+    # Ninguno empieza por "quis": los dos salen por una palabra interna (rango 1)
+    sugerencias = CANDIDATOS.sugerir('quis', 10)
+    assert sorted((rango, doc['titulo']) for rango, _, doc in sugerencias) == [
+        (1, 'José Quispe Mamani'),
+        (1, 'Rosa Chávez Quispe'),
+    ]
+    sugerencias = CANDIDATOS.sugerir('jose quis', 10)
+    assert [(rango, doc['titulo']) for rango, _, doc in sugerencias] == [(0, 'José Quispe Mamani')]
+
+
+def test_sugerir_alias_primero_y_limite():
+    sugerencias = PARTIDOS.sugerir('pp', 10)
+    assert [doc['titulo'] for _, _, doc in sugerencias] == ['Partido Popular', 'Perú Posible']
+    assert all(rango == 0 for rango, _, _ in sugerencias)
+    assert len(PARTIDOS.sugerir('p', 1)) == 1
+
+
+def test_api_autocomplete(client, datos):
+    respuesta = client.get('/api/autocomplete?q=pop')
+    assert respuesta.status_code == 200
+    # Por una palabra interna: ninguno empieza por "pop"
+    assert sorted(s['titulo'] for s in respuesta.json['sugerencias']) == ['Acción Popular', 'Partido Popular']
+    # Las siglas son alias: "ap" va primero aunque "Acción" no empiece así
+    assert client.get('/api/autocomplete?q=ap&tipo=partido').json['sugerencias'][0]['titulo'] == 'Acción Popular'
+    assert client.get('/api/autocomplete?q=&tipo=partido').json['sugerencias'] == []
+    assert len(client.get('/api/autocomplete?q=i&limit=1').json['sugerencias']) == 1
+
+
+def test_api_autocomplete_tipo_invalido(client):
+    assert client.get('/api/autocomplete?q=x&tipo=mesa').status_code == 400
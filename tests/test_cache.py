@@ -0,0 +1,83 @@
+from extensions import db, response_cache
+from lectura import modelo_lectura
+from models import PartidosPoliticos, VersionesDatos
+
+
+def _stats(app, client):
+    app.config['STATS_TOKEN'] = 'secreto'
+    return client.get('/api/cache/stats', headers={'X-Stats-Token': 'secreto'}).json
+
+
+def test_acierto_sin_volver_a_ejecutar_la_vista(app, client, datos, monkeypatch):
+    primera = client.get('/api/partidos?fields=siglas')
+    assert primera.status_code == 200
+
+    # En un acierto la vista no corre: no se serializa nada
+    def no_llamar(*args):
+        raise AssertionError('la vista se ejecutó')
+
+    monkeypatch.setattr('main.routes.serializar', no_llamar)
+    segunda = client.get('/api/partidos?fields=siglas')
+    assert segunda.get_data() == primera.get_data()
+    assert (response_cache.hits, response_cache.misses) == (1, 1)
+
+
+def test_clave_con_parametros_ordenados(client, datos):
+    client.get('/api/candidatos?region=Lima&tipo=Alcalde')
+    client.get('/api/candidatos?tipo=Alcalde&region=Lima')
+    assert response_cache.hits == 1
+    client.get('/api/candidatos?tipo=Alcalde')
+    assert response_cache.misses == 2
+
+
+def test_nueva_version_invalida_la_entrada(app, client, datos):
+    assert [p['siglas'] for p in client.get('/api/partidos').json] == ['AP', 'PP']
+    with app.app_context():
+        db.session.add(PartidosPoliticos(nombre_partido='Somos Perú', siglas='SP'))
+        VersionesDatos.incrementar('PartidosPoliticos')
+        db.session.commit()
+    # La instantánea se recarga en segundo plano; mientras tanto se
+    # sigue respondiendo con la versión anterior
+    with app.test_request_context():
+        modelo_lectura.recargar()
+    assert [p['siglas'] for p in client.get('/api/partidos').json] == ['AP', 'PP', 'SP']
+
+
+def test_errores_no_se_cachean(client, datos):
+    assert client.get('/api/partidos?fields=nada').status_code == 400
+    assert client.get('/api/partidos?fields=nada').status_code == 400
+    assert response_cache.hits == 0
+    assert response_cache.stats()['entradas'] == 0
+
+
+def test_expulsion_por_tamano(app, client, datos):
+    tamano = len(client.get('/api/partidos').get_data())
+    response_cache.clear()
+    response_cache.max_bytes = tamano + 10
+    try:
+        client.get('/api/partidos')
+        client.get('/api/partidos?fields=siglas')
+        stats = response_cache.stats()
+        assert stats['expulsiones'] == 1
+        assert stats['entradas'] == 1
+        assert stats['bytes'] <= stats['max_bytes']
+    finally:
+        response_cache.max_bytes = app.config['RESPONSE_CACHE_MAX_BYTES']
+
+
+def test_cache_desactivada(app, client, datos):
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    client.get('/api/partidos')
+    client.get('/api/partidos')
+    assert response_cache.stats()['entradas'] == 0
+
+
+def test_cache_stats_requiere_token(app, client, datos):
+    assert client.get('/api/cache/stats').status_code == 404
+    app.config['STATS_TOKEN'] = 'secreto'
+    assert client.get('/api/cache/stats', headers={'X-Stats-Token': 'otro'}).status_code == 403
+    client.get('/api/partidos')
+    client.get('/api/partidos')
+    stats = _stats(app, client)
+    assert (stats['entradas'], stats['hits'], stats['misses']) == (1, 1, 1)
+    assert stats['max_bytes'] == app.config['RESPONSE_CACHE_MAX_BYTES']
@@ -0,0 +1,47 @@
+import pytest
+
+from campos import CampoInvalido, leer_campos, serializar
+
+DISPONIBLES = {'id': lambda x: x['id'], 'nombre': lambda x: x['nombre'], 'region': lambda x: x.get('region')}
+
+
+def test_leer_campos():
+    assert leer_campos({}, DISPONIBLES) == ['id', 'nombre', 'region']
+    # En el orden del endpoint, sin repetidos ni vacíos
+    assert leer_campos({'fields': 'region, id,,id'}, DISPONIBLES) == ['id', 'region']
+    with pytest.raises(CampoInvalido, match='foto, otro'):
+        leer_campos({'fields': 'id,otro,foto'}, DISPONIBLES)
+
+
+def test_serializar():
+    assert serializar(['nombre'], DISPONIBLES, {'id': 1, 'nombre': 'Ana'}) == {'nombre': 'Ana'}
+
+
+def test_api_partidos_fields(client, datos):
+    respuesta = client.get('/api/partidos?fields=siglas,logo_url')
+    assert respuesta.json == [
+        {'siglas': 'AP', 'logo_url': None},
+        {'siglas': 'PP', 'logo_url': f"/media/{datos['logo']}"},
+    ]
+    assert set(client.get('/api/partidos').json[0]) == {
+        'id_partido', 'jne_id_simbolo', 'nombre_partido', 'siglas', 'fecha_inscripcion', 'logo_url',
+        'logo_placeholder', 'direccion_legal', 'telefonos', 'sitio_web', 'email_contacto',
+        'personero_titular', 'personero_alterno', 'ideologia',
+    }
+
+
+def test_api_candidatos_fields_con_filtros_y_paginas(client, datos):
+    respuesta = client.get('/api/candidatos?fields=nombre_completo,nombre_partido&region=Lima&limit=1')
+    assert respuesta.json['items'] == [{'nombre_completo': 'Juan Pérez Huamán', 'nombre_partido': 'Partido Popular'}]
+    siguiente = client.get('/api/candidatos', query_string={
+        'fields': 'nombre_completo,nombre_partido', 'region': 'Lima', 'limit': 1,
+        'after': respuesta.json['next_cursor'],
+    })
+    assert siguiente.json['items'] == [{'nombre_completo': 'María Flores', 'nombre_partido': 'Sin Partido'}]
+
+
+@pytest.mark.parametrize('url', ['/api/partidos?fields=id_partido,logo_blob', '/api/candidatos?fields=imagen'])
+def test_api_fields_desconocido(client, datos, url):
+    respuesta = client.get(url)
+    assert respuesta.status_code == 400
+    assert 'campos desconocidos' in respuesta.json['error']
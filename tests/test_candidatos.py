@@ -0,0 +1,36 @@
+import pytest
+
+from extensions import db
+
+
+def _nombres(respuesta):
+    assert respuesta.status_code == 200
+    return sorted(c['nombre_completo'] for c in respuesta.json)
+
+
+@pytest.mark.parametrize('filtros, esperados', [
+    ({}, ['Juan Pérez Huamán', 'María Flores', 'Rosa Chávez Quispe']),
+    ({'region': 'Lima'}, ['Juan Pérez Huamán', 'María Flores']),
+    ({'tipo_candidatura': 'Alcalde', 'region': 'Lima'}, ['Juan Pérez Huamán', 'María Flores']),
+    ({'tipo_candidatura': 'Gobernador', 'region': 'Lima'}, []),
+    ({'partido_nombre': 'popular'}, ['Juan Pérez Huamán', 'Rosa Chávez Quispe']),
+    ({'partido_nombre': 'AP'}, ['Rosa Chávez Quispe']),
+    ({'nombre_completo': 'perez'}, ['Juan Pérez Huamán']),
+])
+def test_api_candidatos_filtros(client, datos, filtros, esperados):
+    assert _nombres(client.get('/api/candidatos', query_string=filtros)) == esperados
+
+
+def test_api_candidatos_por_partido(client, datos):
+    respuesta = client.get('/api/candidatos', query_string={'id_partido': datos['pp'], 'region': 'Lima'})
+    assert _nombres(respuesta) == ['Juan Pérez Huamán']
+    assert respuesta.json[0]['siglas_partido'] == 'PP'
+    sin_partido = next(c for c in client.get('/api/candidatos').json if c['nombre_completo'] == 'María Flores')
+    assert (sin_partido['nombre_partido'], sin_partido['jne_id_simbolo']) == ('Sin Partido', 'N/A')
+
+
+def test_indices_de_los_filtros(app):
+    with app.app_context():
+        indices = {i['name']: i['column_names'] for i in db.inspect(db.engine).get_indexes('candidatos')}
+    assert indices['idx_candidatos_tipo_region'] == ['tipo_candidatura', 'region']
+    assert indices['idx_candidatos_partido'] == ['partido_politico_id']
@@ -0,0 +1,147 @@
+import os
+
+import pytest
+
+import carga_padron
+from extensions import db
+from models import CentrosVotacion, ConteosDistrito, Mesas, Usuarios, VersionesDatos
+
+
+@pytest.fixture
+def app(app):
+    """La app de conftest con un centro y tres mesas (100001 a 100003)."""
+    with app.app_context():
+        centro = CentrosVotacion(nombre='IE 1', direccion='Av. Lima 1', distrito='Lima')
+        db.session.add(centro)
+        db.session.flush()
+        for i in range(1, 4):
+            db.session.add(Mesas(numero_mesa=f'10000{i}', id_centro=centro.id_centro))
+        db.session.commit()
+    return app
+
+
+def _cargar(app, archivo, *opciones):
+    resultado = app.test_cli_runner().invoke(args=['padron', 'cargar', str(archivo), *opciones])
+    if resultado.exception is not None and not isinstance(resultado.exception, SystemExit):
+        raise resultado.exception
+    return resultado
+
+
+def _asignaciones(app):
+    with app.app_context():
+        filas = db.session.query(Usuarios.dni, Mesas.numero_mesa).join(Mesas).order_by(Usuarios.dni)
+        return dict(filas.all())
+
+
+def _rechazos(archivo):
+    with open(f"{archivo}.rechazados", encoding='utf-8') as f:
+        return [linea.rstrip('\n').split('\t') for linea in f]
+
+
+def test_carga_y_rechazos(app, tmp_path):
+    archivo = tmp_path / 'padron.csv'
+    archivo.write_bytes(
+        b'dni,numero_mesa\n'
+        b'40000001,100001\n'
+        b'1234,100001\n'
+        b'40000002,999999\n'
+        b'4000\xff0003,100002\n'
+        b'\n'
+        b'solo-un-campo\n'
+        b'40000004,100003\n'
+    )
+    resultado = _cargar(app, archivo, '--lote', '2')
+    assert resultado.exit_code == 0, resultado.output
+
+    assert _asignaciones(app) == {'40000001': '100001', '40000004': '100003'}
+    assert [(n, motivo) for n, motivo, _ in _rechazos(archivo)] == [
+        ('3', 'dni inválido'),
+        ('4', 'mesa desconocida'),
+        ('5', 'codificación inválida'),
+        ('7', 'dni inválido'),
+    ]
+    assert not os.path.exists(f"{archivo}.progreso")
+    with app.app_context():
+        assert VersionesDatos.todas()['Usuarios'] == 1
+        assert db.session.get(ConteosDistrito, 'Lima').electores == 2
+
+
+@pytest.mark.parametrize('contenido', [b'', b'dni,numero_mesa\n'])
+def test_archivo_vacio(app, tmp_path, contenido):
+    archivo = tmp_path / 'vacio.csv'
+    archivo.write_bytes(contenido)
+    resultado = _cargar(app, archivo)
+    assert resultado.exit_code == 0, resultado.output
+    assert _asignaciones(app) == {}
+
+
+def test_formato_fijo_sin_cabecera(app, tmp_path):
+    archivo = tmp_path / 'padron.txt'
+    archivo.write_bytes(b'40000001100002\n40000002100003   extra\n')
+    resultado = _cargar(app, archivo, '--formato', 'fijo', '--sin-cabecera')
+    assert resultado.exit_code == 0, resultado.output
+    assert _asignaciones(app) == {'40000001': '100002', '40000002': '100003'}
+
+
+def test_usuario_registrado_conserva_sus_datos(app, tmp_path):
+    with app.app_context():
+        db.session.add(Usuarios(dni='40000001', email='a@b.pe', password_hash='x'))
+        db.session.commit()
+    archivo = tmp_path / 'padron.csv'
+    archivo.write_bytes(b'dni,numero_mesa\n40000001,100002\n')
+    _cargar(app, archivo)
+    with app.app_context():
+        usuario = Usuarios.query.filter_by(dni='40000001').one()
+        assert (usuario.email, usuario.password_hash, usuario.mesa.numero_mesa) == ('a@b.pe', 'x', '100002')
+
+
+def test_reanuda_tras_un_corte(app, tmp_path, monkeypatch):
+    archivo = tmp_path / 'padron.csv'
+    archivo.write_bytes(b'dni,numero_mesa\n' + b''.join(
+        b'%08d,10000%d\n' % (40000000 + i, 1 + i % 3) for i in range(10)
+    ) + b'1234,100001\n')
+
+    # Se corta al validar el tercer lote de 4 líneas
+    validar = carga_padron._validar
+    lotes = []
+
+    def validar_y_cortar(filas, mesas):
+        lotes.append(filas)
+        if len(lotes) == 3:
+            raise RuntimeError('corte')
+        return validar(filas, mesas)
+
+    monkeypatch.setattr(carga_padron, '_validar', validar_y_cortar)
+    with pytest.raises(RuntimeError):
+        _cargar(app, archivo, '--lote', '4')
+    assert len(_asignaciones(app)) == 8
+    assert os.path.exists(f"{archivo}.progreso")
+
+    monkeypatch.setattr(carga_padron, '_validar', validar)
+    resultado = _cargar(app, archivo, '--lote', '4')
+    assert resultado.exit_code == 0, resultado.output
+    assert 'Reanudando desde la línea 9' in resultado.output
+    assert len(_asignaciones(app)) == 10
+    assert [(n, motivo) for n, motivo, _ in _rechazos(archivo)] == [('12', 'dni inválido')]
+    assert not os.path.exists(f"{archivo}.progreso")
+
+
+def test_progreso_de_otro_archivo_se_ignora(app, tmp_path):
+    archivo = tmp_path / 'padron.csv'
+    archivo.write_bytes(b'dni,numero_mesa\n40000001,100001\n')
+    carga_padron._guardar_progreso(str(archivo), {
+        'firma': [1, 1], 'posicion': 10 ** 6, 'linea': 99, 'cargadas': 5, 'rechazadas': 0,
+    })
+    resultado = _cargar(app, archivo)
+    assert 'Reanudando' not in resultado.output
+    assert _asignaciones(app) == {'40000001': '100001'}
+
+
+def test_carga_visible_en_local_votacion(app, tmp_path):
+    archivo = tmp_path / 'padron.csv'
+    archivo.write_bytes(b'dni,numero_mesa\n00000042,100003\n')
+    _cargar(app, archivo)
+    respuesta = app.test_client().get('/api/local-votacion/00000042')
+    assert respuesta.status_code == 200
+    assert respuesta.json['numero_mesa'] == '100003'
+    assert respuesta.json['centro']['distrito'] == 'Lima'
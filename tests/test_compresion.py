@@ -0,0 +1,69 @@
+import gzip
+
+import pytest
+
+import compresion
+from extensions import response_cache
+
+
+@pytest.fixture
+def app(app):
+    """Las respuestas de prueba son pequeñas: se comprime desde el primer byte."""
+    app.config['COMPRESS_MIN_SIZE'] = 0
+    return app
+
+
+def test_respuesta_cacheada_comprimida_una_vez(client, datos, monkeypatch):
+    plano = client.get('/api/partidos')
+    assert 'Content-Encoding' not in plano.headers
+    assert 'Accept-Encoding' in plano.headers['Vary']
+
+    llamadas = []
+    comprimir = compresion.comprimir
+
+    def contar(data, codificacion):
+        llamadas.append(codificacion)
+        return comprimir(data, codificacion)
+
+    monkeypatch.setattr(compresion, 'comprimir', contar)
+    primera = client.get('/api/partidos', headers={'Accept-Encoding': 'gzip'})
+    segunda = client.get('/api/partidos', headers={'Accept-Encoding': 'gzip'})
+    assert primera.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(primera.get_data()) == plano.get_data()
+    assert segunda.get_data() == primera.get_data()
+    # El ETag es el de la versión, igual con o sin compresión
+    assert segunda.headers['ETag'] == plano.headers['ETag']
+    # Se comprimió en la primera y la segunda reutilizó la misma copia
+    assert llamadas == ['gzip']
+    assert response_cache.stats()['bytes'] == len(plano.get_data()) + len(primera.get_data())
+
+
+def test_compresion_al_vuelo(client, datos):
+    plano = client.get('/api/search?q=lima')
+    respuesta = client.get('/api/search?q=lima', headers={'Accept-Encoding': 'gzip'})
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(respuesta.get_data()) == plano.get_data()
+    # El ETag se calcula sobre el cuerpo sin comprimir
+    assert respuesta.headers['ETag'] == plano.headers['ETag']
+
+
+def test_sin_compresion(app, client, datos):
+    assert 'Content-Encoding' not in client.get(
+        '/api/search?q=lima', headers={'Accept-Encoding': 'gzip;q=0'}).headers
+    app.config['COMPRESS_MIN_SIZE'] = 10 ** 6
+    assert 'Content-Encoding' not in client.get(
+        '/api/search?q=lima', headers={'Accept-Encoding': 'gzip'}).headers
+    # Las imágenes no son un tipo comprimible
+    assert 'Content-Encoding' not in client.get(
+        f"/media/{datos['logo']}", headers={'Accept-Encoding': 'gzip'}).headers
+
+
+@pytest.mark.parametrize('ruta', ['/parte1', '/parte3', '/parte4'])
+def test_paginas_precomprimidas(client, ruta):
+    plano = client.get(ruta)
+    assert plano.status_code == 200
+    assert plano.mimetype == 'text/html'
+    respuesta = client.get(ruta, headers={'Accept-Encoding': 'gzip'})
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(respuesta.get_data()) == plano.get_data()
+    assert client.get(ruta, headers={'If-None-Match': plano.headers['ETag']}).status_code == 304
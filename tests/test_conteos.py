@@ -0,0 +1,122 @@
+from collections import Counter
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import CentrosVotacion, ConteosDistrito, Mesas, Usuarios
+
+
+def _conteos():
+    return {c.distrito: (c.centros, c.mesas, c.electores)
+            for c in ConteosDistrito.query.all() if (c.centros, c.mesas, c.electores) != (0, 0, 0)}
+
+
+def _recontados():
+    """Lo que daría recontar(), contado en Python sobre las tres tablas."""
+    conteos = {}
+    for centro in CentrosVotacion.query.all():
+        fila = conteos.setdefault(centro.distrito, Counter())
+        fila['centros'] += 1
+        for mesa in centro.mesas:
+            fila['mesas'] += 1
+            fila['electores'] += len(mesa.usuarios)
+    return {d: (c['centros'], c['mesas'], c['electores']) for d, c in conteos.items()}
+
+
+def _confirmar():
+    db.session.commit()
+    # Tras el commit todo queda expirado: los cambios siguientes se asignan sin leer antes
+    assert _conteos() == _recontados()
+    db.session.commit()
+
+
+@pytest.fixture
+def sesion(app, datos):
+    with app.app_context():
+        yield db.session
+
+
+def _mesa(numero):
+    return Mesas.query.filter_by(numero_mesa=numero).one()
+
+
+def test_altas(sesion, datos):
+    assert _conteos() == {'Miraflores': (1, 2, 0), 'Lima': (1, 1, 0)}
+    centro = CentrosVotacion(nombre='IE Nueva', direccion='Av. 1', distrito='Breña')
+    centro.mesas.append(Mesas(numero_mesa='000200'))
+    sesion.add(centro)
+    sesion.add(Usuarios(dni='40000001', id_mesa=_mesa('000009').id_mesa))
+    _confirmar()
+    assert _conteos()['Breña'] == (1, 1, 0)
+    assert _conteos()['Miraflores'] == (1, 2, 1)
+
+
+def test_elector_cambia_de_mesa_y_la_deja(sesion, datos):
+    sesion.add(Usuarios(dni='40000001', id_mesa=_mesa('000009').id_mesa))
+    _confirmar()
+    usuario = Usuarios.query.filter_by(dni='40000001').one()
+    sesion.commit()
+
+    usuario.id_mesa = _mesa('000100').id_mesa
+    _confirmar()
+    assert (_conteos()['Miraflores'][2], _conteos()['Lima'][2]) == (0, 1)
+
+    usuario.mesa = _mesa('000010')
+    _confirmar()
+    assert (_conteos()['Miraflores'][2], _conteos()['Lima'][2]) == (1, 0)
+
+    usuario.id_mesa = None
+    _confirmar()
+    assert _conteos()['Miraflores'][2] == 0
+
+
+def test_mesa_y_centro_se_mudan_con_sus_electores(sesion, datos):
+    sesion.add_all([Usuarios(dni='40000001', id_mesa=_mesa('000009').id_mesa),
+                    Usuarios(dni='40000002', id_mesa=_mesa('000009').id_mesa)])
+    _confirmar()
+
+    _mesa('000009').id_centro = datos['lima']
+    _confirmar()
+    assert _conteos() == {'Miraflores': (1, 1, 0), 'Lima': (1, 2, 2)}
+
+    sesion.get(CentrosVotacion, datos['lima']).distrito = 'Cercado'
+    _confirmar()
+    assert _conteos() == {'Miraflores': (1, 1, 0), 'Cercado': (1, 2, 2)}
+
+
+def test_bajas(sesion, datos):
+    sesion.add(Usuarios(dni='40000001', id_mesa=_mesa('000100').id_mesa))
+    _confirmar()
+    sesion.delete(Usuarios.query.filter_by(dni='40000001').one())
+    _confirmar()
+    sesion.delete(_mesa('000100'))
+    _confirmar()
+    sesion.delete(sesion.get(CentrosVotacion, datos['lima']))
+    _confirmar()
+    assert _conteos() == {'Miraflores': (1, 2, 0)}
+
+
+def test_sumar_es_un_upsert(app):
+    # Una sola sentencia, sin leer la fila antes: dos altas simultáneas en
+    # un distrito nuevo no pueden chocar con la clave primaria
+    sentencias = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda c, cursor, sql, *args: sentencias.append(sql))
+        for _ in range(2):
+            with Session(db.engine) as sesion:
+                ConteosDistrito.sumar(sesion, 'Nuevo', centros=1, mesas=2)
+                sesion.commit()
+        assert [sql.split()[0] for sql in sentencias] == ['INSERT', 'INSERT']
+        assert all('ON CONFLICT' in sql for sql in sentencias)
+        assert db.session.get(ConteosDistrito, 'Nuevo').to_dict() == {
+            'distrito': 'Nuevo', 'centros': 2, 'mesas': 4, 'electores': 0,
+        }
+
+
+def test_api_distritos(client, datos):
+    assert client.get('/mapa/api/distritos').json == [
+        {'distrito': 'Lima', 'centros': 1, 'mesas': 1, 'electores': 0},
+        {'distrito': 'Miraflores', 'centros': 1, 'mesas': 2, 'electores': 0},
+    ]
@@ -0,0 +1,81 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from contrasenas import HashingSaturado, metodo_completo, metodo_de, pool_contrasenas
+from extensions import db
+from models import Usuarios
+
+# Barato, para que los tests no esperen al scrypt de producción
+METODO = 'pbkdf2:sha256:1000'
+
+
+@pytest.mark.parametrize('metodo', ['scrypt', 'scrypt:16384:8:1', 'pbkdf2', 'pbkdf2:sha512', METODO])
+def test_metodo_completo_igual_al_de_werkzeug(metodo):
+    assert metodo_completo(metodo) == metodo_de(generate_password_hash('x', metodo))
+
+
+@pytest.fixture
+def app(app, monkeypatch):
+    monkeypatch.setattr(pool_contrasenas, 'metodo', METODO)
+    return app
+
+
+def _registrar(client, **datos):
+    return client.post('/api/register', json={'dni': '40000001', 'password': 'clave', **datos})
+
+
+def test_registro_y_login(client, datos):
+    respuesta = _registrar(client, email='a@b.pe')
+    assert respuesta.status_code == 201
+    assert _registrar(client).status_code == 409
+    assert client.post('/api/register', json={'dni': '40000002'}).status_code == 400
+
+    assert client.post('/api/login', json={'dni': '40000001', 'password': 'clave'}).json['success'] is True
+    assert client.post('/api/login', json={'email': 'a@b.pe', 'password': 'clave'}).status_code == 200
+    assert client.post('/api/login', json={'dni': '40000001', 'password': 'otra'}).status_code == 401
+    assert client.post('/api/login', json={'dni': '49999999', 'password': 'clave'}).status_code == 401
+
+
+def _hash_guardado(app):
+    with app.app_context():
+        return Usuarios.query.filter_by(dni='40000001').one().password_hash
+
+
+def test_login_rehashea_con_el_metodo_nuevo(app, client, datos, monkeypatch):
+    _registrar(client)
+    monkeypatch.setattr(pool_contrasenas, 'metodo', 'pbkdf2:sha256:2000')
+    assert client.post('/api/login', json={'dni': '40000001', 'password': 'clave'}).status_code == 200
+    assert metodo_de(_hash_guardado(app)) == 'pbkdf2:sha256:2000'
+
+
+def test_login_sin_rehash_si_el_pool_esta_saturado(app, client, datos, monkeypatch):
+    _registrar(client)
+    anterior = _hash_guardado(app)
+    monkeypatch.setattr(pool_contrasenas, 'metodo', 'pbkdf2:sha256:2000')
+
+    def saturado(password):
+        raise HashingSaturado('lleno')
+
+    monkeypatch.setattr(pool_contrasenas, 'generar', saturado)
+    respuesta = client.post('/api/login', json={'dni': '40000001', 'password': 'clave'})
+    assert respuesta.status_code == 200
+    assert _hash_guardado(app) == anterior
+
+
+def test_registro_saturado_503(client, monkeypatch):
+    monkeypatch.setattr(pool_contrasenas, 'max_pendientes', 0)
+    respuesta = _registrar(client)
+    assert respuesta.status_code == 503
+    assert respuesta.headers['Retry-After'] == '1'
+    with client.application.app_context():
+        assert db.session.query(Usuarios).count() == 0
+
+
+def test_auth_stats_requiere_token(app, client):
+    assert client.get('/api/auth/stats').status_code == 404
+    app.config['STATS_TOKEN'] = 'secreto'
+    assert client.get('/api/auth/stats').status_code == 403
+    assert client.get('/api/auth/stats', headers={'X-Stats-Token': 'otro'}).status_code == 403
+    respuesta = client.get('/api/auth/stats', headers={'X-Stats-Token': 'secreto'})
+    assert respuesta.status_code == 200
+    assert respuesta.json['max_pendientes'] == app.config['PASSWORD_HASH_MAX_PENDIENTES']
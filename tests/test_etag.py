@@ -0,0 +1,51 @@
+from extensions import db
+from lectura import modelo_lectura
+from models import PartidosPoliticos, VersionesDatos
+
+
+def test_etag_de_la_version_de_datos(app, client, datos):
+    respuesta = client.get('/api/partidos')
+    etag = respuesta.headers['ETag']
+    assert etag.startswith('W/')
+    assert respuesta.cache_control.no_cache
+
+    no_modificada = client.get('/api/partidos', headers={'If-None-Match': etag})
+    assert no_modificada.status_code == 304
+    assert no_modificada.get_data() == b''
+    assert no_modificada.headers['ETag'] == etag
+    # Otra consulta, otro ETag
+    assert client.get('/api/partidos?fields=siglas').headers['ETag'] != etag
+
+    with app.app_context():
+        db.session.add(PartidosPoliticos(nombre_partido='Somos Perú', siglas='SP'))
+        VersionesDatos.incrementar('PartidosPoliticos')
+        db.session.commit()
+    with app.test_request_context():
+        modelo_lectura.recargar()
+    respuesta = client.get('/api/partidos', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers['ETag'] != etag
+
+
+def test_304_sin_ejecutar_la_vista(client, datos, monkeypatch):
+    etag = client.get('/api/partidos').headers['ETag']
+
+    def no_llamar(*args):
+        raise AssertionError('la vista se ejecutó')
+
+    monkeypatch.setattr('main.routes.serializar', no_llamar)
+    assert client.get('/api/partidos', headers={'If-None-Match': f'"otro", {etag}'}).status_code == 304
+
+
+def test_etag_por_contenido(client, datos):
+    # /api/search no usa @cached: el ETag sale del hash del cuerpo
+    respuesta = client.get('/api/search?q=lima')
+    etag = respuesta.headers['ETag']
+    assert etag.startswith('W/')
+    assert client.get('/api/search?q=lima', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/search?q=juan', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_sin_etag_en_errores_ni_post(client, datos):
+    assert 'ETag' not in client.get('/api/local-votacion/99999999').headers
+    assert 'ETag' not in client.post('/api/login', json={}).headers
@@ -0,0 +1,225 @@
+import json
+import math
+import random
+from collections import namedtuple
+
+import pytest
+
+from geo import (
+    RADIO_TIERRA_KM, ZOOM_CENTROS, ArbolCentros, IndiceDistritos, IndiceMapa, leer_bbox, leer_coordenadas,
+)
+
+Centro = namedtuple('Centro', ['id_centro', 'latitud', 'longitud'])
+
+
+def _haversine(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dlat, dlng = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dlng / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
+
+
+@pytest.fixture(scope='module')
+def centros():
+    azar = random.Random(7)
+    # Perú aproximado, con un grupo denso en Lima y algunos sin coordenadas
+    puntos = [Centro(i, azar.uniform(-18, 0), azar.uniform(-81, -69)) for i in range(1500)]
+    puntos += [Centro(1500 + i, azar.gauss(-12.05, 0.05), azar.gauss(-77.05, 0.05)) for i in range(1500)]
+    puntos += [Centro('sin-lat', None, -77.0), Centro('sin-lng', -12.0, None)]
+    return puntos
+
+
+@pytest.mark.parametrize('lat, lng', [(-12.05, -77.04), (-3.75, -73.25), (-16.4, -71.5), (5.0, -60.0)])
+def test_cercanos_igual_a_fuerza_bruta(centros, lat, lng):
+    arbol = ArbolCentros(centros)
+    con_coordenadas = [c for c in centros if c.latitud is not None and c.longitud is not None]
+    esperados = sorted(con_coordenadas, key=lambda c: _haversine(lat, lng, c.latitud, c.longitud))[:10]
+
+    resultado = arbol.cercanos(lat, lng, 10)
+    assert [c.id_centro for _, c in resultado] == [c.id_centro for c in esperados]
+    for distancia, c in resultado:
+        assert distancia == pytest.approx(_haversine(lat, lng, c.latitud, c.longitud), rel=1e-6)
+
+
+def test_cercanos_con_radio(centros):
+    arbol = ArbolCentros(centros)
+    resultado = arbol.cercanos(-12.05, -77.05, 5000, radio_km=3)
+    esperados = {
+        c.id_centro for c in centros
+        if c.latitud is not None and c.longitud is not None
+        and _haversine(-12.05, -77.05, c.latitud, c.longitud) <= 3 * 0.999999
+    }
+    assert esperados <= {c.id_centro for _, c in resultado}
+    assert all(distancia <= 3 * 1.000001 for distancia, _ in resultado)
+
+
+def test_cercanos_casos_borde():
+    assert ArbolCentros([]).cercanos(-12, -77, 5) == []
+    arbol = ArbolCentros([Centro('a', -12, -77)])
+    assert arbol.cercanos(-12, -77, 0) == []
+    assert [c.id_centro for _, c in arbol.cercanos(-12, -77, 5)] == ['a']
+
+
+def test_leer_coordenadas():
+    assert leer_coordenadas({'lat': '-12.1', 'lng': '-77'}) == (-12.1, -77.0)
+    with pytest.raises(ValueError):
+        leer_coordenadas({'lat': '-95', 'lng': '-77'})
+    with pytest.raises(ValueError):
+        leer_coordenadas({'lat': '-12'})
+
+
+def test_api_centros_cercanos(client, datos):
+    respuesta = client.get('/mapa/api/centros/nearby?lat=-12.05&lng=-77.04&k=1')
+    assert respuesta.status_code == 200
+    assert [(c['id'], c['distancia_km']) for c in respuesta.json] == [(datos['lima'], 0)]
+    todos = client.get('/mapa/api/centros/nearby?lat=-12.05&lng=-77.04').json
+    assert [c['id'] for c in todos] == [datos['lima'], datos['miraflores']]
+    assert todos[1]['distancia_km'] == pytest.approx(_haversine(-12.05, -77.04, -12.12, -77.03), abs=1e-3)
+    # Miraflores queda a unos 7.8 km
+    assert client.get('/mapa/api/centros/nearby?lat=-12.05&lng=-77.04&radio_km=5').json == todos[:1]
+
+
+def test_api_centros_cercanos_sin_coordenadas(client):
+    assert client.get('/mapa/api/centros/nearby?lat=abc&lng=-77').status_code == 400
+
+
+def test_leer_bbox():
+    assert leer_bbox({'bbox': '-77.1,-12.2,-77.0,-12.0'}) == (-77.1, -12.2, -77.0, -12.0)
+    # Se recorta al mundo
+    assert leer_bbox({'bbox': '-200,-100,200,100'}) == (-180, -90, 180, 90)
+    for bbox in ('-77.0,-12.2', '-77.0,-12.2,-77.1,-12.0', 'a,b,c,d'):
+        with pytest.raises(ValueError):
+            leer_bbox({'bbox': bbox})
+
+
+def test_en_vista_sin_agrupar_igual_a_fuerza_bruta(centros):
+    indice = IndiceMapa([c for c in centros if c.latitud is not None and c.longitud is not None])
+    oeste, sur, este, norte = -77.1, -12.1, -77.0, -12.0
+    vistos, grupos = indice.en_vista(oeste, sur, este, norte, ZOOM_CENTROS)
+    assert grupos == []
+    assert sorted(c.id_centro for c in vistos) == sorted(
+        c.id_centro for c in centros
+        if c.latitud is not None and c.longitud is not None
+        and sur <= c.latitud <= norte and oeste <= c.longitud <= este
+    )
+
+
+@pytest.mark.parametrize('zoom', [0, 5, 9, ZOOM_CENTROS - 1])
+def test_en_vista_agrupada_cuenta_todos(centros, zoom):
+    con_coordenadas = [c for c in centros if c.latitud is not None and c.longitud is not None]
+    solos, grupos = IndiceMapa(con_coordenadas).en_vista(-180, -90, 180, 90, zoom)
+    assert len(solos) + sum(g.cantidad for g in grupos) == len(con_coordenadas)
+    assert all(g.cantidad > 1 for g in grupos)
+
+
+def test_api_centros_bbox(client, datos):
+    respuesta = client.get('/mapa/api/centros?bbox=-77.035,-12.13,-77.02,-12.1')
+    assert respuesta.status_code == 200
+    assert respuesta.json['centros'] == [{
+        'id': datos['miraflores'], 'nombre': 'IE Miraflores', 'distrito': 'Miraflores', 'lat': -12.12, 'lng': -77.03,
+        # Lo que muestra el popup del mapa
+        'ubicacion_detalle': 'Pabellón A', 'mesas': 2, 'primera_mesa': '000009', 'ultima_mesa': '000010',
+    }]
+    assert respuesta.json['grupos'] == []
+    # Alejado, los dos centros forman un grupo
+    respuesta = client.get('/mapa/api/centros?bbox=-78,-13,-76,-11&zoom=5')
+    assert respuesta.json['centros'] == []
+    assert [g['cantidad'] for g in respuesta.json['grupos']] == [2]
+    assert client.get('/mapa/api/centros?bbox=1,2').status_code == 400
+
+
+def _cuadrado(oeste, sur, lado):
+    return [[oeste, sur], [oeste + lado, sur], [oeste + lado, sur + lado], [oeste, sur + lado], [oeste, sur]]
+
+
+@pytest.fixture(scope='module')
+def distritos():
+    """Cuadrícula de 12 x 12 distritos de 0.1° más uno con hueco y uno de dos partes."""
+    features = []
+    for i in range(12):
+        for j in range(12):
+            features.append({
+                'type': 'Feature',
+                'properties': {'distrito': f'D{i}-{j}'},
+                'geometry': {'type': 'Polygon', 'coordinates': [_cuadrado(-78 + i * 0.1, -13 + j * 0.1, 0.1)]},
+            })
+    features.append({
+        'type': 'Feature',
+        'properties': {'distrito': 'Con hueco'},
+        'geometry': {'type': 'Polygon', 'coordinates': [_cuadrado(-70, -10, 1), _cuadrado(-69.75, -9.75, 0.5)]},
+    })
+    features.append({
+        'type': 'Feature',
+        'properties': {'distrito': 'Islas'},
+        'geometry': {'type': 'MultiPolygon', 'coordinates': [
+            [_cuadrado(-60, -10, 0.2)], [_cuadrado(-59, -10, 0.2)],
+        ]},
+    })
+    features.append({'type': 'Feature', 'properties': {'distrito': 'Punto'},
+                     'geometry': {'type': 'Point', 'coordinates': [-75, -10]}})
+    return IndiceDistritos.desde_geojson({'type': 'FeatureCollection', 'features': features}, 'distrito')
+
+
+def test_distrito_en_cuadricula(distritos):
+    azar = random.Random(3)
+    for _ in range(500):
+        i, j = azar.randrange(12), azar.randrange(12)
+        lng = -78 + i * 0.1 + azar.uniform(0.001, 0.099)
+        lat = -13 + j * 0.1 + azar.uniform(0.001, 0.099)
+        assert distritos.distrito_en(lat, lng) == f'D{i}-{j}'
+
+
+def test_distrito_en_hueco_y_multipoligono(distritos):
+    assert distritos.distrito_en(-9.9, -69.9) == 'Con hueco'
+    assert distritos.distrito_en(-9.5, -69.5) is None
+    assert distritos.distrito_en(-9.9, -59.9) == 'Islas'
+    assert distritos.distrito_en(-9.9, -58.9) == 'Islas'
+    assert distritos.distrito_en(-9.9, -59.5) is None
+
+
+def test_distrito_en_fuera(distritos):
+    assert distritos.distrito_en(-10, -75) is None     # solo un Point, que se ignora
+    assert distritos.distrito_en(10, 10) is None
+    assert IndiceDistritos.desde_geojson({'features': []}, 'distrito').distrito_en(-12, -77) is None
+
+
+def _escribir_limites(app):
+    features = [
+        {'type': 'Feature', 'properties': {'distrito': 'MIRAFLORES'},
+         'geometry': {'type': 'Polygon', 'coordinates': [_cuadrado(-77.05, -12.14, 0.04)]}},
+        {'type': 'Feature', 'properties': {'distrito': 'LIMA'},
+         'geometry': {'type': 'Polygon', 'coordinates': [_cuadrado(-77.06, -12.07, 0.04)]}},
+    ]
+    with open(app.config['DISTRITOS_GEOJSON'], 'w', encoding='utf-8') as f:
+        json.dump({'type': 'FeatureCollection', 'features': features}, f)
+
+
+def test_api_ubicar(app, client, datos):
+    _escribir_limites(app)
+    respuesta = client.get('/mapa/api/distritos/ubicar?lat=-12.11&lng=-77.02')
+    assert respuesta.status_code == 200
+    # El nombre del límite se cruza sin distinguir mayúsculas con el de la BD
+    assert respuesta.json['distrito'] == 'MIRAFLORES'
+    assert [c['id'] for c in respuesta.json['centros']] == [datos['miraflores']]
+    assert client.get('/mapa/api/distritos/ubicar?lat=-10&lng=-70').json == {'distrito': None, 'centros': []}
+
+
+def test_api_ubicar_en_lote(app, client, datos):
+    _escribir_limites(app)
+    respuesta = client.post('/mapa/api/distritos/ubicar',
+                            json={'puntos': [[-12.05, -77.04], [-12.11, -77.02], [-10, -70], [-12.05, -77.04]]})
+    assert respuesta.json['distritos'] == ['LIMA', 'MIRAFLORES', None, 'LIMA']
+    assert {d: [c['id'] for c in cs] for d, cs in respuesta.json['centros'].items()} == {
+        'LIMA': [datos['lima']], 'MIRAFLORES': [datos['miraflores']],
+    }
+    for cuerpo in ({}, {'puntos': []}, {'puntos': [[1]]}, {'puntos': [[-95, 0]]}):
+        assert client.post('/mapa/api/distritos/ubicar', json=cuerpo).status_code == 400
+
+
+def test_api_ubicar_sin_limites(client):
+    respuesta = client.get('/mapa/api/distritos/ubicar?lat=-12.11&lng=-77.02')
+    assert respuesta.status_code == 503
+    # El mensaje dice qué falta y dónde está documentado
+    assert 'DISTRITOS_GEOJSON' in respuesta.json['error']
+    assert 'config.py' in respuesta.json['error']
+
@@ -0,0 +1,87 @@
+import pytest
+
+from busqueda import normalizar
+from extensions import db
+from geocodificacion import Nomenclator, clave_via
+from models import CentrosVotacion
+
+
+@pytest.mark.parametrize('direccion, via', [
+    ('Av. José Gálvez 500 frente al parque', 'jose galvez'),
+    ('Jr. Los Pinos N° 123', 'los pinos'),
+    ('Calle Las Flores S/N', 'las flores'),
+    ('Psje. Santa Rosa Mz. B Lt. 4', 'santa rosa'),
+    # Vías cuyo nombre empieza con un número
+    ('Av. 28 de Julio 1250', '28 de julio'),
+    ('Av. 2 de Mayo', '2 de mayo'),
+    ('Jr. 9 de Diciembre N° 300', '9 de diciembre'),
+    ('28 de Julio Mz. A Lt. 3', '28 de julio'),
+    # Un número suelto o seguido de la numeración no es el nombre
+    ('Av. 500', ''),
+    ('Av. 500 Int. 3', ''),
+    ('', ''),
+])
+def test_clave_via(direccion, via):
+    assert clave_via(normalizar(direccion)) == via
+
+
+@pytest.fixture
+def nomenclator(tmp_path):
+    archivo = tmp_path / 'nomenclator.csv'
+    archivo.write_text(
+        'distrito,via,latitud,longitud\n'
+        'Miraflores,,-12.12,-77.03\n'
+        'Miraflores,Av. 28 de Julio,-12.125,-77.025\n'
+        'Miraflores,Av. 28 de Julio,-12.127,-77.027\n'
+        'Lima,Av. 28 de Julio,-12.06,-77.04\n'
+        'Lima,Av. 2 de Mayo,-12.05,-77.05\n'
+        'Lima,Av. 500,-1,-1\n'
+        'Breña,Jr. Huaraz,,\n',
+        encoding='utf-8',
+    )
+    return Nomenclator(str(archivo))
+
+
+def test_nomenclator_resuelve_por_via_en_cada_distrito(nomenclator):
+    lat, lng, precision = nomenclator.resolver('miraflores', normalizar('Av. 28 de Julio 1250'))
+    assert precision == 'via'
+    # Varios tramos de la misma vía: el promedio
+    assert (lat, lng) == pytest.approx((-12.126, -77.026))
+    assert nomenclator.resolver('lima', normalizar('Av. 28 de Julio 800')) == [-12.06, -77.04, 'via']
+    assert nomenclator.resolver('lima', normalizar('Av. 2 de Mayo')) == [-12.05, -77.05, 'via']
+
+
+def test_nomenclator_centroide_del_distrito(nomenclator):
+    assert nomenclator.resolver('miraflores', normalizar('Calle Desconocida 5')) == [-12.12, -77.03, 'distrito']
+    assert nomenclator.resolver('miraflores', normalizar('Av. 500')) == [-12.12, -77.03, 'distrito']
+
+
+def test_nomenclator_sin_resultado(nomenclator):
+    # Lima no tiene centroide y "Av. 500" no forma clave de vía: la fila se descarta
+    assert nomenclator.resolver('lima', normalizar('Av. 500')) is None
+    # Filas sin coordenadas no se cargan
+    assert nomenclator.resolver('brena', normalizar('Jr. Huaraz 10')) is None
+    assert ('lima', '') not in nomenclator.puntos
+
+
+def test_comando_geocodificar(app, nomenclator, tmp_path):
+    with app.app_context():
+        db.session.add_all([
+            CentrosVotacion(id_centro='a', nombre='IE 1', direccion='Av. 28 de Julio 1250', distrito='Miraflores'),
+            CentrosVotacion(id_centro='b', nombre='IE 2', direccion='Calle Nueva 5', distrito='Miraflores'),
+            CentrosVotacion(id_centro='c', nombre='IE 3', direccion='Jr. Huaraz 10', distrito='Breña'),
+        ])
+        db.session.commit()
+
+    archivo = str(tmp_path / 'nomenclator.csv')
+    resultado = app.test_cli_runner().invoke(args=['mapa', 'geocodificar', archivo, '--precision', 'via', '--simular'])
+    assert 'Se resolverían 1 centros' in resultado.output
+    resultado = app.test_cli_runner().invoke(args=['mapa', 'geocodificar', archivo])
+    assert resultado.exit_code == 0, resultado.output
+    assert 'Geocodificados 2 centros (1 por vía, 1 por distrito)' in resultado.output
+    assert '1 sin resolver' in resultado.output
+
+    centros = {c['id']: c for c in app.test_client().get('/mapa/api/centros').json}
+    assert (centros['a']['lat'], centros['a']['lng']) == pytest.approx((-12.126, -77.026))
+    assert (centros['b']['lat'], centros['b']['lng']) == pytest.approx((-12.12, -77.03))
+    assert centros['c']['lat'] is None
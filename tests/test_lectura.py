@@ -0,0 +1,138 @@
+import threading
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from lectura import TABLAS, Instantanea, clave_mesa, modelo_lectura
+from models import CentrosVotacion, Mesas, PartidosPoliticos, VersionesDatos
+
+
+def _agregar_partido(app, nombre, siglas):
+    with app.app_context():
+        db.session.add(PartidosPoliticos(nombre_partido=nombre, siglas=siglas))
+        VersionesDatos.incrementar('PartidosPoliticos')
+        db.session.commit()
+
+
+def test_instantanea_inmutable(app, datos):
+    with app.test_request_context():
+        instantanea = modelo_lectura.actual()
+        assert [p.siglas for p in instantanea.partidos] == ['AP', 'PP']
+        assert isinstance(instantanea.partidos, tuple)
+        with pytest.raises(TypeError):
+            instantanea.partidos_por_id['x'] = None
+        with pytest.raises(AttributeError):
+            instantanea.partidos[0].siglas = 'XX'
+        assert [c.nombre_completo for c in instantanea.candidatos_por_region['Lima']] == [
+            'Juan Pérez Huamán', 'María Flores']
+        assert len(instantanea.mesas_por_centro[datos['miraflores']]) == 2
+        assert instantanea.version(('PartidosPoliticos',)) == (0,)
+
+
+def test_derivado_una_vez_por_instantanea(app, datos):
+    llamadas = []
+    with app.test_request_context():
+        instantanea = modelo_lectura.actual()
+        for _ in range(3):
+            instantanea.derivado('prueba', lambda i: llamadas.append(i) or len(i.partidos))
+    assert len(llamadas) == 1
+
+
+def test_misma_instantanea_durante_la_peticion(app, datos):
+    with app.test_request_context():
+        antes = modelo_lectura.actual()
+        _agregar_partido(app, 'Somos Perú', 'SP')
+        modelo_lectura._actual = Instantanea(antes.version(TABLAS))
+        # Otra instantánea publicada a mitad de la petición no se ve en ella
+        assert modelo_lectura.actual() is antes
+
+
+def test_recarga_en_segundo_plano(app, client, datos):
+    assert len(client.get('/api/partidos').json) == 2
+    hilos = set(threading.enumerate())
+    _agregar_partido(app, 'Somos Perú', 'SP')
+
+    # La petición que nota la versión nueva responde con la anterior y
+    # lanza la recarga; no espera a la BD
+    assert len(client.get('/api/partidos').json) == 2
+    for hilo in set(threading.enumerate()) - hilos:
+        hilo.join(timeout=10)
+    assert [p['siglas'] for p in client.get('/api/partidos').json] == ['AP', 'PP', 'SP']
+
+
+def test_vistas_no_consultan_las_tablas(app, client, datos):
+    client.get('/api/partidos')
+    sentencias = []
+
+    def registrar(conexion, cursor, sql, *args):
+        sentencias.append(sql)
+
+    with app.app_context():
+        motor = db.engine
+    event.listen(motor, 'before_cursor_execute', registrar)
+    try:
+        for url in ('/api/partidos?fields=siglas', '/api/candidatos?region=Lima', '/api/search?q=lima',
+                    '/mapa/api/centros/resumen', '/candidatos'):
+            assert client.get(url).status_code == 200
+    finally:
+        event.remove(motor, 'before_cursor_execute', registrar)
+    # Solo se releen las versiones (RESPONSE_CACHE_VERSION_TTL=0 en los tests)
+    assert sentencias
+    assert all('VersionesDatos' in sql for sql in sentencias)
+
+
+@pytest.mark.parametrize('numeros, esperado', [
+    (['10', '9', '100'], ['9', '10', '100']),
+    (['000010', '9', '000009'], ['000009', '9', '000010']),
+    (['12A', '2', '12'], ['2', '12', '12A']),
+    (['B', 'A', '١٢'], ['A', 'B', '١٢']),
+])
+def test_clave_mesa(numeros, esperado):
+    assert sorted(numeros, key=clave_mesa) == esperado
+
+
+def test_api_resumen_centros(app, client, datos):
+    with app.app_context():
+        # Sin ceros a la izquierda: '9' < '10' < '000100' < '1000', aunque como texto no lo sean
+        db.session.add_all(Mesas(numero_mesa=n, id_centro=datos['lima']) for n in ('10', '9', '1000'))
+        db.session.add(CentrosVotacion(id_centro='vacio', nombre='IE Vacía', direccion='Jr. Cusco 5', distrito='Lima'))
+        VersionesDatos.incrementar('Mesas', 'CentrosVotacion')
+        db.session.commit()
+
+    respuesta = client.get('/mapa/api/centros/resumen')
+    assert respuesta.status_code == 200
+    resumen = {r['id_centro']: r for r in respuesta.json}
+    assert resumen[datos['lima']] == {
+        'id_centro': datos['lima'], 'nombre': 'IE Lima', 'distrito': 'Lima', 'latitud': -12.05, 'longitud': -77.04,
+        'mesas': 4, 'ubicacion_detalle': 'Patio', 'primera_mesa': '9', 'ultima_mesa': '1000',
+    }
+    assert (resumen[datos['miraflores']]['primera_mesa'], resumen[datos['miraflores']]['ultima_mesa']) == (
+        '000009', '000010')
+    assert resumen['vacio']['mesas'] == 0
+    assert resumen['vacio']['primera_mesa'] is None
+    assert resumen['vacio']['ubicacion_detalle'] is None
+
+
+def test_api_resumen_centros_se_cachea(client, datos):
+    etag = client.get('/mapa/api/centros/resumen').headers['ETag']
+    assert client.get('/mapa/api/centros/resumen', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_api_centros_filtrados(client, datos):
+    todos = client.get('/mapa/api/centros').json
+    assert [c['id'] for c in todos] == sorted([datos['lima'], datos['miraflores']])
+    por_distrito = client.get('/mapa/api/centros?distrito=Miraflores').json
+    assert por_distrito == [{
+        'id': datos['miraflores'], 'nombre': 'IE Miraflores', 'distrito': 'Miraflores', 'lat': -12.12, 'lng': -77.03,
+    }]
+    # nombre sin tildes ni mayúsculas; el distrito, tal cual está en la BD
+    assert [c['id'] for c in client.get('/mapa/api/centros?nombre=ie lima').json] == [datos['lima']]
+    assert client.get('/mapa/api/centros?distrito=Lima&nombre=miraflores').json == []
+    assert client.get('/mapa/api/centros?distrito=miraflores').json == []
+
+
+def test_pagina_del_mapa(client):
+    respuesta = client.get('/mapa/')
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == 'text/html'
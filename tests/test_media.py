@@ -0,0 +1,133 @@
+import os
+
+import pytest
+from sqlalchemy import inspect, text
+
+from conftest import imagen
+from extensions import db
+from media.store import MediaStore, detectar_mimetype, es_sha256
+
+
+def test_guardar_direccionado_por_contenido(tmp_path):
+    store = MediaStore(root=str(tmp_path))
+    data = imagen('PNG')
+    sha256 = store.guardar(data)
+    assert es_sha256(sha256)
+    assert store.guardar(data) == sha256
+    assert store.ruta(sha256) == os.path.join(str(tmp_path), sha256[:2], sha256)
+    assert store.existe(sha256)
+    assert not store.existe('0' * 64)
+    assert not store.existe('../' + sha256)
+    assert store.leer_cabecera(sha256, 8) == b'\x89PNG\r\n\x1a\n'
+
+
+@pytest.mark.parametrize('data, mimetype', [
+    (imagen('PNG'), 'image/png'),
+    (imagen('JPEG'), 'image/jpeg'),
+    (imagen('GIF'), 'image/gif'),
+    (imagen('WEBP'), 'image/webp'),
+    (b'  <svg xmlns="http://www.w3.org/2000/svg"/>', 'image/svg+xml'),
+    (b'nada', 'application/octet-stream'),
+])
+def test_detectar_mimetype(data, mimetype):
+    assert detectar_mimetype(data) == mimetype
+
+
+def test_get_media(client, datos):
+    respuesta = client.get(f"/media/{datos['foto']}")
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == 'image/jpeg'
+    assert respuesta.get_data() == imagen('JPEG', (30, 30, 200))
+    assert respuesta.headers['ETag'] == f"\"{datos['foto']}\""
+    assert respuesta.cache_control.immutable
+    assert respuesta.cache_control.max_age == 365 * 24 * 3600
+
+
+def test_get_media_condicional_y_rango(client, datos):
+    url = f"/media/{datos['logo']}"
+    assert client.get(url, headers={'If-None-Match': f"\"{datos['logo']}\""}).status_code == 304
+    parcial = client.get(url, headers={'Range': 'bytes=0-7'})
+    assert parcial.status_code == 206
+    assert parcial.get_data() == b'\x89PNG\r\n\x1a\n'
+    assert parcial.headers['Content-Range'].startswith('bytes 0-7/')
+
+
+@pytest.mark.parametrize('sha256', ['0' * 64, 'no-es-un-hash', 'A' * 64])
+def test_get_media_inexistente(client, sha256):
+    assert client.get(f'/media/{sha256}').status_code == 404
+
+
+def test_listas_sin_bytes_de_imagen(client, datos):
+    partidos = {p['siglas']: p for p in client.get('/api/partidos').json}
+    assert partidos['PP']['logo_url'] == f"/media/{datos['logo']}"
+    assert partidos['AP']['logo_url'] is None
+    assert 'logo_blob' not in partidos['PP']
+
+
+def test_comando_migrar_blobs(app, client, datos):
+    # Un esquema anterior, con el logo todavía en la tabla
+    logo = imagen('PNG', (0, 200, 0, 255))
+    with app.app_context():
+        db.session.execute(text("ALTER TABLE PartidosPoliticos ADD COLUMN logo_blob BLOB"))
+        db.session.execute(text("UPDATE PartidosPoliticos SET logo_blob = :logo, logo_sha256 = NULL "
+                                "WHERE id_partido = :id"), {'logo': logo, 'id': datos['ap']})
+        db.session.commit()
+
+    resultado = app.test_cli_runner().invoke(args=['media', 'migrar'])
+    assert resultado.exit_code == 0, resultado.output
+    assert 'PartidosPoliticos: 1 imágenes movidas al almacén.' in resultado.output
+
+    with app.app_context():
+        assert 'logo_blob' not in {c['name'] for c in inspect(db.engine).get_columns('PartidosPoliticos')}
+    partidos = {p['siglas']: p for p in client.get('/api/partidos').json}
+    assert client.get(partidos['AP']['logo_url']).get_data() == logo
+
+
+def test_logo_del_partido(client, datos):
+    respuesta = client.get(f"/api/partidos/{datos['pp']}/logo")
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == 'image/png'
+    assert respuesta.get_data() == imagen('PNG')
+    # La URL por id cambia de imagen al volver a scrapear: se revalida siempre
+    assert respuesta.cache_control.no_cache
+    assert not respuesta.cache_control.immutable
+    etag = respuesta.headers['ETag']
+    assert client.get(f"/api/partidos/{datos['pp']}/logo", headers={'If-None-Match': etag}).status_code == 304
+
+
+@pytest.mark.parametrize('partido', ['ap', None])
+def test_logo_del_partido_inexistente(client, datos, partido):
+    # AP no tiene logo
+    id_partido = datos[partido] if partido else 'no-existe'
+    assert client.get(f'/api/partidos/{id_partido}/logo').status_code == 404
+
+
+def _candidatos(client):
+    return {c['nombre_completo']: c for c in client.get('/api/candidatos').json}
+
+
+def test_foto_del_candidato(client, datos):
+    candidatos = _candidatos(client)
+    juan = candidatos['Juan Pérez Huamán']
+    assert juan['foto_url'] == f"/media/{datos['foto']}"
+    assert candidatos['María Flores']['foto_url'] is None
+
+    url = f"/api/candidatos/{juan['id']}/foto"
+    respuesta = client.get(url)
+    assert respuesta.mimetype == 'image/jpeg'
+    assert respuesta.get_data() == imagen('JPEG', (30, 30, 200))
+    assert client.get(url, headers={'If-None-Match': respuesta.headers['ETag']}).status_code == 304
+    parcial = client.get(url, headers={'Range': 'bytes=0-2'})
+    assert (parcial.status_code, parcial.get_data()) == (206, b'\xff\xd8\xff')
+
+    assert client.get(f"/api/candidatos/{candidatos['María Flores']['id']}/foto").status_code == 404
+    assert client.get('/api/candidatos/999999/foto').status_code == 404
+
+
+def test_vista_candidatos_sin_base64(client, datos):
+    # La página pide la lista a /api/candidatos y las fotos por URL
+    respuesta = client.get('/candidatos')
+    assert respuesta.status_code == 200
+    html = respuesta.get_data(as_text=True)
+    assert 'base64' not in html
+    assert '${c.foto_url}?size=256' in html
@@ -0,0 +1,121 @@
+from array import array
+
+import pytest
+
+from extensions import db, response_cache
+from models import Mesas, Usuarios, VersionesDatos
+from padron import Asignaciones, formatear_dni, normalizar_dni, padron
+
+
+@pytest.mark.parametrize('valor, esperado', [
+    ('01234567', 1234567),
+    (' 40000005 ', 40000005),
+    (12345678, 12345678),
+    ('1234567', None),
+    ('123456789', None),
+    ('1234567a', None),
+    ('١٢٣٤٥٦٧٨', None),  # dígitos no ASCII
+    (None, None),
+])
+def test_normalizar_dni(valor, esperado):
+    assert normalizar_dni(valor) == esperado
+
+
+def test_formatear_dni_conserva_ceros():
+    assert formatear_dni(normalizar_dni('00012345')) == '00012345'
+
+
+def test_mesa_de():
+    asignaciones = Asignaciones(('v',), array('I', [1234567, 40000000, 40000005, 99999999]),
+                                array('I', [7, 1, 2, 3]))
+    assert len(asignaciones) == 4
+    assert asignaciones.mesa_de(1234567) == 7
+    assert asignaciones.mesa_de(40000005) == 2
+    assert asignaciones.mesa_de(99999999) == 3
+    # Ausentes: antes del primero, entre dos y después del último
+    assert asignaciones.mesa_de(1) is None
+    assert asignaciones.mesa_de(40000001) is None
+    assert asignaciones.mesa_de(99999999 + 1) is None
+
+
+def test_mesa_de_vacio():
+    assert Asignaciones(('v',), array('I'), array('I')).mesa_de(40000000) is None
+
+
+def _asignar(app, dni, numero_mesa):
+    with app.app_context():
+        mesa = Mesas.query.filter_by(numero_mesa=numero_mesa).one()
+        db.session.add(Usuarios(dni=dni, id_mesa=mesa.id_mesa))
+        VersionesDatos.incrementar('Usuarios')
+        db.session.commit()
+
+
+def test_api_local_votacion(app, client, datos):
+    _asignar(app, '01234567', '000009')
+    respuesta = client.get('/api/local-votacion/01234567')
+    assert respuesta.status_code == 200
+    assert respuesta.json['dni'] == '01234567'
+    assert respuesta.json['numero_mesa'] == '000009'
+    assert respuesta.json['ubicacion_detalle'] == 'Pabellón A'
+    assert respuesta.json['centro']['id'] == datos['miraflores']
+    assert respuesta.json['centro']['lat'] == pytest.approx(-12.12)
+
+
+@pytest.mark.parametrize('dni, estado', [('1234', 400), ('1234567x', 400), ('99999999', 404)])
+def test_api_local_votacion_errores(client, datos, dni, estado):
+    assert client.get(f'/api/local-votacion/{dni}').status_code == estado
+
+
+@pytest.fixture
+def consultas_usuarios(app):
+    """Sentencias SQL sobre Usuarios que se ejecutan durante el test."""
+    from sqlalchemy import event
+
+    sentencias = []
+
+    def registrar(conexion, cursor, sql, *args):
+        if 'Usuarios' in sql:
+            sentencias.append(sql)
+
+    with app.app_context():
+        motor = db.engine
+    event.listen(motor, 'before_cursor_execute', registrar)
+    yield sentencias
+    event.remove(motor, 'before_cursor_execute', registrar)
+
+
+def test_mesa_de_en_memoria_no_consulta_la_bd(app, datos, consultas_usuarios):
+    _asignar(app, '01234567', '000009')
+    with app.test_request_context():
+        padron._cargar(app, response_cache.versiones(('Usuarios',)))
+        # Registrado después de la carga, sin subir la versión: no está en memoria
+        mesa = Mesas.query.filter_by(numero_mesa='000100').one()
+        db.session.add(Usuarios(dni='07654321', id_mesa=mesa.id_mesa))
+        db.session.commit()
+        consultas_usuarios.clear()
+
+        assert padron.mesa_de(1234567) is not None
+        assert padron.mesa_de(7654321) is None
+        assert padron.mesa_de(99999999) is None
+    assert consultas_usuarios == []
+
+
+def test_mesa_de_durante_la_primera_carga(app, datos, monkeypatch):
+    _asignar(app, '01234567', '000009')
+    # La carga en segundo plano no termina: se responde desde MySQL
+    monkeypatch.setattr(padron, '_cargar', lambda app, version: None)
+    with app.test_request_context():
+        mesa = Mesas.query.filter_by(numero_mesa='000009').one()
+        assert padron.mesa_de(1234567) == mesa.id_mesa
+        assert padron.mesa_de(99999999) is None
+
+
+def test_api_centros_por_dni(app, client, datos):
+    _asignar(app, '01234567', '000100')
+    respuesta = client.get('/mapa/api/centros?dni=01234567')
+    assert respuesta.status_code == 200
+    assert respuesta.json == [{'id': datos['lima'], 'nombre': 'IE Lima', 'distrito': 'Lima', 'lat': -12.05, 'lng': -77.04}]
+    assert client.get('/mapa/api/centros?dni=99999999').json == []
+    assert client.get('/mapa/api/centros?dni=123').status_code == 400
+    # Una respuesta por DNI: no se guardan en la caché de respuestas
+    assert response_cache.stats()['entradas'] == 0
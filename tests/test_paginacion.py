@@ -0,0 +1,99 @@
+from collections import namedtuple
+
+import pytest
+
+from paginacion import (
+    LIMITE_MAXIMO, CursorInvalido, codificar_cursor, decodificar_cursor, leer_parametros, paginar,
+)
+
+Fila = namedtuple('Fila', ['nombre', 'id'])
+
+FILAS = sorted(
+    [Fila(nombre, i) for i, nombre in enumerate(['Acción', 'Fuerza', 'Perú', 'Fuerza', 'Somos', 'Acción', 'Juntos'])]
+)
+
+
+def _todas_las_paginas(limite):
+    vistas, after = [], None
+    while True:
+        pagina, after = paginar(FILAS, ('nombre', 'id'), limite, after)
+        vistas.append(pagina)
+        if after is None:
+            return vistas
+
+
+@pytest.mark.parametrize('limite', [1, 2, 3, len(FILAS), len(FILAS) + 5])
+def test_paginas_recorren_todo_sin_repetir(limite):
+    paginas = _todas_las_paginas(limite)
+    assert [f for pagina in paginas for f in pagina] == FILAS
+    assert all(len(p) == limite for p in paginas[:-1])
+
+
+def test_ultima_pagina_exacta_no_trae_cursor():
+    pagina, after = paginar(FILAS, ('nombre', 'id'), len(FILAS), None)
+    assert pagina == FILAS
+    assert after is None
+
+
+def test_cursor_ida_y_vuelta():
+    cursor = codificar_cursor(['Pérez', 42])
+    assert decodificar_cursor(cursor, 2) == ['Pérez', 42]
+    assert '=' not in cursor
+
+
+@pytest.mark.parametrize('after', [
+    'no-es-base64!',
+    codificar_cursor(['solo uno']),           # columnas de menos
+    codificar_cursor({'nombre': 'x'}),       # no es lista
+    codificar_cursor(['Perú', 'texto']),      # texto donde va el id
+])
+def test_cursor_invalido(after):
+    with pytest.raises(CursorInvalido):
+        paginar(FILAS, ('nombre', 'id'), 2, after)
+
+
+def test_sin_limit_ni_after_no_pagina():
+    assert leer_parametros({}) is None
+    assert leer_parametros({'fields': 'id'}) is None
+
+
+def test_limit_por_defecto_y_tope():
+    assert leer_parametros({'after': 'abc'})[1] == 'abc'
+    assert leer_parametros({'limit': str(LIMITE_MAXIMO * 10)}) == (LIMITE_MAXIMO, None)
+
+
+@pytest.mark.parametrize('limit', ['0', '-3', 'diez', ''])
+def test_limit_invalido(limit):
+    with pytest.raises(CursorInvalido):
+        leer_parametros({'limit': limit})
+
+
+def _recorrer(client, url, limite):
+    """Todas las páginas de `url` siguiendo next_cursor."""
+    items, after = [], None
+    while True:
+        respuesta = client.get(url, query_string={'limit': limite, 'after': after or ''})
+        assert respuesta.status_code == 200
+        items.extend(respuesta.json['items'])
+        after = respuesta.json['next_cursor']
+        if after is None:
+            return items
+
+
+def test_api_partidos_paginada(client, datos):
+    completa = client.get('/api/partidos').json
+    assert [p['nombre_partido'] for p in completa] == ['Acción Popular', 'Partido Popular']
+    assert _recorrer(client, '/api/partidos', 1) == completa
+
+
+def test_api_candidatos_paginada(client, datos):
+    completa = client.get('/api/candidatos').json
+    assert len(completa) == 3
+    assert _recorrer(client, '/api/candidatos', 2) == completa
+
+
+@pytest.mark.parametrize('url', ['/api/candidatos?after=basura', '/api/partidos?limit=0'])
+def test_api_cursor_invalido_400(client, datos, url):
+    respuesta = client.get(url)
+    assert respuesta.status_code == 400
+    assert 'error' in respuesta.json
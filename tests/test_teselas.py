@@ -0,0 +1,125 @@
+import gzip
+import json
+import math
+import threading
+
+import pytest
+from sqlalchemy import text
+
+import teselas
+from extensions import db
+from geo import ZOOM_CENTROS
+from lectura import modelo_lectura
+from teselas import almacen_teselas, tesela
+
+
+def _xy(lat, lng, z):
+    """Tesela (x, y) de Mercator web que contiene el punto."""
+    n = 1 << z
+    y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2
+    return int((lng + 180) / 360 * n), int(y * n)
+
+
+def test_tesela_trae_los_datos_del_popup(app, datos):
+    with app.test_request_context():
+        instantanea = modelo_lectura.actual()
+        features = json.loads(tesela(instantanea, ZOOM_CENTROS, *_xy(-12.05, -77.04, ZOOM_CENTROS)))['features']
+    assert [f['properties'] for f in features] == [{
+        'id': datos['lima'], 'nombre': 'IE Lima', 'distrito': 'Lima',
+        'ubicacion_detalle': 'Patio', 'mesas': 1, 'primera_mesa': '000100', 'ultima_mesa': '000100',
+    }]
+
+
+def test_index_sin_centros_incrustados(client, datos):
+    pagina = client.get('/').get_data(as_text=True)
+    assert 'IE Miraflores' not in pagina
+    assert '/mapa/api/centros/teselas' in pagina
+
+
+def _url(z, lat, lng, version=None):
+    x, y = _xy(lat, lng, z)
+    return f"/mapa/tiles/{z}/{x}/{y}" + (f"?v={version}" if version else '')
+
+
+def _version(client):
+    return client.get('/mapa/api/centros/teselas').json['version']
+
+
+def test_api_teselas(app, client, datos):
+    with app.test_request_context():
+        version = '-'.join(str(v) for v in modelo_lectura.actual().version(('CentrosVotacion', 'Mesas')))
+    assert client.get('/mapa/api/centros/teselas').json == {
+        'url': f'/mapa/tiles/{{z}}/{{x}}/{{y}}?v={version}', 'version': version, 'zoom_maximo': ZOOM_CENTROS,
+    }
+
+
+def test_tesela_en_memoria_mientras_se_genera(app, client, datos):
+    version = _version(client)
+    respuesta = client.get(_url(ZOOM_CENTROS, -12.12, -77.03, version))
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == 'application/geo+json'
+    assert [f['properties']['id'] for f in respuesta.json['features']] == [datos['miraflores']]
+    # Se generó en segundo plano (el teardown de conftest espera el hilo)
+    for hilo in threading.enumerate():
+        if hilo is not threading.current_thread() and hilo.daemon and hilo.name != 'QueueFeederThread':
+            hilo.join(timeout=10)
+    assert almacen_teselas.completa(version)
+
+
+def test_comando_teselas_y_cache_inmutable(app, client, datos):
+    resultado = app.test_cli_runner().invoke(args=['mapa', 'teselas'])
+    assert resultado.exit_code == 0, resultado.output
+    assert 'teselas generadas' in resultado.output
+    version = _version(client)
+    assert almacen_teselas.completa(version)
+
+    url = _url(ZOOM_CENTROS, -12.05, -77.04)
+    inmutable = client.get(f'{url}?v={version}')
+    assert inmutable.cache_control.immutable
+    assert inmutable.cache_control.max_age == app.config['TESELAS_MAX_AGE']
+    assert [f['properties']['id'] for f in inmutable.json['features']] == [datos['lima']]
+    # Sin la versión (o con otra) el cliente revalida
+    revalidar = client.get(url + '?v=vieja')
+    assert revalidar.cache_control.no_cache
+    assert not revalidar.cache_control.immutable
+    assert client.get(url, headers={'If-None-Match': inmutable.headers['ETag']}).status_code == 304
+    # Tesela sin centros: no está en disco y se responde vacía
+    assert client.get(f'/mapa/tiles/3/0/0?v={version}').json == {'type': 'FeatureCollection', 'features': []}
+
+
+def test_tesela_comprimida_en_disco(app, client, datos, monkeypatch):
+    monkeypatch.setattr(teselas, 'MINIMO_GZIP', 0)
+    app.test_cli_runner().invoke(args=['mapa', 'teselas'])
+    url = _url(ZOOM_CENTROS, -12.05, -77.04, _version(client))
+    plana = client.get(url)
+    comprimida = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert comprimida.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(comprimida.get_data()) == plana.get_data()
+    assert comprimida.headers['ETag'] != plana.headers['ETag']
+
+
+@pytest.mark.parametrize('url', ['/mapa/tiles/0/1/0', '/mapa/tiles/2/0/4', f'/mapa/tiles/{ZOOM_CENTROS + 1}/0/0'])
+def test_tesela_fuera_de_rango(client, url):
+    assert client.get(url).status_code == 404
+
+
+def test_comando_recontar(app, client, datos):
+    # Un centro cargado por SQL, sin pasar por el ORM: ni conteos ni versiones
+    with app.app_context():
+        db.session.execute(text(
+            "INSERT INTO CentrosVotacion (id_centro, nombre, direccion, distrito, latitud, longitud) "
+            "VALUES ('sql', 'IE SQL', 'Jr. Ica 2', 'Lima', -12.051, -77.041)"
+        ))
+        db.session.commit()
+    assert {d['distrito']: d['centros'] for d in client.get('/mapa/api/distritos').json}['Lima'] == 1
+    antes = _version(client)
+
+    resultado = app.test_cli_runner().invoke(args=['mapa', 'recontar'])
+    assert resultado.exit_code == 0, resultado.output
+    assert 'Conteos de 2 distritos recalculados.' in resultado.output
+    assert {d['distrito']: d['centros'] for d in client.get('/mapa/api/distritos').json}['Lima'] == 2
+    version = _version(client)
+    assert version != antes
+    assert almacen_teselas.completa(version)
+    ids = {f['properties']['id'] for f in client.get(_url(ZOOM_CENTROS, -12.051, -77.041, version)).json['features']}
+    assert 'sql' in ids
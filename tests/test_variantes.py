@@ -0,0 +1,72 @@
+import io
+import os
+import subprocess
+import sys
+
+from PIL import Image
+
+from conftest import imagen
+from media.store import MediaStore
+from media.variantes import TAMANOS, generar_variantes
+
+
+def test_generar_variantes_y_fallidas(tmp_path):
+    store = MediaStore(root=str(tmp_path))
+    logo = store.guardar(imagen('PNG'))
+    foto = store.guardar(imagen('JPEG', (30, 30, 200)))
+    roto = store.guardar(b'\x89PNG\r\n\x1a\n no es una imagen')
+
+    placeholders, fallidas = generar_variantes(store, [logo, foto, roto, None, logo], max_workers=2)
+    assert set(placeholders) == {logo, foto}
+    assert all(p.startswith('data:image/webp;base64,') for p in placeholders.values())
+    assert list(fallidas) == [roto]
+
+    # Logo con transparencia: PNG; foto: JPEG; ambos también en WebP
+    for sha256, formato in ((logo, 'png'), (foto, 'jpeg')):
+        for tamano in TAMANOS:
+            assert os.path.isfile(store.ruta_variante(sha256, tamano, formato))
+            assert os.path.isfile(store.ruta_variante(sha256, tamano, 'webp'))
+        assert os.path.isfile(store.ruta_variante(sha256, 0, 'webp'))
+    assert store.buscar_variante(roto, 48, ['webp', 'png']) is None
+
+
+def test_generar_variantes_sin_hashes(tmp_path):
+    assert generar_variantes(MediaStore(root=str(tmp_path)), [None, '']) == ({}, {})
+
+
+def test_modulo_del_pool_no_importa_la_app():
+    # Lo que cargan los procesos del pool al deserializar _generar
+    codigo = (
+        "import sys, media.variantes; "
+        "print(sorted(m for m in ('app', 'extensions', 'models', 'flask') if m in sys.modules))"
+    )
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    salida = subprocess.run([sys.executable, '-c', codigo], cwd=raiz, capture_output=True, text=True, check=True)
+    assert salida.stdout.strip() == '[]'
+
+
+def test_comando_variantes(app, client, datos):
+    resultado = app.test_cli_runner().invoke(args=['media', 'variantes', '--workers', '1'])
+    assert resultado.exit_code == 0, resultado.output
+    assert 'PartidosPoliticos: variantes generadas para 1 imágenes, 0 con error.' in resultado.output
+    assert 'candidatos: variantes generadas para 1 imágenes, 0 con error.' in resultado.output
+
+    partidos = {p['siglas']: p for p in client.get('/api/partidos').json}
+    assert partidos['PP']['logo_placeholder'].startswith('data:image/webp;base64,')
+    assert partidos['AP']['logo_placeholder'] is None
+
+
+def test_ruta_sirve_la_variante(app, client, datos):
+    app.test_cli_runner().invoke(args=['media', 'variantes', '--workers', '1'])
+
+    respuesta = client.get(f"/media/{datos['logo']}?size=40")
+    assert respuesta.mimetype == 'image/png'
+    assert Image.open(io.BytesIO(respuesta.get_data())).width == 48
+    assert respuesta.headers['ETag'] == f"\"{datos['logo']}-48.png\""
+    assert 'Accept' in respuesta.headers['Vary']
+
+    webp = client.get(f"/media/{datos['foto']}?size=100", headers={'Accept': 'image/webp,*/*'})
+    assert webp.mimetype == 'image/webp'
+    assert Image.open(io.BytesIO(webp.get_data())).width == 120
+    # Sin ?size= ni WebP, el original
+    assert client.get(f"/media/{datos['logo']}").get_data() == imagen('PNG')